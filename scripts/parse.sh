@@ -1,41 +1,44 @@
 #!/bin/bash
 
-LOC_LIST=( "mensa-arcisstr" "mensa-garching" "mensa-leopoldstr" "mensa-lothstr" \
-"mensa-martinsried" "mensa-pasing" "mensa-weihenstephan" "stubistro-arcisstr" "stubistro-goethestr" \
-"stubistro-grosshadern" "stubistro-rosenheim" "stubistro-schellingstr" "stucafe-adalbertstr" \
-"stucafe-akademie-weihenstephan" "stucafe-boltzmannstr" "stucafe-garching" "stucafe-karlstr" "stucafe-pasing" \
-"ipp-bistro" "fmi-bistro" "mediziner-mensa" )
 OUT_DIR="dist"
-
-# Delete old output directory if it exists:
-if [ -d $OUT_DIR ]; then
-		rm -r $OUT_DIR
+# Overall time budget for parsing all canteens in seconds:
+DEADLINE=${DEADLINE:-900}
+# Set SWAP=1 to regenerate an output directory which is being served: the new output is built next to it
+# and $OUT_DIR (a symlink then) is switched over at once when it is complete.
+SWAP=${SWAP:-0}
+# Set DISCOVER=1 to crawl the Studentenwerk for new locations first and add them to src/locations.json,
+# the registry of all locations which are parsed:
+DISCOVER=${DISCOVER:-0}
+
+if [ "$DISCOVER" = "1" ]; then
+	python3 src/discover.py
 fi
-# Create empty output directory:
-mkdir $OUT_DIR
 
-# Parse all canteens:
-for loc in "${LOC_LIST[@]}"; do
-    echo "Parsing menus for: " "$loc"
-    python3 src/main.py -p "$loc" -j "./$OUT_DIR/$loc" -c
-done
+SWAP_ARGS=()
+if [ "$SWAP" = "1" ]; then
+	SWAP_ARGS=( --swap )
+else
+	# Delete the old output except for status.json, which knows when each canteen was parsed successfully last:
+	if [ -d $OUT_DIR ]; then
+			find $OUT_DIR -mindepth 1 -maxdepth 1 ! -name status.json -exec rm -r {} +
+	else
+			# Create empty output directory:
+			mkdir $OUT_DIR
+	fi
+fi
 
-# Combine all combined.json files to one all.json file:
-python3 scripts/combine.py
+# Parse all canteens of src/locations.json and combine all combined.json files to one all.json file.
+# Canteens which are not parsed within the deadline are skipped:
+# The v1 and v2 layouts of the API are written to $OUT_DIR/v1 and $OUT_DIR/v2 as well:
+python3 src/batch.py "./$OUT_DIR" --deadline "$DEADLINE" --openmensa "./$OUT_DIR" --api-versions v1 v2 \
+	"${SWAP_ARGS[@]}"
 # Remove all dishes which are older than one day
 # and reorganize them in a more efficent format:
 python3 scripts/reformat.py
 
 # Coppy canteens.json in the output directory:
 echo "Coppying canteens..."
-cp src/canteens.json $OUT_DIR
+cp src/canteens.json $OUT_DIR/.canteens.json.tmp && mv -f $OUT_DIR/.canteens.json.tmp $OUT_DIR/canteens.json
 echo "Done"
 
-openmensa_list=( "ipp-bistro" "fmi-bistro" )
-
-for loc in "${openmensa_list[@]}"; do
-    echo "Parsing openmensa menus for: " "$loc"
-    python3 src/main.py -p "$loc" --openmensa "./dist/$loc"
-done
-
 tree dist/
@@ -48,8 +48,10 @@ def main():
                     canteens.append(Canteen(c))
 
         print("Saving result to \"all_ref.json\"")
-        with open("all_ref.json", "w") as outfile:
+        # write to a temporary file first, the output directory might be served already
+        with open(".all_ref.json.tmp", "w") as outfile:
             json.dump(canteens, outfile, default=lambda o: o.__dict__, indent=4, ensure_ascii=False)
+        os.replace(".all_ref.json.tmp", "all_ref.json")
         print("Done")
 
 if __name__ == "__main__":
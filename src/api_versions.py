@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import history
+from entities import Dish, Prices, Week
+
+# v1: the flat layout with a single "price" per dish; v2: the prices of every role with their unit based parts
+versions = ("v1", "v2")
+
+
+def encode(obj) -> str:
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+
+
+def v1_price(prices: Prices):
+    """The single price of the v1 layout: the students' price; prices by weight in the format of `Price.__repr__`."""
+    price = prices.students
+    if price.price_per_unit and price.unit:
+        return repr(price)
+    return price.base_price
+
+
+price_encoders: Dict[str, Callable[[Prices], str]] = {
+    "v1": lambda prices: '"price":' + encode(v1_price(prices)),
+    "v2": lambda prices: '"prices":' + encode(prices.to_json_obj()),
+}
+
+
+class MultiVersionSerializer:
+    """
+    Encodes weeks for several API versions in one pass. The versions only differ in the prices of a dish, so every
+    other part of a dish, day and week is encoded once and shared by all versions. Every week is encoded once per
+    version as well and reused for "combined.json". The JSON is compact.
+    """
+
+    def __init__(self, target_versions: Sequence[str] = versions):
+        unknown = set(target_versions) - set(versions)
+        if unknown:
+            raise ValueError("Unknown API version(s): %s" % ", ".join(sorted(unknown)))
+        self.versions = list(target_versions)
+        # most dishes of a canteen share a few price tables, so equal prices are encoded once as well
+        self.encoded_prices: Dict[Tuple[str, Prices], str] = dict()
+
+    def encode_prices(self, version: str, prices: Prices) -> str:
+        key = (version, prices)
+        if key not in self.encoded_prices:
+            self.encoded_prices[key] = price_encoders[version](prices)
+        return self.encoded_prices[key]
+
+    def encode_dish(self, dish: Dish) -> Dict[str, str]:
+        name = '{"name":' + encode(dish.name) + ','
+        rest = ',"ingredients":' + encode(sorted(dish.ingredients)) + ',"dish_type":' + encode(dish.dish_type) + '}'
+        return {version: name + self.encode_prices(version, dish.prices) + rest for version in self.versions}
+
+    def encode_week(self, week: Week) -> Dict[str, str]:
+        days: Dict[str, List[str]] = {version: list() for version in self.versions}
+        for menu in week.days:
+            dishes: Dict[str, List[str]] = {version: list() for version in self.versions}
+            for dish in menu.dishes:
+                for version, encoded in self.encode_dish(dish).items():
+                    dishes[version].append(encoded)
+            date = '{"date":' + encode(str(menu.menu_date)) + ',"dishes":['
+            for version in self.versions:
+                days[version].append(date + ",".join(dishes[version]) + ']}')
+        head = '{"number":' + encode(week.calendar_week) + ',"year":' + encode(week.year) + ',"days":['
+        return {version: head + ",".join(days[version]) + ']}' for version in self.versions}
+
+    def encode_weeks(self, weeks: Dict[Tuple[int, int], Week], location, stale: bool = False) \
+            -> Dict[str, Dict[str, bytes]]:
+        """
+        The files of `weeks` of every version, by version and relative path: "<year>/<week>.json" and
+        "combined/combined.json".
+        """
+        files: Dict[str, Dict[str, bytes]] = {version: dict() for version in self.versions}
+        encoded_weeks: Dict[str, List[str]] = {version: list() for version in self.versions}
+        for week_key in weeks:
+            week = weeks[week_key]
+            path = history.week_path("", week.year, week.calendar_week)
+            for version, encoded in self.encode_week(week).items():
+                files[version][path] = encoded.encode("utf-8")
+                encoded_weeks[version].append(encoded)
+
+        combined_head = '{"canteen_id":' + encode(location) + ',"weeks":['
+        combined_tail = '],"stale":true}' if stale else ']}'
+        combined = history.combined_path("")
+        for version in self.versions:
+            encoded = combined_head + ",".join(encoded_weeks[version]) + combined_tail
+            files[version][combined] = encoded.encode("utf-8")
+        return files
+
+
+def write_versions(files: Dict[str, Dict[str, bytes]], directory, location, write: Callable[[str, bytes], object]):
+    """Writes the files of `MultiVersionSerializer.encode_weeks` to `<directory>/<version>/<location>/`."""
+    for version, version_files in files.items():
+        for path, data in version_files.items():
+            write(os.path.join(str(directory), version, location, path), data)
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import queue
+import threading
+import time
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import api_versions
+import cli
+import locations as location_registry
+import main
+import openmensa
+import output
+import snapshot
+import status
+import supervisor
+import unit_prices
+import util
+from cache import ParseCache
+from entities import Week
+from output import OutputWriter, atomic_open
+from store import LastKnownGoodStore, MenuStore
+from supervisor import Supervisor
+from util import DateWindow
+
+default_locations: List[str] = location_registry.available()
+"""The locations parsed by a batch run if none are given explicitly: all locations of the registry."""
+
+all_file_name = 'all.json'
+
+
+class RunSummary:
+    # every location is in one list only: fresh menus are published, last known good menus are stale and failed
+    # locations got nothing published
+    published: List[str]
+    failed: List[str]
+    stale: List[str]
+    missed_deadline: List[str]
+    killed: List[str]
+    durations: Dict[str, float]
+    # the entries of "status.json" of the locations of the run
+    statuses: Dict[str, dict]
+
+    def __init__(self):
+        self.published = list()
+        self.failed = list()
+        self.stale = list()
+        self.missed_deadline = list()
+        self.killed = list()
+        self.durations = dict()
+        self.statuses = dict()
+
+    def __repr__(self):
+        summary_str = "Published %d location(s): %s" % (len(self.published), ", ".join(self.published))
+        if self.failed:
+            summary_str += "\nFailed %d location(s): %s" % (len(self.failed), ", ".join(self.failed))
+        if self.stale:
+            summary_str += "\nServed last known good menus for %d location(s): %s" % (
+                len(self.stale), ", ".join(self.stale))
+        if self.missed_deadline:
+            summary_str += "\nMissed the deadline %d location(s): %s" % (
+                len(self.missed_deadline), ", ".join(self.missed_deadline))
+        if self.killed:
+            summary_str += "\nKilled the hung workers of %d location(s): %s" % (
+                len(self.killed), ", ".join(self.killed))
+        return summary_str
+
+
+def parse_location(location, cache: Optional[ParseCache] = None, window: Optional[DateWindow] = None):
+    # unlike `main.py`, a batch run needs all days of a location before it writes anything: whether the last known good
+    # menus are served instead depends on the number of days, a worker process sends its result back at once and
+    # nothing becomes visible before `OutputWriter.commit` anyway. So it collects `iter_menus` with `parse`.
+    parser = main.get_menu_parsing_strategy(location)
+    if parser is None:
+        raise ValueError("The selected location '%s' does not exist." % location)
+    parser.cache = cache
+    return parser.parse(location, window)
+
+
+def publish_location(menus, directory, location, stale=False, menu_store: Optional[MenuStore] = None,
+                     writer: Optional[OutputWriter] = None, versions: Sequence[str] = ()):
+    weeks = Week.to_iso_weeks(menus)
+    if not versions:
+        main.jsonify(weeks, os.path.join(str(directory), location), location, True, stale, writer)
+    else:
+        # the versioned API layouts side by side, <directory>/<version>/<location>/...; the unversioned files have the
+        # v2 layout, so they are taken from the same pass instead of being encoded once more
+        write = writer.write if writer is not None else output.write_atomic
+        files = api_versions.MultiVersionSerializer(sorted(set(versions) | {"v2"})).encode_weeks(weeks, location, stale)
+        for path, data in files["v2"].items():
+            write(os.path.join(str(directory), location, path), data)
+        if "v2" not in versions:
+            del files["v2"]
+        api_versions.write_versions(files, directory, location, write)
+    # the prices of dishes sold by weight, precomputed for a grid of weights
+    prices = unit_prices.to_json_obj(menus)
+    if prices is not None:
+        path = os.path.join(str(directory), location, unit_prices.file_name)
+        if writer is not None:
+            writer.write_json(path, prices)
+        else:
+            util.write_json(path, prices)
+    if menu_store is not None and not stale:
+        menu_store.put(location, menus)
+
+
+def publish_openmensa(menus, directory, location, base_url=openmensa.default_base_url, state_directory=None):
+    feed_dir = os.path.join(str(directory), location)
+    # the JSON output of the location might create the directory at the same time
+    os.makedirs(feed_dir, exist_ok=True)
+    openmensa.writeFeeds(menus, feed_dir, location, base_url, state_directory=os.path.join(
+        str(state_directory) if state_directory is not None else util.default_cache_dir(), "openmensa"))
+
+
+def write_all_json(directory, locations, copy: bool = False):
+    """
+    Combines the "combined.json" files of the given locations into one "all.json" file, like `combine.py`. Only one
+    canteen is loaded at a time. With `copy`, the files are copied as they are instead of being indented.
+    """
+    with atomic_open(os.path.join(str(directory), all_file_name)) as outfile:
+        outfile.write('{\n    "canteens": [')
+        first = True
+        for location in locations:
+            combined_file = os.path.join(str(directory), location, "combined", "combined.json")
+            if not os.path.exists(combined_file):
+                continue
+            outfile.write('\n' if first else ',\n')
+            with open(combined_file, 'r') as infile:
+                if copy:
+                    outfile.write(infile.read())
+                else:
+                    json.dump(json.load(infile), outfile, indent=4, ensure_ascii=False)
+            first = False
+        outfile.write('\n    ]\n}')
+
+
+def run(locations, directory, deadline: Optional[float] = None, workers: int = 4, parse=parse_location,
+        store: Optional[LastKnownGoodStore] = None, min_days: int = 1, openmensa_directory=None,
+        openmensa_url=openmensa.default_base_url, menu_store: Optional[MenuStore] = None, durable: bool = True,
+        isolation: Optional[Supervisor] = None, snapshot_path=None, versions: Sequence[str] = (),
+        state_directory=None):
+    """
+    Parses and publishes all `locations` and returns a `RunSummary`. Locations not done within `deadline` seconds are
+    abandoned; failed ones are served from `store` if it has menus of them. Local state is kept in `state_directory`.
+    """
+    summary = RunSummary()
+    if state_directory is None:
+        state_directory = util.default_cache_dir()
+    previous_status = status.load(state_directory) or status.load(directory)
+    run_attempt = status.timestamp()
+    start = time.monotonic()
+    pending: "queue.Queue[str]" = queue.Queue()
+    results: "queue.Queue[tuple]" = queue.Queue()
+    cancelled = threading.Event()
+    for location in locations:
+        pending.put(location)
+
+    def worker():
+        while not cancelled.is_set():
+            try:
+                location = pending.get_nowait()
+            except queue.Empty:
+                return
+            attempt = status.timestamp()
+            location_start = time.monotonic()
+            with status.recording() as stats:
+                try:
+                    menus, error = (parse(location) if isolation is None else isolation.run(parse, location)), None
+                except Exception as e:
+                    menus, error = None, e
+            results.put((location, menus, error, time.monotonic() - location_start, attempt, stats))
+
+    # daemon threads, so that a location stuck in a fetch does not keep the process alive after the deadline
+    for _ in range(max(1, min(workers, len(locations)))):
+        threading.Thread(target=worker, daemon=True).start()
+
+    publisher = ThreadPoolExecutor(max_workers=max(1, workers))
+    writer = OutputWriter(workers, durable)
+    publishing: Dict[str, List[Future]] = dict()
+    published_menus: Dict[str, dict] = dict()
+
+    outstanding = list(locations)
+    while outstanding:
+        timeout = None if deadline is None else deadline - (time.monotonic() - start)
+        if timeout is not None and timeout <= 0:
+            break
+        try:
+            location, menus, error, duration, attempt, stats = results.get(timeout=timeout)
+        except queue.Empty:
+            break
+        outstanding.remove(location)
+        summary.durations[location] = duration
+        failed = error is not None or menus is None
+        if failed:
+            print("Parsing menus for '%s' failed: %s" % (location, error if error is not None else "no menus"))
+        if isinstance(error, supervisor.WorkerKilled):
+            summary.killed.append(location)
+        days = len(menus) if menus is not None else 0
+        dishes = sum(len(menu.dishes) for menu in menus.values()) if menus is not None else 0
+        stale = False
+        if store is not None:
+            menus, stale = store.with_fallback(location, menus, min_days)
+        summary.statuses[location] = status.location_status(
+            location, "stale" if stale else "failed" if failed else "ok", attempt, previous_status.get(location),
+            stats, duration, days, dishes)
+        if menus is None:
+            summary.failed.append(location)
+            continue
+        published_menus[location] = menus
+        publishing[location] = [publisher.submit(publish_location, menus, directory, location, stale,
+                                                  menu_store, writer, versions)]
+        if openmensa_directory is not None:
+            publishing[location].append(publisher.submit(publish_openmensa, menus, openmensa_directory, location,
+                                                             openmensa_url, state_directory))
+
+    # cancel everything that is still queued or running
+    cancelled.set()
+    if isolation is not None:
+        summary.killed.extend(isolation.kill_all())
+    summary.missed_deadline = outstanding
+    for location in outstanding:
+        summary.statuses[location] = status.location_status(location, "missed_deadline", run_attempt,
+                                                            previous_status.get(location))
+
+    # wait for the outputs of all parsed locations
+    for location in locations:
+        if location not in publishing:
+            continue
+        try:
+            for future in publishing[location]:
+                future.result()
+        except Exception as e:
+            print("Publishing menus for '%s' failed: %s" % (location, e))
+            summary.failed.append(location)
+            summary.statuses[location]["state"] = "failed"
+            summary.statuses[location]["last_success"] = previous_status.get(location, {}).get("last_success")
+            continue
+        if summary.statuses[location]["state"] == "stale":
+            summary.stale.append(location)
+            print("Published last known good menus for: %s (%.1fs)" % (location, summary.durations[location]))
+            continue
+        summary.published.append(location)
+        print("Published menus for: %s (%.1fs)" % (location, summary.durations[location]))
+    publisher.shutdown()
+    try:
+        writer.commit()
+    finally:
+        writer.close()
+
+    # keep the order of the given locations in "all.json"
+    served = [location for location in locations if location in summary.published or location in summary.stale]
+    write_all_json(directory, served)
+    for version in versions:
+        write_all_json(os.path.join(str(directory), version), served, copy=True)
+    status_obj = status.to_json_obj(summary.statuses, previous_status)
+    status.write(directory, status_obj)
+    status.write(state_directory, status_obj)
+    if snapshot_path is not None:
+        snapshot.write(snapshot_path, {location: published_menus[location] for location in served})
+    return summary
+
+
+def main_batch():
+    args = cli.parse_batch_args()
+    locations = args.locations if args.locations else default_locations
+    if not args.swap and not os.path.exists(args.directory):
+        os.makedirs(args.directory)
+
+    # with --swap, the run builds a new tree which replaces the served one at once
+    directory = args.directory
+    openmensa_directory = args.openmensa
+    if args.swap:
+        directory = output.new_tree(args.directory, keep=list(openmensa.feed_names.values())
+                                    + [openmensa.state_name, status.file_name])
+        if args.openmensa is not None and os.path.abspath(args.openmensa) == os.path.abspath(args.directory):
+            openmensa_directory = directory
+
+    store = None if args.no_store else LastKnownGoodStore(args.store)
+    menu_store = None if args.no_menu_store else MenuStore(args.menu_store)
+    cache = None if args.no_cache else ParseCache(args.cache)
+    if cache is not None:
+        cache.prune()
+    window = cli.window_of(args)
+    if window is not None:
+        # the menus of a window are only a part of the menus of a location, they must neither become its last known
+        # good menus nor replace the days of the menu store
+        store = None
+        menu_store = None
+    parse = functools.partial(parse_location, cache=cache, window=window)
+    isolation = None
+    if not args.no_isolation:
+        if supervisor.available():
+            isolation = Supervisor(args.cpu_limit, args.memory_limit, args.timeout)
+        else:
+            print("Warning: Worker processes can not be forked on this platform, parsing without isolation.")
+    summary = run(locations, directory, args.deadline, args.workers, parse, store=store,
+                  min_days=args.min_days, openmensa_directory=openmensa_directory, openmensa_url=args.openmensa_url,
+                  menu_store=menu_store, durable=not args.no_sync, isolation=isolation, snapshot_path=args.snapshot,
+                  versions=args.api_versions)
+    if args.swap:
+        output.swap_tree(args.directory, directory)
+    print(summary)
+
+
+if __name__ == "__main__":
+    main_batch()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+import gc
+import importlib.util
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from collections import OrderedDict
+from typing import Callable, Dict, Tuple
+
+import batch
+import cli
+import main
+import util
+from entities import Week
+from synthetic import MenuGenerator
+
+reformat_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "scripts", "reformat.py")
+
+
+def load_reformat():
+    # scripts/reformat.py is no module of the package, so it is loaded from its path
+    spec = importlib.util.spec_from_file_location("reformat", reformat_script)
+    reformat = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(reformat)
+    return reformat
+
+
+def measure(stage: Callable[[], object], memory: bool) -> Tuple[object, float, float]:
+    """Runs `stage` and returns its result, the time it took in seconds and its peak memory usage in MiB."""
+    gc.collect()
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = stage()
+        duration = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] / 2 ** 20 if memory else float("nan")
+    finally:
+        if memory:
+            tracemalloc.stop()
+    return result, duration, peak
+
+
+def run(canteens: int, weeks: int, seed: int = 0, memory: bool = True) -> Tuple[int, Dict[str, Tuple[float, float]]]:
+    """
+    Runs all stages for `canteens` canteens with `weeks` weeks of menus each. Returns the number of generated dishes
+    and the time and memory of every stage.
+    """
+    results: Dict[str, Tuple[float, float]] = OrderedDict()
+    reformat = load_reformat()
+    generator = MenuGenerator(seed)
+
+    def stage(name, function):
+        result, duration, peak = measure(function, memory)
+        results[name] = (duration, peak)
+        return result
+
+    all_menus = stage("generate", lambda: generator.all_menus(canteens, weeks))
+    dishes = sum(len(menu.dishes) for menus in all_menus.values() for menu in menus.values())
+    stage("make_duplicates_unique", lambda: [util.make_duplicates_unique([dish.name for dish in menu.dishes])
+                                             for menus in all_menus.values() for menu in menus.values()])
+    stage("remove_duplicates", lambda: [menu.remove_duplicates()
+                                        for menus in all_menus.values() for menu in menus.values()])
+    all_weeks = stage("to_weeks", lambda: {location: Week.to_iso_weeks(menus) for location, menus in all_menus.items()})
+
+    with tempfile.TemporaryDirectory() as directory:
+        def jsonify():
+            for location, location_weeks in all_weeks.items():
+                main.jsonify(location_weeks, os.path.join(directory, location), location, True)
+            batch.write_all_json(directory, list(all_weeks))
+        stage("jsonify", jsonify)
+
+        def reformat_all():
+            with open(os.path.join(directory, batch.all_file_name), 'r') as infile:
+                canteens_json = json.load(infile)["canteens"]
+            reformatted = [reformat.Canteen(canteen) for canteen in canteens_json]
+            return json.dumps(reformatted, default=lambda o: o.__dict__, indent=4, ensure_ascii=False)
+        stage("reformat", reformat_all)
+    return dishes, results
+
+
+def main_benchmark():
+    args = cli.parse_benchmark_args()
+    print("%8s %6s %8s  %-24s %10s %10s" % ("canteens", "weeks", "dishes", "stage", "seconds", "peak MiB"))
+    for canteens in args.canteens:
+        for weeks in args.weeks:
+            dishes, results = run(canteens, weeks, args.seed, not args.no_memory)
+            for stage, (duration, peak) in results.items():
+                print("%8d %6d %8d  %-24s %10.3f %10.1f" % (canteens, weeks, dishes, stage, duration, peak))
+
+
+if __name__ == "__main__":
+    main_benchmark()
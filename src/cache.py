@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+import time
+from datetime import date
+from typing import Dict, Optional
+
+import store
+import util
+from entities import Menu
+
+# the modules which determine the parse result of a source
+parser_modules = ("menu_parser.py", "entities.py", "pdf_table.py", "util.py")
+
+_parser_fingerprint: Optional[str] = None
+
+
+def parser_fingerprint() -> str:
+    """
+    A hash of the parser code including the price tables. Any change to it results in new cache keys, so stale parse
+    results are never served after an update.
+    """
+    global _parser_fingerprint
+    if _parser_fingerprint is None:
+        fingerprint = hashlib.sha256()
+        src_dir = os.path.dirname(os.path.abspath(__file__))
+        for module in parser_modules:
+            with open(os.path.join(src_dir, module), 'rb') as infile:
+                fingerprint.update(infile.read())
+        _parser_fingerprint = fingerprint.hexdigest()
+    return _parser_fingerprint
+
+
+class ParseCache:
+    """Caches parse results (menu dicts) keyed by a hash of the raw source (HTML page or PDF) and the parser version."""
+
+    def __init__(self, directory: Optional[str] = None, version: Optional[str] = None):
+        self.directory = directory if directory is not None else os.path.join(util.default_cache_dir(), "parse-cache")
+        self.version = version if version is not None else parser_fingerprint()
+
+    def digest_key(self, digest: str, *context) -> str:
+        """
+        The key of the source with the SHA-256 `digest`. `context` are the additional arguments the parse result
+        depends on, e.g. the location or calendar week.
+        """
+        key = hashlib.sha256(self.version.encode("utf-8"))
+        key.update(repr(context).encode("utf-8"))
+        key.update(digest.encode("ascii"))
+        return key.hexdigest()
+
+    def path(self, key: str):
+        return os.path.join(self.directory, key[:2], "%s.json.gz" % key)
+
+    def get(self, key: str) -> Optional[Dict[date, Menu]]:
+        path = self.path(key)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, 'rb') as infile:
+                menus = store.loads_menus(infile.read())
+        except (OSError, EOFError, ValueError, KeyError):
+            # e.g. a truncated entry, which is parsed again
+            return None
+        # mark the entry as used for `prune`
+        os.utime(path)
+        return menus
+
+    def put(self, key: str, menus: Dict[date, Menu]):
+        store.write_atomic(self.path(key), store.dumps_menus(menus))
+
+    def validators_path(self, url: str):
+        return os.path.join(self.directory, "pages", "%s.json" % hashlib.sha256(url.encode("utf-8")).hexdigest())
+
+    def validators(self, url: str) -> Optional[Dict[str, str]]:
+        """
+        The ETag and Last-Modified of the source at `url` when it got parsed last and its SHA-256 as "digest", so it
+        can be requested conditionally. None if there are none.
+        """
+        path = self.validators_path(url)
+        try:
+            with open(path, 'r') as infile:
+                entry = json.load(infile)
+        except (OSError, ValueError):
+            return None
+        os.utime(path)
+        return entry
+
+    def put_validators(self, url: str, digest: str, etag: Optional[str], last_modified: Optional[str]):
+        if etag is None and last_modified is None:
+            return
+        store.write_atomic(self.validators_path(url), json.dumps(
+            {"digest": digest, "etag": etag, "last_modified": last_modified}).encode("utf-8"))
+
+    def prune(self, max_age_days: float = 30):
+        """Removes all entries which have not been used for `max_age_days` days."""
+        if not os.path.isdir(self.directory):
+            return
+        oldest = time.time() - max_age_days * 24 * 60 * 60
+        for dir_path, _, file_names in os.walk(self.directory):
+            for file_name in file_names:
+                path = os.path.join(dir_path, file_name)
+                if os.path.getmtime(path) < oldest:
+                    os.unlink(path)
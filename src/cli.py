@@ -2,27 +2,218 @@
 
 import argparse
 
+import locations
 import menu_parser
+import util
+
+
+def date_arg(value):
+    try:
+        return util.parse_date(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("'%s' is no date of the format %s" % (value, util.cli_date_format))
+
+
+def add_window_args(parser):
+    parser.add_argument("--from", metavar="DATE", dest="date_from", type=date_arg,
+                        help="only parse the days from DATE (%s) on; PDFs of earlier weeks are not even "
+                             "downloaded" % util.cli_date_format)
+    parser.add_argument("--to", metavar="DATE", dest="date_to", type=date_arg,
+                        help="only parse the days until DATE (%s); PDFs of later weeks are not even "
+                             "downloaded" % util.cli_date_format)
+
+
+def check_window(parser, args):
+    """Exits with a usage error if --from is after --to."""
+    if args.date_from is not None and args.date_to is not None and args.date_from > args.date_to:
+        parser.error("--from %s is after --to %s" % (args.date_from.strftime(util.date_pattern),
+                                                     args.date_to.strftime(util.date_pattern)))
+
+
+def window_of(args):
+    """The `util.DateWindow` of the --from/--to arguments, None if neither is given."""
+    if args.date_from is None and args.date_to is None:
+        return None
+    return util.DateWindow(args.date_from, args.date_to)
 
 
 def parse_cli_args():
     parser: argparse.ArgumentParser = argparse.ArgumentParser()
     group: argparse._MutuallyExclusiveGroup = parser.add_mutually_exclusive_group(required=True)
-    group.add_argument("-p", "--parse", metavar="LOCATION", dest="location", choices=(
-            ["fmi-bistro", "ipp-bistro", "mediziner-mensa"]
-            + list(menu_parser.StudentenwerkMenuParser.location_id_mapping.keys())),
+    group.add_argument("-p", "--parse", metavar="LOCATION", dest="location", choices=locations.names(),
                         help="the location you want to eat at")
     parseGroup: argparse._MutuallyExclusiveGroup = group.add_argument_group("parse")
     parseGroup.add_argument("-d", "--date", help="date (DD.MM.YYYY) of the day of which you want to get the menu")
+    parseGroup.add_argument("--max-age", metavar="HOURS", type=float, default=12,
+                        help="answer --date from the local menu store if the stored menu is not older than HOURS, "
+                             "otherwise parse the location (default: %(default)s)")
+    parseGroup.add_argument("--menu-store", metavar="PATH",
+                        help="directory of the date indexed menus populated by batch runs "
+                             "(default: $EAT_API_CACHE/menus or ~/.cache/eat-api/menus)")
     parseGroup.add_argument("-j", "--jsonify",
                         help="directory for JSON output (date parameter will be ignored if this argument is used)",
                         metavar="PATH")
     parseGroup.add_argument("-c", "--combine", action="store_true",
                         help="creates a \"combined.json\" file containing all dishes for the location specified")
+    parseGroup.add_argument("-m", "--merge", action="store_true",
+                        help="merges the parsed menus into the JSON output already present in the jsonify directory "
+                             "instead of overwriting it; only the affected weeks and \"combined.json\" are rewritten")
     parseGroup.add_argument("--openmensa", 
                         help="directory for OpenMensa XML output (date parameter will be ignored if this argument is used)",
                         metavar="PATH")
+    parseGroup.add_argument("--format", choices=["text", "ndjson"], default="text",
+                        help="output format on stdout: \"text\" prints the menus readable for humans, \"ndjson\" "
+                             "streams one JSON object per dish and line while the menus are parsed (default: "
+                             "%(default)s)")
+    add_window_args(parseGroup)
     group.add_argument("-l", "--locations", action="store_true",
                         help="prints all available locations formated as JSON")
     args = parser.parse_args()
+    check_window(parser, args)
+    return args
+
+
+def parse_batch_args():
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Parses several locations at once and publishes them as JSON API.")
+    parser.add_argument("directory", metavar="PATH", help="directory for the JSON output of all locations")
+    parser.add_argument("-p", "--parse", metavar="LOCATION", dest="locations", nargs="+", choices=locations.names(),
+                        help="the locations to parse (default: all locations)")
+    parser.add_argument("--deadline", metavar="SECONDS", type=float,
+                        help="overall time budget of the run; locations which are not parsed until then are skipped "
+                             "and everything parsed so far gets published")
+    parser.add_argument("-w", "--workers", metavar="N", type=int, default=4,
+                        help="number of locations parsed in parallel (default: %(default)s)")
+    parser.add_argument("--openmensa", metavar="PATH",
+                        help="also write the OpenMensa XML feeds of every location to PATH/<location>/: the full "
+                             "feed.xml, today.xml with the current day only and meta.xml pointing to both")
+    parser.add_argument("--openmensa-url", metavar="URL", default="https://tum-dev.github.io/eat-api",
+                        help="base URL of the published OpenMensa feeds (default: %(default)s)")
+    parser.add_argument("--store", metavar="PATH",
+                        help="directory of the last known good menus which are served if parsing a location fails "
+                             "(default: $EAT_API_CACHE/last-known-good or ~/.cache/eat-api/last-known-good)")
+    parser.add_argument("--menu-store", metavar="PATH",
+                        help="directory of the date indexed menus used to answer `main.py -p LOCATION -d DATE` "
+                             "(default: $EAT_API_CACHE/menus or ~/.cache/eat-api/menus)")
+    parser.add_argument("--no-store", action="store_true",
+                        help="do not keep last known good menus, i.e. publish nothing for a location that fails")
+    parser.add_argument("--no-menu-store", action="store_true",
+                        help="do not fill the date indexed menu store")
+    parser.add_argument("--cache", metavar="PATH",
+                        help="directory of the parse results cached by the hash of their HTML page or PDF "
+                             "(default: $EAT_API_CACHE/parse-cache or ~/.cache/eat-api/parse-cache)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always parse all sources, even if they did not change since the last run")
+    parser.add_argument("--min-days", metavar="N", type=int, default=1,
+                        help="serve the last known good menus if less than N days got parsed (default: %(default)s)")
+    parser.add_argument("--swap", action="store_true",
+                        help="build the output in a new directory next to PATH and switch PATH (a symlink) to it at "
+                             "the end, so the previous output is served until the run is done")
+    parser.add_argument("--no-sync", action="store_true",
+                        help="do not sync the written files to disk before moving them into place")
+    parser.add_argument("--api-versions", metavar="VERSION", nargs="+", default=[], choices=["v1", "v2"],
+                        help="also write these versions of the API to PATH/<version>/, all from one pass over the "
+                             "menus: v1 with a single price per dish, v2 with the prices of every role")
+    parser.add_argument("--snapshot", metavar="FILE",
+                        help="also pack the menus of every day and week of all published locations into one "
+                             "memory mappable snapshot FILE for serving, which is replaced atomically")
+    parser.add_argument("--timeout", metavar="SECONDS", type=float, default=300,
+                        help="kill the worker process of a location if it is not done after SECONDS "
+                             "(default: %(default)s)")
+    parser.add_argument("--cpu-limit", metavar="SECONDS", type=float, default=120,
+                        help="CPU time limit of the worker process of a location (default: %(default)s)")
+    parser.add_argument("--memory-limit", metavar="MB", type=int, default=1024,
+                        help="address space limit of the worker process of a location in MiB (default: %(default)s)")
+    parser.add_argument("--no-isolation", action="store_true",
+                        help="parse the locations in threads of the batch process instead of worker processes")
+    add_window_args(parser)
+    args = parser.parse_args()
+    check_window(parser, args)
+    return args
+
+
+def parse_ingest_args():
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Parses archived HTML pages and PDF menus and merges them into the JSON output.")
+    parser.add_argument("sources", metavar="SOURCE", nargs="+",
+                        help="archived files or directories containing them; the location is detected from the "
+                             "path and the calendar week from the name of the PDF")
+    parser.add_argument("-j", "--jsonify", metavar="PATH", dest="directory", required=True,
+                        help="directory for the JSON output of all locations, existing weeks are merged")
+    parser.add_argument("-p", "--parse", metavar="LOCATION", dest="location", choices=locations.names(),
+                        help="use the parser of LOCATION for all sources instead of detecting it")
+    parser.add_argument("-c", "--combine", action="store_true",
+                        help="also update the \"combined.json\" file of every location")
+    parser.add_argument("-w", "--workers", metavar="N", type=int,
+                        help="number of worker processes (default: number of CPUs)")
+    args = parser.parse_args()
+    return args
+
+
+def parse_discover_args():
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Crawls the menu pages of the Studentenwerk for locations and adds new ones to the registry "
+                    "(src/locations.json) and canteens.json.")
+    parser.add_argument("--ids", metavar=("FIRST", "LAST"), nargs=2, type=int, default=[400, 599],
+                        help="probe the location ids from FIRST to LAST (default: %(default)s)")
+    parser.add_argument("--index", metavar="URL", nargs="*",
+                        default=["http://www.studentenwerk-muenchen.de/mensa/speiseplan/"],
+                        help="also probe the locations linked from these pages (default: %(default)s)")
+    parser.add_argument("--base-url", metavar="URL", default=menu_parser.StudentenwerkMenuParser.base_url,
+                        help="the menu page of a location, {} is replaced by its id (default: %(default)s)")
+    parser.add_argument("-w", "--workers", metavar="N", type=int, default=8,
+                        help="number of pages requested at once (default: %(default)s)")
+    parser.add_argument("--rate", metavar="N", type=float, default=5,
+                        help="requests per second (default: %(default)s)")
+    parser.add_argument("--registry", metavar="PATH", default=locations.registry_file,
+                        help="the registry of all locations (default: src/locations.json)")
+    parser.add_argument("--canteens", metavar="PATH", default=locations.canteens_file,
+                        help="the canteens.json generated from the registry (default: src/canteens.json)")
+    parser.add_argument("--dry-run", action="store_true", help="only print what was found")
+    args = parser.parse_args()
+    return args
+
+
+def parse_export_args():
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Exports all dishes of the JSON output as columns for analytics.")
+    parser.add_argument("directory", metavar="PATH", help="the JSON output directory, e.g. dist")
+    parser.add_argument("-o", "--output", metavar="PATH", required=True,
+                        help="directory of the \".npy\" columns or, with --format parquet, the Parquet file")
+    parser.add_argument("--format", choices=["npy", "parquet"], default="npy",
+                        help="memory mappable NumPy columns or Parquet, which requires pyarrow (default: %(default)s)")
+    parser.add_argument("-p", "--parse", metavar="LOCATION", dest="locations", nargs="+",
+                        help="the locations to export (default: all locations in PATH)")
+    args = parser.parse_args()
+    return args
+
+
+def parse_benchmark_args():
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Measures time and memory of every processing stage on synthetic menus of growing size.")
+    parser.add_argument("-c", "--canteens", metavar="N", type=int, nargs="+", default=[1, 10, 100],
+                        help="numbers of canteens to generate (default: %(default)s)")
+    parser.add_argument("-w", "--weeks", metavar="N", type=int, nargs="+", default=[4, 52],
+                        help="numbers of weeks of menus to generate per canteen (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generated menus (default: %(default)s)")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="do not trace the memory usage, which slows down every stage")
+    args = parser.parse_args()
+    return args
+
+
+def parse_regex_benchmark_args():
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Measures the worst case time of the patterns of the text parsers on adversarial input.")
+    parser.add_argument("-s", "--sizes", metavar="N", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="lengths of the generated inputs in characters (default: %(default)s)")
+    parser.add_argument("-r", "--repetitions", metavar="N", type=int, default=3,
+                        help="runs per case and size, the fastest one counts (default: %(default)s)")
+    parser.add_argument("--max-growth", metavar="K", type=float, default=1.5,
+                        help="fail if the time of a case grows faster than size^K between the two largest sizes "
+                             "(default: %(default)s)")
+    parser.add_argument("--budget", metavar="SECONDS", type=float, default=0.1,
+                        help="but only if the case takes longer than SECONDS on the largest input "
+                             "(default: %(default)s)")
+    args = parser.parse_args()
     return args
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+import requests
+
+import fetch
+import util
+from entities import Menu, Week
+from openmensa import default_base_url
+from output import write_atomic
+
+
+class ResponseCache:
+    """
+    Keeps the last response of every URL with its ETag, Last-Modified and SHA-256, so it can be revalidated with a
+    conditional request and is only used while its content still matches the hash:
+    <directory>/<key[:2]>/<key>.json and <key>.meta.json with the SHA-256 of the URL as key.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory if directory is not None else os.path.join(util.default_cache_dir(), "api")
+
+    def path(self, url: str, suffix: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key[:2], key + suffix)
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """The metadata of the cached response of `url` with its content as "content", None if it is not cached."""
+        try:
+            with open(self.path(url, ".meta.json"), 'rb') as infile:
+                entry = json.loads(infile.read().decode("utf-8"))
+            with open(self.path(url, ".json"), 'rb') as infile:
+                content = infile.read()
+        except (OSError, ValueError):
+            return None
+        if entry.get("url") != url or hashlib.sha256(content).hexdigest() != entry.get("sha256"):
+            print("Warning: Ignoring corrupt cached response of %s" % url)
+            return None
+        entry["content"] = content
+        return entry
+
+    def put(self, url: str, content: bytes, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        # the content first: a crash in between leaves metadata with the hash of the previous content, which is ignored
+        write_atomic(self.path(url, ".json"), content)
+        self.touch(url, {"url": url, "etag": etag, "last_modified": last_modified,
+                         "sha256": hashlib.sha256(content).hexdigest()})
+
+    def touch(self, url: str, entry: Dict[str, Any]):
+        """Marks the cached response as validated now."""
+        entry = {key: value for key, value in entry.items() if key != "content"}
+        entry["validated"] = time.time()
+        write_atomic(self.path(url, ".meta.json"), json.dumps(entry).encode("utf-8"))
+
+    def remove(self, url: str):
+        for suffix in (".meta.json", ".json"):
+            try:
+                os.unlink(self.path(url, suffix))
+            except FileNotFoundError:
+                pass
+
+
+class ApiClient:
+    """
+    Reads the published JSON API (by default of `openmensa.default_base_url`) and rebuilds `Menu` and `Dish` objects.
+    Only the files a query needs are fetched, e.g. the week files of the days asked for. Every file is cached in a
+    `ResponseCache`: files validated within the last `max_age` seconds are not requested at all, older ones are
+    revalidated with their ETag or modification time and only downloaded again if they changed. If the API can not be
+    reached, cached files are used regardless of their age.
+
+    Dishes are read in the layout of `Dish.to_json_obj`, i.e. the unversioned tree or its v2 layout.
+    """
+
+    def __init__(self, base_url: str = default_base_url, cache: Optional[ResponseCache] = None, max_age: float = 0,
+                 policy: Optional[fetch.FetchPolicy] = None):
+        self.base_url = base_url.rstrip("/")
+        self.cache = cache if cache is not None else ResponseCache()
+        self.max_age = max_age
+        # a static file server does not need to be spared like the sources of the parsers
+        self.policy = policy if policy is not None else fetch.FetchPolicy(rate=20, burst=20)
+
+    def url(self, path: str) -> str:
+        return "%s/%s" % (self.base_url, path)
+
+    def get_json(self, path: str) -> Optional[Any]:
+        """The JSON file at `path` of the API, None if it does not exist."""
+        url = self.url(path)
+        cached = self.cache.get(url)
+        if cached is not None and time.time() - cached.get("validated", 0) <= self.max_age:
+            return json.loads(cached["content"].decode("utf-8"))
+
+        headers: Dict[str, str] = dict()
+        if cached is not None and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached is not None and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+        try:
+            response = self.policy.get(url, headers=headers)
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                self.cache.remove(url)
+                return None
+            raise
+        except requests.RequestException as e:
+            if cached is None:
+                raise
+            print("Warning: Using the cached copy of %s: %s" % (url, e))
+            return json.loads(cached["content"].decode("utf-8"))
+
+        if response.status_code == 304 and cached is not None:
+            self.cache.touch(url, cached)
+            content = cached["content"]
+        else:
+            content = response.content
+            self.cache.put(url, content, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return json.loads(content.decode("utf-8"))
+
+    def canteens(self) -> List[Dict[str, Any]]:
+        """The contents of canteens.json: id, name and location of every canteen."""
+        return self.get_json("canteens.json") or []
+
+    def week(self, location: str, year: int, calendar_week: int) -> Optional[Week]:
+        """The ISO calendar week of a location, None if it is not published."""
+        obj = self.get_json("%s/%d/%02d.json" % (location, year, calendar_week))
+        if obj is None:
+            return None
+        return Week(obj["number"], obj["year"], [Menu.from_json_obj(day) for day in obj["days"]])
+
+    def menus(self, location: str, start: date, end: Optional[date] = None) -> Dict[date, Menu]:
+        """The menus of a location from `start` to `end` (both inclusive, default: `start` only) by date."""
+        window = util.DateWindow(start, end if end is not None else start)
+        menus: Dict[date, Menu] = dict()
+        # the Monday of the week of every day of the window
+        monday = window.start - timedelta(days=window.start.weekday())
+        while monday <= window.end:
+            year, calendar_week, _ = monday.isocalendar()
+            week = self.week(location, year, calendar_week)
+            for menu in week.days if week is not None else []:
+                if menu.menu_date in window:
+                    menus[menu.menu_date] = menu
+            monday += timedelta(days=7)
+        return menus
+
+    def menu(self, location: str, menu_date: date) -> Optional[Menu]:
+        """The menu of a day, None if there is none."""
+        return self.menus(location, menu_date).get(menu_date)
+
+    def combined(self, location: str) -> Dict[date, Menu]:
+        """All menus of a location from its "combined.json"."""
+        obj = self.get_json("%s/combined/combined.json" % location)
+        return self.weeks_to_menus(obj["weeks"]) if obj is not None else dict()
+
+    def all(self) -> Dict[str, Dict[date, Menu]]:
+        """The menus of all locations from "all.json" by location."""
+        obj = self.get_json("all.json")
+        if obj is None:
+            return dict()
+        return {canteen["canteen_id"]: self.weeks_to_menus(canteen["weeks"]) for canteen in obj["canteens"]}
+
+    @staticmethod
+    def weeks_to_menus(weeks: List[Dict[str, Any]]) -> Dict[date, Menu]:
+        menus: Dict[date, Menu] = dict()
+        for week in weeks:
+            for day in week["days"]:
+                menu = Menu.from_json_obj(day)
+                menus[menu.menu_date] = menu
+        return menus
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+
+import io
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+import cli
+import history
+import output
+from entities import Ingredients, Menu
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    # Parquet output is optional
+    pyarrow = None
+
+roles = ("students", "staff", "guests")
+dictionaries_name = "dictionaries.json"
+# the ingredient bitset is stored in an uint64
+max_ingredients = 64
+
+
+class DishTable:
+    """
+    All dishes of many menus as columns of equal length, one row per dish:
+
+    - date: the proleptic Gregorian ordinal of the day (`date.toordinal()`)
+    - canteen, name, dish_type: codes into the `canteens`, `names` and `dish_types` dictionaries
+    - base_price_<role>, price_per_unit_<role>: the prices of every role, NaN if there is none (e.g. "N/A")
+    - unit_<role>: code into the `units` dictionary, -1 if there is no unit
+    - ingredients: bit i is set if the dish contains `ingredients[i]`
+    """
+    columns: Dict[str, np.ndarray]
+    canteens: List[str]
+    names: List[str]
+    dish_types: List[str]
+    units: List[str]
+    ingredients: List[str]
+
+    def __init__(self, columns, canteens, names, dish_types, units, ingredients):
+        self.columns = columns
+        self.canteens = canteens
+        self.names = names
+        self.dish_types = dish_types
+        self.units = units
+        self.ingredients = ingredients
+
+    def __len__(self):
+        return len(self.columns["date"])
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.columns[column]
+
+    def dictionaries(self):
+        return {"canteens": self.canteens, "names": self.names, "dish_types": self.dish_types, "units": self.units,
+                "ingredients": self.ingredients}
+
+    def ingredient_mask(self, ingredient: str) -> np.ndarray:
+        """A boolean column which is True for all dishes containing `ingredient`."""
+        if ingredient not in self.ingredients:
+            return np.zeros(len(self), dtype=bool)
+        return (self.columns["ingredients"] & np.uint64(1 << self.ingredients.index(ingredient))) != 0
+
+    @staticmethod
+    def from_menus(canteen_menus: Iterable[Tuple[str, Iterable[Menu]]]):
+        """Flattens the menus of every canteen, given as (canteen_id, menus) pairs, into columns."""
+        dictionaries: Dict[str, Dict[str, int]] = {"canteens": {}, "names": {}, "dish_types": {}, "units": {}}
+        # the Studentenwerk codes come first, so the bits of the known ingredients are stable
+        ingredient_codes: Dict[str, int] = {code: i for i, code in enumerate(Ingredients.ingredient_lookup)}
+
+        def code(dictionary: str, value: str) -> int:
+            codes = dictionaries[dictionary]
+            return codes.setdefault(value, len(codes))
+
+        def bitset(ingredients) -> int:
+            bits = 0
+            for ingredient in ingredients:
+                bit = ingredient_codes.setdefault(ingredient, len(ingredient_codes))
+                if bit >= max_ingredients:
+                    raise ValueError("More than {} different ingredients.".format(max_ingredients))
+                bits |= 1 << bit
+            return bits
+
+        # collected in lists first, appending to numpy arrays would copy them every time
+        rows: Dict[str, list] = {name: list() for name in column_types()}
+        for canteen_id, menus in canteen_menus:
+            canteen = code("canteens", canteen_id)
+            for menu in menus:
+                ordinal = menu.menu_date.toordinal()
+                for dish in menu.dishes:
+                    rows["date"].append(ordinal)
+                    rows["canteen"].append(canteen)
+                    rows["name"].append(code("names", dish.name))
+                    rows["dish_type"].append(code("dish_types", dish.dish_type))
+                    rows["ingredients"].append(bitset(dish.ingredients))
+                    for role in roles:
+                        price = getattr(dish.prices, role)
+                        rows["base_price_" + role].append(
+                            price.base_price if isinstance(price.base_price, float) else np.nan)
+                        rows["price_per_unit_" + role].append(
+                            price.price_per_unit if price.price_per_unit is not None else np.nan)
+                        rows["unit_" + role].append(code("units", price.unit) if price.unit else -1)
+
+        columns = {name: np.array(rows[name], dtype=dtype) for name, dtype in column_types().items()}
+        return DishTable(columns, *[list(dictionaries[name]) for name in ("canteens", "names", "dish_types", "units")],
+                         list(ingredient_codes))
+
+
+def column_types() -> Dict[str, type]:
+    types = {"date": np.int32, "canteen": np.uint16, "name": np.uint32, "dish_type": np.uint16,
+             "ingredients": np.uint64}
+    for role in roles:
+        types["base_price_" + role] = np.float64
+        types["price_per_unit_" + role] = np.float64
+        types["unit_" + role] = np.int16
+    return types
+
+
+def read_history(directory, locations: Optional[List[str]] = None) -> Iterable[Tuple[str, Iterable[Menu]]]:
+    """Yields the menus of every location from its week files in the JSON output `directory`, one week at a time."""
+    if locations is None:
+        locations = sorted(location for location in os.listdir(str(directory))
+                           if os.path.isdir(os.path.join(str(directory), location, history.combined_df_name)))
+
+    def menus_of(location):
+        location_dir = os.path.join(str(directory), location)
+        for year, calendar_week in sorted(history.stored_week_keys(location_dir)):
+            week = history.load_json(history.week_path(location_dir, year, calendar_week))
+            if week is not None:
+                for day in week["days"]:
+                    yield Menu.from_json_obj(day)
+
+    for location in locations:
+        yield location, menus_of(location)
+
+
+def write_npy(table: DishTable, directory):
+    """
+    Writes every column as a ".npy" file and the dictionaries as JSON to `directory`. The columns can be memory mapped
+    by `load_npy`, so only the pages of the columns an aggregation touches get read.
+    """
+    for name, column in table.columns.items():
+        buffer = io.BytesIO()
+        np.save(buffer, column, allow_pickle=False)
+        output.write_atomic(os.path.join(str(directory), "%s.npy" % name), buffer.getvalue())
+    output.write_atomic(os.path.join(str(directory), dictionaries_name), output.encode_json(table.dictionaries()))
+
+
+def load_npy(directory, mmap_mode: Optional[str] = "r") -> DishTable:
+    with open(os.path.join(str(directory), dictionaries_name), 'r') as infile:
+        dictionaries = json.load(infile)
+    columns = {name: np.load(os.path.join(str(directory), "%s.npy" % name), mmap_mode=mmap_mode, allow_pickle=False)
+               for name in column_types()}
+    return DishTable(columns, dictionaries["canteens"], dictionaries["names"], dictionaries["dish_types"],
+                     dictionaries["units"], dictionaries["ingredients"])
+
+
+def write_parquet(table: DishTable, path):
+    """Writes the columns as Parquet file, the dictionaries are kept in its schema metadata."""
+    if pyarrow is None:
+        raise ImportError("Writing Parquet files requires pyarrow.")
+    arrow_table = pyarrow.table({name: column for name, column in table.columns.items()})
+    arrow_table = arrow_table.replace_schema_metadata(
+        {b"eat-api.dictionaries": json.dumps(table.dictionaries(), ensure_ascii=False).encode("utf-8")})
+    buffer = pyarrow.BufferOutputStream()
+    pyarrow.parquet.write_table(arrow_table, buffer)
+    output.write_atomic(str(path), buffer.getvalue().to_pybytes())
+
+
+def main_export():
+    args = cli.parse_export_args()
+
+    table = DishTable.from_menus(read_history(args.directory, args.locations))
+    if args.format == "parquet":
+        write_parquet(table, args.output)
+    else:
+        write_npy(table, args.output)
+    print("Exported %d dish(es) of %d canteen(s)." % (len(table), len(table.canteens)))
+
+
+if __name__ == "__main__":
+    main_export()
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import requests
+from lxml import html
+
+import cli
+import fetch
+import locations
+from menu_parser import StudentenwerkMenuParser
+
+# the menu page of a location, e.g. linked from the overview of all locations
+page_link_regex = re.compile(r"speiseplan_(\d+)_-de\.html")
+# e.g. "Speiseplan: Mensa Garching von 11.11.2019 bis 20.12.2019"
+title_regex = re.compile(r"Speiseplan:\s*(.+?)(\s+von\s+[\d.]+\s+bis\s+[\d.]+)?\s*$")
+
+
+def slug(name: str) -> str:
+    """The location id of a name, e.g. "StuCafé Boltzmannstraße" -> "stucafe-boltzmannstr"."""
+    name = name.lower()
+    for umlaut, replacement in (("ä", "ae"), ("ö", "oe"), ("ü", "ue"), ("ß", "ss")):
+        name = name.replace(umlaut, replacement)
+    name = re.sub(r"strasse\b", "str", name)
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "-", name).strip("-")
+
+
+def index_links(index_url: str, policy: fetch.FetchPolicy) -> Dict[int, str]:
+    """The ids of all location pages linked from an index page with the text of their links."""
+    page = html.fromstring(policy.get(index_url).content)
+    links: Dict[int, str] = dict()
+    for link in page.xpath("//a[@href]"):
+        match = page_link_regex.search(link.get("href"))
+        if match:
+            links.setdefault(int(match.group(1)), link.text_content().strip())
+    return links
+
+
+def probe(location_id: int, base_url: str, policy: fetch.FetchPolicy) -> Optional[str]:
+    """
+    The name of the location with the id, "" if its page has no name, None if there is no menu page of that id.
+    Unknown ids are answered with a client error like 404 or a redirect to the overview; server errors are raised.
+    """
+    try:
+        response = policy.get(base_url.format(location_id), allow_redirects=False)
+    except requests.HTTPError as e:
+        # a server error left after all retries says nothing about the location
+        if e.response is None or not 400 <= e.response.status_code < 500:
+            raise
+        return None
+    if response.status_code != 200:
+        return None
+    page = html.fromstring(response.content)
+    if not page.xpath("//div[contains(concat(' ', normalize-space(@class), ' '), ' c-schedule ')]"):
+        return None
+    for title in page.xpath("//h1"):
+        match = title_regex.match(title.text_content().strip())
+        if match:
+            return match.group(1)
+    return ""
+
+
+def crawl(ids: Iterable[int], index_urls: Sequence[str] = (), base_url: str = StudentenwerkMenuParser.base_url,
+          workers: int = 8, policy: Optional[fetch.FetchPolicy] = None) -> Tuple[Dict[int, str], List[int]]:
+    """
+    Probes the menu page of every id of `ids` and of every location linked from the `index_urls` with at most
+    `workers` requests at once. Returns the names of the valid locations by id and the ids which could not be probed,
+    e.g. because the host did not answer.
+    """
+    policy = policy if policy is not None else fetch.default_policy
+    candidates: Dict[int, str] = {location_id: "" for location_id in ids}
+    for index_url in index_urls:
+        try:
+            for location_id, text in index_links(index_url, policy).items():
+                if not candidates.get(location_id):
+                    candidates[location_id] = text
+        except requests.RequestException as e:
+            print("Warning: Could not read the index %s: %s" % (index_url, e))
+
+    def probe_candidate(location_id: int):
+        try:
+            return location_id, probe(location_id, base_url, policy), None
+        except requests.RequestException as e:
+            return location_id, None, e
+
+    found: Dict[int, str] = dict()
+    failed: List[int] = list()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for location_id, name, error in executor.map(probe_candidate, sorted(candidates)):
+            if error is not None:
+                failed.append(location_id)
+            elif name is not None:
+                # the title of the page, otherwise the text of the link to it
+                found[location_id] = name or candidates[location_id]
+    return found, failed
+
+
+class MergeSummary:
+    added: List[str]
+    resolved: List[str]
+    missing: List[str]
+
+    def __init__(self):
+        self.added = list()
+        self.resolved = list()
+        self.missing = list()
+
+
+def merge(entries: List[locations.Entry], found: Dict[int, str]) -> MergeSummary:
+    """
+    Merges the `found` locations into the registry `entries`: known ids are kept as they are, listed locations without
+    an id get the id of the page with their name, all others are added. Locations which were not found are reported
+    as missing but kept, their page might only be down for now.
+    """
+    summary = MergeSummary()
+    known_ids = {entry["id"] for entry in entries if entry["parser"] == locations.studentenwerk}
+    names = {name: entry for entry in entries for name in [entry["canteen_id"]] + entry.get("aliases", [])}
+    for location_id in sorted(found):
+        if location_id in known_ids:
+            continue
+        name = found[location_id] or "Studentenwerk %d" % location_id
+        canteen_id = slug(name) or str(location_id)
+        entry = names.get(canteen_id)
+        if entry is not None and entry["parser"] == locations.studentenwerk and entry.get("id") is None:
+            entry["id"] = location_id
+            summary.resolved.append(entry["canteen_id"])
+            continue
+        if entry is not None:
+            canteen_id = "%s-%d" % (canteen_id, location_id)
+        entry = {"canteen_id": canteen_id, "name": name, "parser": locations.studentenwerk, "id": location_id,
+                 "location": {"address": None, "latitude": None, "longitude": None}}
+        entries.append(entry)
+        names[canteen_id] = entry
+        summary.added.append(canteen_id)
+    summary.missing = [entry["canteen_id"] for entry in entries if entry["parser"] == locations.studentenwerk
+                       and entry.get("id") is not None and entry["id"] not in found]
+    return summary
+
+
+def main_discover():
+    args = cli.parse_discover_args()
+    policy = fetch.FetchPolicy(rate=args.rate, burst=args.workers, retries=1)
+    found, failed = crawl(range(args.ids[0], args.ids[1] + 1), args.index, args.base_url, args.workers, policy)
+    entries = locations.load(args.registry)
+    summary = merge(entries, found)
+
+    print("Found %d locations." % len(found))
+    for title, canteen_ids in (("Added", summary.added), ("Resolved the id of", summary.resolved),
+                               ("Not found (kept)", summary.missing)):
+        if canteen_ids:
+            print("%s: %s" % (title, ", ".join(canteen_ids)))
+    if failed:
+        print("Warning: Could not probe the ids %s." % ", ".join(str(location_id) for location_id in failed))
+
+    if args.dry_run or not (summary.added or summary.resolved):
+        return
+    locations.write(entries, args.registry)
+    locations.write_canteens(entries, args.canteens)
+    print("Wrote %s and %s." % (args.registry, args.canteens))
+
+
+if __name__ == "__main__":
+    main_discover()
@@ -2,7 +2,7 @@
 
 import json
 import re
-from typing import Dict, Optional, Sequence, Union, List, Any, Set
+from typing import Dict, Optional, Sequence, Union, List, Any, Set, Tuple
 from datetime import datetime
 
 
@@ -42,6 +42,10 @@ class Price:
     def to_json_obj(self):
         return {"base_price": self.base_price, "price_per_unit": self.price_per_unit, "unit": self.unit}
 
+    @staticmethod
+    def from_json_obj(obj: Dict[str, Any]):
+        return Price(obj["base_price"], obj.get("price_per_unit"), obj.get("unit"))
+
     def __hash__(self):
         # http://stackoverflow.com/questions/4005318/how-to-implement-a-good-hash-function-in-python
         return (hash(self.base_price) << 1) ^ hash(self.price_per_unit) ^ hash(self.unit)
@@ -94,6 +98,11 @@ class Prices:
 
     def to_json_obj(self):
         return {"students": self.students.to_json_obj(), "staff": self.staff.to_json_obj(), "guests": self.guests.to_json_obj()}
+
+    @staticmethod
+    def from_json_obj(obj: Dict[str, Any]):
+        return Prices(Price.from_json_obj(obj["students"]), Price.from_json_obj(obj["staff"]),
+                      Price.from_json_obj(obj["guests"]))
     
     def __hash__(self):
         # http://stackoverflow.com/questions/4005318/how-to-implement-a-good-hash-function-in-python
@@ -283,7 +292,7 @@ class Dish:
         self.dish_type = dish_type
 
     def __repr__(self):
-        return "%s %s: %s" % (self.name, str(sorted(self.ingredients)), self.price)
+        return "%s %s: %s" % (self.name, str(sorted(self.ingredients)), self.prices)
 
     def __eq__(self, other: Any):
         if isinstance(other, self.__class__):
@@ -297,6 +306,10 @@ class Dish:
         return {"name": self.name, "prices": self.prices.to_json_obj(),
              "ingredients": sorted(self.ingredients), "dish_type": self.dish_type}
 
+    @staticmethod
+    def from_json_obj(obj: Dict[str, Any]):
+        return Dish(obj["name"], Prices.from_json_obj(obj["prices"]), set(obj["ingredients"]), obj["dish_type"])
+
     def __hash__(self):
         # http://stackoverflow.com/questions/4005318/how-to-implement-a-good-hash-function-in-python
         return (hash(self.name) << 1) ^ hash(self.prices) ^ hash(frozenset(self.ingredients)) ^ hash(self.dish_type)
@@ -321,6 +334,14 @@ class Menu:
             return dishes_equal and date_equal
         return False
 
+    def to_json_obj(self):
+        return {"date": str(self.menu_date), "dishes": [dish.to_json_obj() for dish in self.dishes]}
+
+    @staticmethod
+    def from_json_obj(obj: Dict[str, Any]):
+        return Menu(datetime.strptime(obj["date"], "%Y-%m-%d").date(),
+                    [Dish.from_json_obj(dish) for dish in obj["dishes"]])
+
     def remove_duplicates(self):
         unique: List[Dish] = list()
         seen: Set[Dish] = set()
@@ -351,9 +372,7 @@ class Week:
         return week_str
 
     def to_json_obj(self):
-        return {"number": self.calendar_week, "year": self.year,
-             "days": [{"date": str(menu.menu_date), "dishes": [dish.to_json_obj() for dish in menu.dishes]} for menu in
-                      self.days]}
+        return {"number": self.calendar_week, "year": self.year, "days": [menu.to_json_obj() for menu in self.days]}
 
     def to_json(self):
         week_json: str = json.dumps(
@@ -363,19 +382,51 @@ class Week:
 
     @staticmethod
     def to_weeks(menus):
+        """
+        Groups menus by their calendar week number only. Menus of the same week number in different years end up in
+        the same `Week`, use `to_iso_weeks` if the menus might span more than one year.
+        """
         weeks: Dict[int, Week] = {}
         for menu_key in menus:
             menu: Menu = menus[menu_key]
-            menu_date = menu.menu_date
-            # get calendar week
-            calendar_week = menu_date.isocalendar()[1]
-            # get year of the calendar week. watch out that for instance jan 01 can still be in week 52 of the
-            # previous year
-            year_of_calendar_week = menu_date.year - 1 \
-                if calendar_week == 52 and menu_date.month == 1 else menu_date.year
+            # get calendar week and the year of the calendar week. watch out that for instance jan 01 can still be in
+            # week 52 or 53 of the previous year
+            year_of_calendar_week, calendar_week, _ = menu.menu_date.isocalendar()
 
             # append menus to respective week
             week: Week = weeks.get(calendar_week, Week(calendar_week, year_of_calendar_week, []))
             week.days.append(menu)
             weeks[calendar_week] = week
         return weeks
+
+    @staticmethod
+    def iter_weeks(menus):
+        """
+        Groups a stream of menus into weeks. A `Week` is yielded as soon as a menu of another week arrives, so only one
+        week is held at a time. Weeks are not merged if their menus do not arrive consecutively.
+        """
+        week: Optional[Week] = None
+        for menu in menus:
+            year_of_calendar_week, calendar_week, _ = menu.menu_date.isocalendar()
+            if week is not None and (week.year, week.calendar_week) != (year_of_calendar_week, calendar_week):
+                yield week
+                week = None
+            if week is None:
+                week = Week(calendar_week, year_of_calendar_week, [])
+            week.days.append(menu)
+        if week is not None:
+            yield week
+
+    @staticmethod
+    def to_iso_weeks(menus):
+        """Groups menus by (ISO year, ISO week), so weeks with the same number in different years do not collide."""
+        weeks: Dict[Tuple[int, int], Week] = {}
+        for menu_key in menus:
+            menu: Menu = menus[menu_key]
+            year_of_calendar_week, calendar_week, _ = menu.menu_date.isocalendar()
+
+            key = (year_of_calendar_week, calendar_week)
+            week: Week = weeks.get(key, Week(calendar_week, year_of_calendar_week, []))
+            week.days.append(menu)
+            weeks[key] = week
+        return weeks
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+
+
+class HostUnavailableError(requests.RequestException):
+    """Raised without contacting the host if its circuit breaker is open."""
+
+
+class TokenBucket:
+    """
+    Per host rate limit. Every request takes one token, tokens are refilled with `rate` tokens per second up to
+    `capacity` tokens.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.last_refill = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failed fetches of a host and stays open for the rest of the run, so
+    that a dead host is not waited for over and over again.
+    """
+
+    def __init__(self, failure_threshold: int):
+        self.failure_threshold = failure_threshold
+        self.failures = 0
+        self.lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.failures >= self.failure_threshold
+
+    def record_success(self):
+        with self.lock:
+            # an open breaker stays open
+            if not self.is_open:
+                self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+
+
+class FetchPolicy:
+    """
+    Wraps `requests.get` with connect/read timeouts, retries with jittered exponential backoff, a per host token
+    bucket and a per host circuit breaker.
+    """
+
+    # responses with these status codes are worth a retry
+    retry_status_codes = (429, 500, 502, 503, 504)
+
+    def __init__(self, connect_timeout: float = 5, read_timeout: float = 30, retries: int = 3,
+                 backoff_base: float = 0.5, backoff_max: float = 8, rate: float = 2, burst: float = 4,
+                 failure_threshold: int = 3, session: Optional[requests.Session] = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate = rate
+        self.burst = burst
+        self.failure_threshold = failure_threshold
+        self.session = session if session is not None else requests.Session()
+        self.clock = clock
+        self.sleep = sleep
+        self.buckets: Dict[str, TokenBucket] = dict()
+        self.breakers: Dict[str, CircuitBreaker] = dict()
+        self.lock = threading.Lock()
+
+    def __host_state(self, host: str):
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.burst, self.clock, self.sleep)
+                self.breakers[host] = CircuitBreaker(self.failure_threshold)
+            return self.buckets[host], self.breakers[host]
+
+    def backoff(self, attempt: int):
+        # "full jitter": sleep a random time between 0 and the exponential backoff
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def get(self, url: str, **kwargs):
+        host = urlparse(url).netloc
+        bucket, breaker = self.__host_state(host)
+        kwargs.setdefault("timeout", (self.connect_timeout, self.read_timeout))
+
+        attempt = 0
+        while True:
+            if breaker.is_open:
+                raise HostUnavailableError("Skipping {}: {} failed too often during this run.".format(url, host))
+            bucket.acquire()
+            try:
+                response = self.session.get(url, **kwargs)
+                if response.status_code not in self.retry_status_codes:
+                    response.raise_for_status()
+                    breaker.record_success()
+                    return response
+                # a streamed response holds its pooled connection until it is closed
+                response.close()
+                error: requests.RequestException = requests.HTTPError(
+                    "{} Server Error for url: {}".format(response.status_code, url), response=response)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            except requests.HTTPError as e:
+                if e.response is not None:
+                    e.response.close()
+                # client errors (e.g. 404) will not go away with a retry, but the host itself is fine
+                breaker.record_success()
+                raise
+
+            if attempt >= self.retries:
+                breaker.record_failure()
+                raise error
+            self.sleep(self.backoff(attempt))
+            attempt += 1
+
+
+default_policy = FetchPolicy()
+
+
+def get(url: str, **kwargs):
+    """Fetches `url` with the `default_policy`."""
+    return default_policy.get(url, **kwargs)
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+from typing import Any, Dict, Optional, Set, Tuple
+
+import util
+from entities import Week
+from output import atomic_open
+
+combined_df_name = 'combined'
+
+
+def week_path(directory, year, calendar_week):
+    # <directory>/<year>/<calendar_week>.json
+    return os.path.join(str(directory), str(year), "%s.json" % str(calendar_week).zfill(2))
+
+
+def combined_path(directory):
+    return os.path.join(str(directory), combined_df_name, "%s.json" % combined_df_name)
+
+
+def load_json(path) -> Optional[Any]:
+    if not os.path.isfile(path):
+        return None
+    with open(path, 'r') as infile:
+        try:
+            return json.load(infile)
+        except ValueError:
+            print("Warning: Ignoring corrupt history file %s" % path)
+            return None
+
+
+def stored_week_keys(directory):
+    """The (year, calendar week) keys of all week files in `directory`."""
+    keys: Set[Tuple[int, int]] = set()
+    for year in os.listdir(str(directory)):
+        if not year.isdigit() or not os.path.isdir(os.path.join(str(directory), year)):
+            continue
+        for file_name in os.listdir(os.path.join(str(directory), year)):
+            calendar_week, extension = os.path.splitext(file_name)
+            if extension == ".json" and calendar_week.isdigit():
+                keys.add((int(year), int(calendar_week)))
+    return keys
+
+
+def merge_week(old_week: Optional[Dict[str, Any]], week: Week) -> Dict[str, Any]:
+    """
+    Merges the days of a freshly parsed `Week` into the JSON object of the same week loaded from the history. Days
+    which got parsed again replace the stored ones, all other stored days are kept.
+    """
+    days: Dict[str, Any] = dict()
+    if old_week is not None:
+        for day in old_week.get("days", []):
+            days[day["date"]] = day
+    for day in week.to_json_obj()["days"]:
+        days[day["date"]] = day
+
+    # ISO dates sort chronologically
+    return {"number": week.calendar_week, "year": week.year, "days": [days[date] for date in sorted(days)]}
+
+
+def merge_combined(directory, location, merged_weeks: Dict[Tuple[int, int], Dict[str, Any]]):
+    """
+    Splices the merged weeks into the existing "combined.json". Only the combined file itself is read, the week files
+    of untouched weeks are neither loaded nor rewritten.
+    """
+    path = combined_path(directory)
+    combined = load_json(path)
+
+    weeks: Dict[Tuple[int, int], Any] = dict()
+    if combined is not None:
+        for week in combined.get("weeks", []):
+            weeks[(week["year"], week["number"])] = week
+    weeks.update(merged_weeks)
+
+    util.write_json(path, {"canteen_id": location, "weeks": [weeks[key] for key in sorted(weeks)]})
+
+
+def merge_history(menus, directory, location, combine_dishes):
+    """
+    Merges the parsed `menus` into the JSON output in `directory` which has been written by previous runs. Only the
+    week files affected by the new menus (keyed by ISO year and ISO week) are loaded and rewritten.
+    """
+    merged_weeks: Dict[Tuple[int, int], Dict[str, Any]] = dict()
+    for key, week in sorted(Week.to_iso_weeks(menus).items()):
+        path = week_path(directory, week.year, week.calendar_week)
+        merged_week = merge_week(load_json(path), week)
+        util.write_json(path, merged_week)
+        merged_weeks[key] = merged_week
+
+    # check if combine parameter got set
+    if combine_dishes:
+        merge_combined(directory, location, merged_weeks)
+
+    return merged_weeks
+
+
+def write_menus(menus, directory, location, combine_dishes, merge=False):
+    """
+    Writes a stream of menus (e.g. from `MenuParser.iter_menus`) week by week as soon as a week is complete, so only
+    one week is held in memory. Without `merge`, weeks already present in `directory` are replaced on their first
+    write during this call.
+
+    Returns:
+        The number of written menus.
+    """
+    written_weeks: Set[Tuple[int, int]] = set()
+    count = 0
+    for week in Week.iter_weeks(menus):
+        key = (week.year, week.calendar_week)
+        path = week_path(directory, week.year, week.calendar_week)
+        # a week can arrive in parts, e.g. if it is spread over two PDFs
+        old_week = load_json(path) if merge or key in written_weeks else None
+        util.write_json(path, merge_week(old_week, week))
+        written_weeks.add(key)
+        count += len(week.days)
+
+    if combine_dishes and written_weeks:
+        write_combined(directory, location, written_weeks, merge)
+    return count
+
+
+def write_combined(directory, location, week_keys: Set[Tuple[int, int]], merge=False):
+    """
+    Writes "combined.json" from the week files of `week_keys` (and with `merge` all week files in `directory`) one
+    week at a time.
+    """
+    path = combined_path(directory)
+    keys = set(week_keys)
+    if merge:
+        keys.update(stored_week_keys(directory))
+
+    with atomic_open(path) as outfile:
+        outfile.write('{\n    "canteen_id": %s,\n    "weeks": [' % json.dumps(location, ensure_ascii=False))
+        first = True
+        for year, calendar_week in sorted(keys):
+            week = load_json(week_path(directory, year, calendar_week))
+            if week is None:
+                continue
+            outfile.write('\n' if first else ',\n')
+            outfile.write(json.dumps(week, indent=4, ensure_ascii=False))
+            first = False
+        outfile.write('\n    ]\n}')
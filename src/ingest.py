@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from lxml import html
+
+import cli
+import history
+import locations as location_registry
+import main
+from entities import Menu
+from menu_parser import FMIBistroMenuParser, MenuParser, StudentenwerkMenuParser
+
+# directory names of archives which do not match the location name, e.g. the layout of "src/test/assets"
+location_aliases: Dict[str, str] = {"fmi": "fmi-bistro", "ipp": "ipp-bistro", "mediziner": "mediziner-mensa"}
+# week and year of archived files which got renamed, e.g. "menu_kw_47_2017.txt"
+archive_week_regex = re.compile(r"KW[_-]?([1-9]\d?)[_-](\d{4})", re.IGNORECASE)
+source_extensions = (".html", ".htm", ".pdf", ".txt")
+
+
+def known_locations() -> List[str]:
+    return location_registry.names()
+
+
+def detect_location(path: str) -> Optional[str]:
+    """
+    Detects the location of an archived source from its path: a directory named like a location (or one of the
+    `location_aliases`) or, for saved Studentenwerk pages, the location or its id in the file name, e.g.
+    "speiseplan_mensa_garching.html" or "speiseplan_422_-de.html".
+    """
+    locations = known_locations()
+    directories = os.path.normpath(os.path.dirname(path)).split(os.sep)
+    for directory in reversed(directories):
+        name = directory.lower().replace("_", "-")
+        if name in locations:
+            return name
+        if name in location_aliases:
+            return location_aliases[name]
+
+    file_name = os.path.splitext(os.path.basename(path))[0].lower()
+    id_match = re.search(r"speiseplan_(\d+)", file_name)
+    if id_match:
+        for location, location_id in StudentenwerkMenuParser.location_id_mapping.items():
+            if location_id == int(id_match.group(1)):
+                return location
+    # prefer the longest name, e.g. "mensa-arcisstrasse" over "mensa-arcisstr"
+    matches = [location for location in locations if location.replace("-", "_") in file_name]
+    return max(matches, key=len) if matches else None
+
+
+def get_year_and_week(parser: MenuParser, file_name: str) -> Tuple[Optional[int], Optional[int]]:
+    """Derives year and calendar week like the `parse` method of the PDF parsers from the name of the PDF."""
+    if isinstance(parser, FMIBistroMenuParser):
+        # the current year is no guess for an archive
+        year, week_number = parser.get_year_and_week(file_name, current_year=False)
+    else:
+        year, week_number = parser.get_year_and_week(file_name)
+    if year is None or week_number is None:
+        archive_match = archive_week_regex.search(file_name)
+        if archive_match:
+            week_number, year = int(archive_match.group(1)), int(archive_match.group(2))
+    return year, week_number
+
+
+def find_sources(directory) -> List[str]:
+    sources = list()
+    for dir_path, _, file_names in os.walk(str(directory)):
+        for file_name in file_names:
+            if file_name.lower().endswith(source_extensions):
+                sources.append(os.path.join(dir_path, file_name))
+    # later sources of the same day win, so the order has to be deterministic
+    return sorted(sources)
+
+
+def ingest_source(source: Tuple[str, Optional[str]]) -> Tuple[str, Optional[str], Optional[Dict[date, Menu]]]:
+    """
+    Parses a single archived source (a saved HTML page, a PDF or the text `pdftotext -layout` made of it) of the
+    location (detected from the path if None). Runs in a worker process, so all errors are returned as warning.
+    """
+    path, location = source
+    if location is None:
+        location = detect_location(path)
+    parser = main.get_menu_parsing_strategy(location)
+    if parser is None:
+        print("Warning: Skipping %s, its location could not be detected." % path)
+        return path, location, None
+
+    try:
+        with open(path, 'rb') as infile:
+            raw = infile.read()
+        if isinstance(parser, StudentenwerkMenuParser):
+            return path, location, parser.get_menus(html.fromstring(raw), location)
+
+        year, week_number = get_year_and_week(parser, os.path.basename(path))
+        if year is None or week_number is None:
+            print("Warning: Skipping %s, its calendar week could not be detected." % path)
+            return path, location, None
+        if path.lower().endswith(".pdf"):
+            text = parser.pdf_to_text(raw, parser.pdftotext_args)
+        else:
+            text = raw.decode("utf-8")
+        return path, location, parser.get_menus(text, year, week_number)
+    except Exception as e:
+        print("Warning: Could not parse %s: %s" % (path, e))
+        return path, location, None
+
+
+def ingest(sources: List[str], directory, workers: Optional[int] = None, location: Optional[str] = None,
+           combine_dishes: bool = False) -> Dict[str, int]:
+    """
+    Parses archived `sources` with a pool of `workers` processes and merges the menus into the week files of their
+    location in `directory`, like `main.py -j PATH -m` does.
+
+    Returns:
+        The number of ingested days per location.
+    """
+    menus: Dict[str, Dict[date, Menu]] = dict()
+    workers = workers if workers is not None else os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # hand out several sources at once, the parse of a single source is too short to be worth a round trip
+        chunk_size = max(1, len(sources) // (workers * 4))
+        for path, source_location, parsed_menus in executor.map(
+                ingest_source, [(source, location) for source in sources], chunksize=chunk_size):
+            if parsed_menus:
+                menus.setdefault(source_location, dict()).update(parsed_menus)
+
+    for menu_location in sorted(menus):
+        history.merge_history(menus[menu_location], os.path.join(str(directory), menu_location), menu_location,
+                              combine_dishes)
+    return {menu_location: len(menus[menu_location]) for menu_location in menus}
+
+
+def main_ingest():
+    args = cli.parse_ingest_args()
+    sources = list()
+    for path in args.sources:
+        sources.extend(find_sources(path) if os.path.isdir(path) else [path])
+    if not sources:
+        print("No archived menus found in %s." % ", ".join(args.sources), file=sys.stderr)
+        sys.exit(1)
+
+    days = ingest(sources, args.directory, args.workers, args.location, args.combine)
+    for location in sorted(days):
+        print("%s: %d day(s)" % (location, days[location]))
+
+
+if __name__ == "__main__":
+    main_ingest()
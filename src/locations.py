@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+import output
+
+# the one list of all locations: canteens.json, the id map of the Studentenwerk parser, the choices of the command line
+# and the locations of a batch run are derived from it. `discover.py` adds the Studentenwerk locations it finds.
+registry_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "locations.json")
+canteens_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "canteens.json")
+
+# the parser of every location which has a menu page at the Studentenwerk, see `StudentenwerkMenuParser`
+studentenwerk = "studentenwerk"
+
+Entry = Dict[str, Any]
+
+
+def load(path=registry_file) -> List[Entry]:
+    with open(str(path), "r", encoding="utf-8") as infile:
+        return json.load(infile)["locations"]
+
+
+def write(entries: List[Entry], path=registry_file):
+    output.write_atomic(str(path), output.encode_json({"locations": entries}))
+
+
+def parsable(entry: Entry) -> bool:
+    # Studentenwerk locations whose id is not known (yet) are only listed for documentation
+    return entry["parser"] != studentenwerk or entry.get("id") is not None
+
+
+def available(entries: Optional[List[Entry]] = None) -> List[str]:
+    """The ids of all locations which can be parsed, without aliases."""
+    return [entry["canteen_id"] for entry in (registry if entries is None else entries) if parsable(entry)]
+
+
+def names(entries: Optional[List[Entry]] = None) -> List[str]:
+    """The ids and aliases of all locations which can be parsed, e.g. the choices of the command line."""
+    return [name for entry in (registry if entries is None else entries) if parsable(entry)
+            for name in [entry["canteen_id"]] + entry.get("aliases", [])]
+
+
+def studentenwerk_ids(entries: Optional[List[Entry]] = None) -> Dict[str, int]:
+    """The Studentenwerk location id by location id and alias."""
+    return {name: entry["id"] for entry in (registry if entries is None else entries)
+            if entry["parser"] == studentenwerk and entry.get("id") is not None
+            for name in [entry["canteen_id"]] + entry.get("aliases", [])}
+
+
+def parser_of(location: str, entries: Optional[List[Entry]] = None) -> Optional[str]:
+    """The parser of a location or alias, None if it is unknown or can not be parsed."""
+    for entry in (registry if entries is None else entries):
+        if location == entry["canteen_id"] or location in entry.get("aliases", []):
+            return entry["parser"] if parsable(entry) else None
+    return None
+
+
+def canteens(entries: Optional[List[Entry]] = None) -> List[Entry]:
+    """The contents of canteens.json."""
+    return [{"location": entry["location"], "name": entry["name"], "canteen_id": entry["canteen_id"]}
+            for entry in (registry if entries is None else entries) if parsable(entry)]
+
+
+def write_canteens(entries: Optional[List[Entry]] = None, path=canteens_file):
+    output.write_atomic(str(path), output.encode_json(canteens(entries)))
+
+
+registry: List[Entry] = load()
+
+
+if __name__ == "__main__":
+    # prints canteens.json as generated from the registry
+    sys.stdout.write(output.encode_json(canteens()).decode("utf-8") + "\n")
@@ -1,70 +1,112 @@
 # -*- coding: utf-8 -*-
 import json
 import os
+import sys
+
+import requests
 
 import cli
+import history
+import locations
 import menu_parser
 
 import util
-from openmensa import openmensa
-from entities import Week
-from typing import Any
+from openmensa import writeMenusFeed
+from entities import Menu, Week
+from store import MenuStore
+from typing import Any, Dict, Iterable, Iterator
 
 
 def get_menu_parsing_strategy(location):
     parser = None
 
-    # set parsing strategy based on location
-    if isinstance(location, int) or location in menu_parser.StudentenwerkMenuParser.location_id_mapping.keys():
+    # set parsing strategy based on the parser of the location in the registry
+    parser_name = locations.studentenwerk if isinstance(location, int) else locations.parser_of(location)
+    if parser_name == locations.studentenwerk:
         parser = menu_parser.StudentenwerkMenuParser()
-    elif location == "fmi-bistro":
+    elif parser_name == "fmi-bistro":
         parser = menu_parser.FMIBistroMenuParser()
-    elif location == "ipp-bistro":
+    elif parser_name == "ipp-bistro":
         parser = menu_parser.IPPBistroMenuParser()
-    elif location == "mediziner-mensa":
+    elif parser_name == "mediziner-mensa":
         parser = menu_parser.MedizinerMensaMenuParser()
 
     return parser
 
 
-def jsonify(weeks, directory, location, combine_dishes):
+def jsonify(weeks, directory, location, combine_dishes, stale=False, writer=None):
+    """
+    Writes the week files (and "combined.json") of `weeks`. Every file is replaced atomically; with an
+    `output.OutputWriter` as `writer`, the files are only moved into place once the writer commits.
+    """
+    write_json = writer.write_json if writer is not None else util.write_json
     # iterate through weeks
-    for calendar_week in weeks:
+    for week_key in weeks:
         # get Week object
-        week = weeks[calendar_week]
-        # get year of calendar week
+        week = weeks[week_key]
+        # get calendar week and its year; the keys are either the week numbers or (year, week number) tuples
+        calendar_week = week.calendar_week
         year = week.year
 
-        # create dir: <year>/
-        json_dir = "%s/%s" % (str(directory), str(year))
-        if not os.path.exists(json_dir):
-            os.makedirs("%s/%s" % (str(directory), str(year)))
-
-        # convert Week object to JSON
-        week_json = week.to_json()
         # write JSON to file: <year>/<calendar_week>.json
-        with open("%s/%s.json" % (str(json_dir), str(calendar_week).zfill(2)), 'w') as outfile:
-            json.dump(json.loads(week_json), outfile, indent=4, ensure_ascii=False)
+        write_json(history.week_path(directory, year, calendar_week), week.to_json_obj())
 
     # check if combine parameter got set
     if not combine_dishes:
         return
-    # the name of the output directory and file
-    combined_df_name = 'combined'
+    # convert all weeks to one JSON object
+    combined_obj = {"canteen_id": location, "weeks": [weeks[week_key].to_json_obj() for week_key in weeks]}
+    # tag menus which are not from the current run
+    if stale:
+        combined_obj["stale"] = True
 
-    # create directory for combined output
-    json_dir = "%s/%s" % (str(directory), combined_df_name)
-    if not os.path.exists(json_dir):
-        os.makedirs("%s/%s" % (str(directory), combined_df_name))
+    # write JSON object to file: combined/combined.json
+    write_json(history.combined_path(directory), combined_obj)
 
-    # convert all weeks to one JSON object
-    weeks_json_all = json.dumps(
-        {"canteen_id": location, "weeks": [weeks[calendar_week].to_json_obj() for calendar_week in weeks]}, 
-        ensure_ascii=False, indent=4)
-    
-    # write JSON object to file
-    with open("%s/%s.json" % (str(json_dir), combined_df_name), 'w') as outfile:
-        json.dump(json.loads(weeks_json_all), outfile, indent=4, ensure_ascii=False)
+
+def write_menus(menus, args):
+    """Writes a stream of menus into the JSON (-j) or OpenMensa (--openmensa) output. Returns the number of menus."""
+    # jsonify argument is set
+    if args.jsonify is not None:
+        if not os.path.exists(args.jsonify):
+            os.makedirs(args.jsonify)
+        return history.write_menus(menus, args.jsonify, args.location, args.combine, args.merge)
+
+    if not os.path.exists(args.openmensa):
+        os.makedirs(args.openmensa)
+    # count the menus while they are passed on to the feed
+    counted = [0]
+
+    def count(menu):
+        counted[0] += 1
+        return menu
+    writeMenusFeed((count(menu) for menu in menus), os.path.join(args.openmensa, "feed.xml"))
+    return counted[0]
+
+
+def ndjson_records(menus: Iterable[Menu], location) -> Iterator[Dict[str, Any]]:
+    """Flattens menus into one JSON object per dish."""
+    for menu in menus:
+        for dish in menu.dishes:
+            yield {"canteen_id": location, "date": str(menu.menu_date), "name": dish.name,
+                   "dish_type": dish.dish_type, "prices": dish.prices.to_json_obj(),
+                   "ingredients": sorted(dish.ingredients)}
+
+
+def write_ndjson(menus: Iterable[Menu], location, outfile=None):
+    """
+    Writes one JSON object per dish and line to `outfile` (default: stdout). The output is flushed after every menu, so
+    readers of a pipe get the dishes while the location is still being parsed. Returns the number of menus.
+    """
+    if outfile is None:
+        outfile = sys.stdout
+    written = 0
+    for menu in menus:
+        for record in ndjson_records([menu], location):
+            outfile.write(json.dumps(record, ensure_ascii=False) + "\n")
+        outfile.flush()
+        written += 1
+    return written
 
 
 def main():
@@ -79,13 +121,6 @@ def main():
 
     # get location from args
     location = args.location
-    # get required parser
-    parser = get_menu_parsing_strategy(location)
-    if parser is None:
-        print("The selected location '%s' does not exist." % location)
-
-    # parse menu
-    menus = parser.parse(location)
 
     # if date has been explicitly specified, try to parse it
     menu_date = None
@@ -97,20 +132,65 @@ def main():
             print("Required format: %s" % util.cli_date_format)
             return
 
+    # answer a single date from the local menu store if it is fresh enough
+    menu_store = MenuStore(args.menu_store)
+    only_date = args.date is not None and args.jsonify is None and args.openmensa is None
+    if only_date:
+        menu = menu_store.get(location, menu_date, args.max_age * 60 * 60)
+        if menu is not None:
+            if args.format == "ndjson":
+                write_ndjson([menu], location)
+            else:
+                print(menu)
+            return
+
+    # get required parser
+    parser = get_menu_parsing_strategy(location)
+    if parser is None:
+        print("The selected location '%s' does not exist." % location)
+        return
+
+    # only the days within --from/--to get parsed
+    window = cli.window_of(args)
+
+    # stream the menus into the output as soon as they are parsed
+    if args.jsonify is not None or args.openmensa is not None:
+        try:
+            written = write_menus(parser.iter_menus(location, window), args)
+        except requests.RequestException as e:
+            print("Error during fetching the menu of '%s': %s" % (location, e))
+            written = 0
+        if not written:
+            print("Error. Could not retrieve menu(s)")
+        return
+
+    # stream one JSON object per dish to stdout; errors go to stderr, so they do not end up in the stream
+    if args.format == "ndjson":
+        if menu_date is not None:
+            # the day of -d is a window of its own
+            window = util.DateWindow(menu_date, menu_date)
+        menus = parser.iter_menus(location, window)
+        try:
+            written = write_ndjson(menus, location)
+        except requests.RequestException as e:
+            print("Error during fetching the menu of '%s': %s" % (location, e), file=sys.stderr)
+            written = 0
+        if not written:
+            print("Error. Could not retrieve menu(s)", file=sys.stderr)
+        return
+
+    # parse menu
+    try:
+        menus = parser.parse(location, window)
+    except requests.RequestException as e:
+        print("Error during fetching the menu of '%s': %s" % (location, e))
+        menus = None
+    if menus is not None and only_date:
+        menu_store.put(location, menus)
+
     # print menu
     if menus is None:
         print("Error. Could not retrieve menu(s)")
-    # jsonify argument is set
-    elif args.jsonify is not None:
-        weeks = Week.to_weeks(menus)
-        if not os.path.exists(args.jsonify):
-            os.makedirs(args.jsonify)
-        jsonify(weeks, args.jsonify, location, args.combine)
-    elif args.openmensa is not None:
-        weeks = Week.to_weeks(menus)
-        if not os.path.exists(args.openmensa):
-            os.makedirs(args.openmensa)
-        openmensa(weeks, args.openmensa)
     # date argument is set
     elif args.date is not None:
         if menu_date not in menus:
@@ -120,9 +200,9 @@ def main():
         print(menu)
     # else, print weeks
     else:
-        weeks = Week.to_weeks(menus)
-        for calendar_week in weeks:
-            print(weeks[calendar_week])
+        weeks = Week.to_iso_weeks(menus)
+        for week_key in weeks:
+            print(weeks[week_key])
 
 
 if __name__ == "__main__":
@@ -1,20 +1,28 @@
 # -*- coding: utf-8 -*-
 
+import contextlib
+import hashlib
 import re
 import sys
 import tempfile
 import unicodedata
 from datetime import datetime, date
-from subprocess import call
+import subprocess
 from warnings import warn
-from typing import Dict, List, Union, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Match, Optional, Pattern, Union, Tuple
 from abc import ABC, abstractmethod
 
 import requests
-from lxml import html
+from lxml import etree, html
 
+import fetch
+import locations
+import status
 import util
+from cache import ParseCache
 from entities import Dish, Menu, Ingredients, Price, Prices
+from util import DateWindow
+from pdf_table import ColumnLayout, LayoutTextExtractor, TableExtractor
 
 
 class MenuParser(ABC):
@@ -24,6 +32,19 @@ class MenuParser(ABC):
 
     # we use datetime %u, so we go from 1-7
     weekday_positions: Dict[str, int] = {"mon": 1, "tue": 2, "wed": 3, "thu": 4, "fri": 5, "sat": 6, "sun": 7}
+    # the column titles of the weekly tables in the PDF menus
+    weekday_titles: List[Tuple[str, str]] = [("mon", "Montag"), ("tue", "Dienstag"), ("wed", "Mittwoch"),
+                                             ("thu", "Donnerstag"), ("fri", "Freitag")]
+    # splits the text tables of the PDF menus into their columns
+    table_extractor: TableExtractor = LayoutTextExtractor()
+    # if set, parse results are cached by the hash of their source
+    cache: Optional[ParseCache] = None
+    # downloads are streamed in chunks of this size, so no source is held in memory as a whole
+    chunk_size: int = 64 * 1024
+    # seconds after which pdftotext gets killed, e.g. if poppler spins on a malformed PDF
+    pdftotext_timeout: float = 60
+    # the text of a day is far shorter; longer texts come from broken sources and are skipped
+    max_day_length: int = 20000
 
     @staticmethod
     def get_date(year: int, week_number: int, day: int):
@@ -37,10 +58,143 @@ class MenuParser(ABC):
 
         return date
 
+    @staticmethod
+    def pdf_to_text(pdf: bytes, pdftotext_args: List[str] = ()):
+        with tempfile.NamedTemporaryFile() as temp_pdf:
+            temp_pdf.write(pdf)
+            temp_pdf.flush()
+            return MenuParser.pdf_file_to_text(temp_pdf.name, pdftotext_args)
+
+    @staticmethod
+    def pdf_file_to_text(pdf_path: str, pdftotext_args: List[str] = ()):
+        with tempfile.NamedTemporaryFile() as temp_txt, status.timed("convert"):
+            # convert pdf to text by calling pdftotext; raises subprocess.TimeoutExpired if it takes too long
+            subprocess.run(["pdftotext"] + list(pdftotext_args) + ["-layout", pdf_path, temp_txt.name],
+                           timeout=MenuParser.pdftotext_timeout)
+            with open(temp_txt.name, 'r') as myfile:
+                # read generated text file
+                return myfile.read()
+
+    @staticmethod
+    def fetch_url(url: str, **kwargs) -> requests.Response:
+        """`fetch.get`, recording its time and size in the stats of the location (see `status.recording`)."""
+        with status.timed("fetch"):
+            response = fetch.get(url, **kwargs)
+        if not kwargs.get("stream"):
+            status.add_bytes(len(response.content))
+        return response
+
+    def iter_chunks(self, response: requests.Response, digest=None) -> Iterator[bytes]:
+        """The content of a streamed `response` in chunks, also fed to the hash object `digest` if given."""
+        chunks = iter(response.iter_content(self.chunk_size))
+        while True:
+            with status.timed("fetch"):
+                chunk = next(chunks, None)
+            if chunk is None:
+                return
+            status.add_bytes(len(chunk))
+            if digest is not None:
+                digest.update(chunk)
+            yield chunk
+
+    @contextlib.contextmanager
+    def download(self, url: str):
+        """
+        Streams `url` in chunks into a temporary file and hashes it on the way. Yields the path of the file and its
+        SHA-256 digest; the file is removed afterwards.
+        """
+        digest = hashlib.sha256()
+        response: requests.Response = self.fetch_url(url, stream=True)
+        try:
+            with tempfile.NamedTemporaryFile() as temp_file:
+                for chunk in self.iter_chunks(response, digest):
+                    temp_file.write(chunk)
+                temp_file.flush()
+                yield temp_file.name, digest.hexdigest()
+        finally:
+            response.close()
+
+    def cached_digest(self, digest: str, parse: Callable[[], Optional[Dict[date, Menu]]], *context):
+        """
+        Returns `parse()`, the menus parsed from the source with the SHA-256 `digest` (see `download`). If a cache is
+        set and the same source has been parsed with the same `context` (e.g. location or calendar week) before, the
+        cached menus are returned instead.
+        """
+        status.add_source(digest)
+        if self.cache is None:
+            return parse()
+        key = self.cache.digest_key(digest, type(self).__name__, *context)
+        menus = self.cache.get(key)
+        if menus is None:
+            menus = parse()
+            # failures are not cached, they might go away with the next run
+            if menus is not None:
+                self.cache.put(key, menus)
+        return menus
+
+    def parse(self, location: str, window: Optional[DateWindow] = None):
+        """Returns all menus of the location by date, or None if no menu could be retrieved."""
+        menus: Dict[date, Menu] = dict()
+        for menu in self.iter_menus(location, window):
+            menus[menu.menu_date] = menu
+        return menus if menus else None
+
     @abstractmethod
-    def parse(self, location: str):
+    def iter_menus(self, location: str, window: Optional[DateWindow] = None) -> Iterator[Menu]:
+        """
+        Yields the menus of the location as soon as they are parsed, e.g. PDF by PDF. If a `window` is given, only the
+        days within it are parsed and yielded.
+        """
         pass
 
+    @staticmethod
+    def find_until(terminator: Pattern, text: str, continued: Optional[Pattern] = None) -> List[Tuple[str, Match]]:
+        """
+        Linear time equivalent of `re.findall("(.+?)" + terminator, text)` for a text without line breaks: the text
+        before every match of `terminator` and the match. The regex would try every start position and scan to the end
+        of the text from each one if the terminator does not follow, which is quadratic in the length of the text.
+
+        A `terminator` which only starts at the first digit of a number is given with its `continued` form without
+        that condition: the regex also matches the rest of a number whose first digit is the last character before.
+        """
+        found: List[Tuple[str, Match]] = list()
+        start = 0
+        while True:
+            match = None
+            if continued is not None and text[start:start + 1].isdigit():
+                match = continued.match(text, start + 1)
+            # `.+?` takes at least one character
+            if match is None:
+                match = terminator.search(text, start + 1)
+            if match is None:
+                return found
+            found.append((text[start:match.start()], match))
+            start = match.end()
+
+    def within_budget(self, text: str, what) -> bool:
+        """Whether `text` is short enough to be parsed, see `max_day_length`."""
+        if len(text) <= self.max_day_length:
+            return True
+        print("Warning: Skipping %s, its text is %d characters long." % (what, len(text)))
+        return False
+
+    @staticmethod
+    def outside_window(window: Optional[DateWindow], year: Optional[int], week_number: Optional[int]) -> bool:
+        """Whether the week of a PDF is known to be outside of the window, so it does not need to be downloaded."""
+        if window is None or year is None or week_number is None:
+            return False
+        try:
+            return not window.overlaps_week(year, week_number)
+        except ValueError:
+            # no valid calendar week, better download it
+            return False
+
+    @staticmethod
+    def in_window(menus: Optional[Dict[date, Menu]], window: Optional[DateWindow]) -> List[Menu]:
+        if menus is None:
+            return []
+        return [menu for menu in menus.values() if window is None or menu.menu_date in window]
+
 
 class StudentenwerkMenuParser(MenuParser):
     # Prices taken from: https://www.studentenwerk-muenchen.de/mensa/mensa-preise/
@@ -147,42 +301,14 @@ class StudentenwerkMenuParser(MenuParser):
         # Fall back to the old price
         return StudentenwerkMenuParser.prices_mesa_weihenstephan_mensa_lothstrasse.get(dish[0], Prices())
 
-    # Some of the locations do not use the general Studentenwerk system and do not have a location id.
-    # It differs how they publish their menus — probably everyone needs an own parser.
-    # For documentation they are in the list but commented out.
-    location_id_mapping: Dict[str, int] = {
-        "mensa-arcisstr": 421,
-        "mensa-arcisstrasse": 421,  # backwards compatibility
-        "mensa-garching": 422,
-        "mensa-leopoldstr": 411,
-        "mensa-lothstr": 431,
-        "mensa-martinsried": 412,
-        "mensa-pasing": 432,
-        "mensa-weihenstephan": 423,
-        "stubistro-arcisstr": 450,
-        # "stubistro-benediktbeuern": ,
-        "stubistro-goethestr": 418,
-        "stubistro-großhadern": 414,
-        "stubistro-grosshadern": 414,
-        "stubistro-rosenheim": 441,
-        "stubistro-schellingstr": 416,
-        # "stubistro-schillerstr": ,
-        "stucafe-adalbertstr": 512,
-        "stucafe-akademie-weihenstephan": 526,
-        # "stucafe-audimax" ,
-        "stucafe-boltzmannstr": 527,
-        "stucafe-garching": 524,
-        # "stucafe-heßstr": ,
-        "stucafe-karlstr": 532,
-        # "stucafe-leopoldstr": ,
-        # "stucafe-olympiapark": ,
-        "stucafe-pasing": 534,
-        # "stucafe-weihenstephan": ,
-    }
+    # The Studentenwerk location id of every location and alias in the registry (see `locations.py`). Locations which
+    # do not use the general Studentenwerk system are listed there with an own parser, those whose id is not known yet
+    # without an id.
+    location_id_mapping: Dict[str, int] = locations.studentenwerk_ids()
 
     base_url: str = "http://www.studentenwerk-muenchen.de/mensa/speiseplan/speiseplan_{}_-de.html"
 
-    def parse(self, location: str):
+    def iter_menus(self, location: str, window: Optional[DateWindow] = None):
         """`location` can be either the numeric location id or its string alias as defined in `location_id_mapping`"""
         try:
             location_id: int = int(location)
@@ -192,43 +318,109 @@ class StudentenwerkMenuParser(MenuParser):
             except KeyError:
                 print("Location {} not found. Choose one of {}.".format(
                     location, ', '.join(self.location_id_mapping.keys())), sys.stderr)
-                return None
+                return
 
         page_link: str = self.base_url.format(location_id)
 
-        page: requests.Response = requests.get(page_link)
-        tree: html.Element = html.fromstring(page.content)
-        return self.get_menus(tree, location)
+        # an unchanged page is not even downloaded again, its menus are taken from the cache
+        headers: Dict[str, str] = dict()
+        known = self.cache.validators(page_link) if self.cache is not None else None
+        cached_menus = None
+        if known is not None:
+            cached_menus = self.cache.get(self.cache.digest_key(known["digest"], type(self).__name__, location))
+        if cached_menus is not None:
+            if known.get("etag"):
+                headers["If-None-Match"] = known["etag"]
+            if known.get("last_modified"):
+                headers["If-Modified-Since"] = known["last_modified"]
+
+        # parse the days while the page is still loading
+        page: requests.Response = self.fetch_url(page_link, stream=True, headers=headers)
+        if page.status_code == 304 and cached_menus is not None:
+            page.close()
+            status.add_source(known["digest"])
+            yield from self.in_window(cached_menus, window)
+            return
+        digest = hashlib.sha256()
+        menus: Dict[date, Menu] = dict()
+        try:
+            for menu in self.iter_streamed_daily_menus(self.iter_chunks(page, digest), location, window):
+                if self.cache is not None:
+                    menus[menu.menu_date] = menu
+                yield menu
+        finally:
+            page.close()
+        status.add_source(digest.hexdigest())
+        # the days of a window are only a part of the page
+        if self.cache is not None and window is None and menus:
+            self.cache.put(self.cache.digest_key(digest.hexdigest(), type(self).__name__, location), menus)
+            self.cache.put_validators(page_link, digest.hexdigest(), page.headers.get("ETag"),
+                                      page.headers.get("Last-Modified"))
 
     def get_menus(self, page: html.Element, location: str):
         # initialize empty dictionary
         menus: Dict[date, Menu] = dict()
-        # convert passed date to string
+        for menu in self.iter_daily_menus(page, location):
+            # add menu object to dictionary using the date as key
+            menus[menu.menu_date] = menu
+
+        # return the menu for the requested date; if no menu exists, None is returned
+        return menus
+
+    def iter_daily_menus(self, page: html.Element, location: str, window: Optional[DateWindow] = None):
         # get all available daily menus
         daily_menus: html.Element = self.__get_daily_menus_as_html(page)
 
         # iterate through daily menus
         for daily_menu in daily_menus:
-            # get html representation of current menu
-            menu_html = html.fromstring(html.tostring(daily_menu))
-            # get the date of the current menu; some string modifications are necessary
-            current_menu_date_str = menu_html.xpath("//strong/text()")[0]
-            # parse date
-            try:
-                current_menu_date: date = util.parse_date(current_menu_date_str)
-            except ValueError:
-                print("Warning: Error during parsing date from html page. Problematic date: %s" % current_menu_date_str)
-                # continue and parse subsequent menus
+            menu = self.__parse_daily_menu(daily_menu, location, window)
+            if menu is not None:
+                yield menu
+
+    def iter_streamed_daily_menus(self, chunks: Iterable[bytes], location: str, window: Optional[DateWindow] = None):
+        """
+        Like `iter_daily_menus`, for a page which is still loading: the `chunks` of the page are fed to an incremental
+        parser and every day is yielded as soon as its element is complete. Finished days are removed from the tree,
+        so only the day being loaded is held in memory.
+        """
+        parser = etree.HTMLPullParser(events=("end",), tag="div")
+        for chunk in chunks:
+            parser.feed(chunk)
+            yield from self.__read_daily_menus(parser, location, window)
+        parser.close()
+        yield from self.__read_daily_menus(parser, location, window)
+
+    def __read_daily_menus(self, parser: etree.HTMLPullParser, location: str, window: Optional[DateWindow]):
+        for _, element in parser.read_events():
+            if element.get("class") != "c-schedule__item":
                 continue
-            # parse dishes of current menu
-            dishes: List[Dish] = self.__parse_dishes(menu_html, location)
-            # create menu object
-            menu: Menu = Menu(current_menu_date, dishes)
-            # add menu object to dictionary using the date as key
-            menus[current_menu_date] = menu
-
-        # return the menu for the requested date; if no menu exists, None is returned
-        return menus
+            menu = self.__parse_daily_menu(element, location, window)
+            # drop the day and everything before it
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+            if menu is not None:
+                yield menu
+
+    def __parse_daily_menu(self, daily_menu, location: str, window: Optional[DateWindow] = None) -> Optional[Menu]:
+        # get the date of the current menu; some string modifications are necessary
+        current_menu_date_str = daily_menu.xpath(".//strong/text()")[0]
+        # parse date
+        try:
+            current_menu_date: date = util.parse_date(current_menu_date_str)
+        except ValueError:
+            print("Warning: Error during parsing date from html page. Problematic date: %s" % current_menu_date_str)
+            # continue and parse subsequent menus
+            return None
+        # skip days outside of the window before extracting their dishes
+        if window is not None and current_menu_date not in window:
+            return None
+        # get html representation of current menu
+        menu_html = html.fromstring(html.tostring(daily_menu))
+        # parse dishes of current menu
+        dishes: List[Dish] = self.__parse_dishes(menu_html, location)
+        # create menu object
+        return Menu(current_menu_date, dishes)
 
     @staticmethod
     def __get_daily_menus_as_html(page):
@@ -282,51 +474,50 @@ class FMIBistroMenuParser(MenuParser):
     url = "http://www.wilhelm-gastronomie.de/"
     allergens = ["Gluten", "Laktose", "Milcheiweiß", "Hühnerei", "Soja", "Nüsse", "Erdnuss", "Sellerie", "Fisch",
                  "Krebstiere", "Weichtiere", "Sesam", "Senf", "Milch", "Ei"]
-    allergens_regex = r"(Allergene:((\s|\n)*(Gluten|Laktose|Milcheiweiß|Hühnerei|Soja|Nüsse|Erdnuss|Sellerie|Fisch|Krebstiere|Weichtiere|Sesam|Senf|Milch|Ei),?(?![\w-]))*)"
+    # "\s*" instead of "(\s|\n)*": the line break is a whitespace as well, matching it two ways lets the regex backtrack
+    allergens_regex = r"(Allergene:(\s*(Gluten|Laktose|Milcheiweiß|Hühnerei|Soja|Nüsse|Erdnuss|Sellerie|Fisch|Krebstiere|Weichtiere|Sesam|Senf|Milch|Ei),?(?![\w-]))*)"
     price_regex = r"\€\s\d+,\d+"
-    dish_regex = r".+?\€\s\d+,\d+"
+    # a dish is everything up to its price, see `MenuParser.find_until`
+    dish_end_regex = re.compile(price_regex)
+    pdftotext_args: List[str] = []
+
+    @staticmethod
+    def get_year_and_week(pdf_name: str, current_year: bool = True) -> Tuple[Optional[int], Optional[int]]:
+        """The current year stands in for a missing or garbled year, unless `current_year` is False (e.g. archives)."""
+        # Example PDF-name: Garching-Speiseplan_KW46_2017.pdf
+        # more examples: https://regex101.com/r/ATOHj3/3
+        wn_year_match = re.search(r"KW[^a-zA-Z1-9]*([1-9]+\d*)[^a-zA-Z1-9]*([1-9]+\d{3})?", pdf_name, re.IGNORECASE)
+        week_number = int(wn_year_match.group(1)) if wn_year_match else None
+        year = int(wn_year_match.group(2)) if wn_year_match and wn_year_match.group(2) else None
 
-    def parse(self, location):
+        today = datetime.today()
+        # a hacky way to detect when something is appended or prepended to the year (like 20181 for year 2018)
+        # TODO probably replace year abnormality by a better method
+        if (year != today.year and str(today.year) in str(year)) or year is None:
+            year = today.year if current_year else None
+        return year, week_number
+
+    def iter_menus(self, location, window: Optional[DateWindow] = None):
         # get web page of bistro
-        page = requests.get(self.url)
+        page = self.fetch_url(self.url)
         # get html tree
         tree = html.fromstring(page.content)
         # get url of current pdf menu
         xpath_query = tree.xpath("//a[contains(@href, 'Garching-KW')]/@href")
 
-        if len(xpath_query) < 1:
-            return None
-
-        menus = {}
         for pdf_url in xpath_query:
-            # Example PDF-name: Garching-Speiseplan_KW46_2017.pdf
-            # more examples: https://regex101.com/r/ATOHj3/3
-            pdf_name = pdf_url.split("/")[-1]
-            wn_year_match = re.search(r"KW[^a-zA-Z1-9]*([1-9]+\d*)[^a-zA-Z1-9]*([1-9]+\d{3})?", pdf_name, re.IGNORECASE)
-            week_number = int(wn_year_match.group(1)) if wn_year_match else None
-            year = int(wn_year_match.group(2)) if wn_year_match and wn_year_match.group(2) else None
-
-            today = datetime.today()
-            # a hacky way to detect when something is appended or prepended to the year (like 20181 for year 2018)
-            # TODO probably replace year abnormality by a better method
-            if (year != today.year and str(today.year) in str(year)) or year is None:
-                year = today.year
-
-            with tempfile.NamedTemporaryFile() as temp_pdf:
-                # download pdf
-                response = requests.get(pdf_url)
-                temp_pdf.write(response.content)
-                with tempfile.NamedTemporaryFile() as temp_txt:
-                    # convert pdf to text by calling pdftotext
-                    call(["pdftotext", "-layout", temp_pdf.name, temp_txt.name])
-                    with open(temp_txt.name, 'r') as myfile:
-                        # read generated text file
-                        data = myfile.read()
-                        parsed_menus = self.get_menus(data, year, week_number)
-                        if parsed_menus is not None:
-                            menus.update(parsed_menus)
+            year, week_number = self.get_year_and_week(pdf_url.split("/")[-1])
+            # skip the pdfs of other weeks before downloading them
+            if self.outside_window(window, year, week_number):
+                continue
 
-        return menus
+            # stream the pdf to disk
+            with self.download(pdf_url) as (pdf_path, digest):
+                parsed_menus = self.cached_digest(
+                    digest,
+                    lambda: self.get_menus(self.pdf_file_to_text(pdf_path, self.pdftotext_args), year, week_number),
+                    year, week_number)
+            yield from self.in_window(parsed_menus, window)
 
     def get_menus(self, text, year, week_number):
         menus = {}
@@ -341,21 +532,14 @@ class FMIBistroMenuParser(MenuParser):
 
         lines = lines[count:]
         # we assume that the weeksdays are now all in the first line
-        pos_mon = lines[0].find("Montag")
-        pos_tue = lines[0].find("Dienstag")
-        pos_wed = lines[0].find("Mittwoch")
-        pos_thu = lines[0].find("Donnerstag")
-        pos_fri = lines[0].find("Freitag")
+        layout = ColumnLayout.from_header([key for key, _ in self.weekday_titles], lines[0],
+                                          [title for _, title in self.weekday_titles])
 
         # The text is formatted as table using whitespaces. Hence, we need to get those parts of each line that refer
         #  to the respective week day
-        lines_weekdays = {"mon": "", "tue": "", "wed": "", "thu": "", "fri": ""}
-        for line in lines:
-            lines_weekdays["mon"] += " " + line[pos_mon:pos_tue].replace("\n", " ").replace("Montag", "")
-            lines_weekdays["tue"] += " " + line[pos_tue:pos_wed].replace("\n", " ").replace("Dienstag", "")
-            lines_weekdays["wed"] += " " + line[pos_wed:pos_thu].replace("\n", " ").replace("Mittwoch", "")
-            lines_weekdays["thu"] += " " + line[pos_thu:pos_fri].replace("\n", " ").replace("Donnerstag", "")
-            lines_weekdays["fri"] += " " + line[pos_fri:].replace("\n", " ").replace("Freitag", "")
+        cells = self.table_extractor.cells(layout, lines)
+        lines_weekdays = {key: "".join([" " + cell.replace("\n", " ").replace(title, "") for cell in cells[key]])
+                          for key, title in self.weekday_titles}
 
         # currently, up to 5 dishes are on the menu
         num_dishes = 5
@@ -381,6 +565,8 @@ class FMIBistroMenuParser(MenuParser):
             # stop parsing day when bistro is closed at that day
             if "geschlossen" in lines_weekdays[key].lower():
                 continue
+            if not self.within_budget(lines_weekdays[key], "%s of week %s" % (key, week_number)):
+                continue
 
             # extract all allergens
             dish_allergens = []
@@ -398,7 +584,8 @@ class FMIBistroMenuParser(MenuParser):
             # remove no allergens indicator
             lines_weekdays[key] = lines_weekdays[key].replace("./.", "")
             # get all dish including name and price
-            dish_names = re.findall(self.dish_regex, lines_weekdays[key])
+            dish_names = [name + price.group(0) for name, price in self.find_until(self.dish_end_regex,
+                                                                                   lines_weekdays[key])]
             # get dish prices
             prices = re.findall(self.price_regex, ' '.join(dish_names))
             # convert prices to float
@@ -433,44 +620,43 @@ class IPPBistroMenuParser(MenuParser):
     split_days_regex_closed = re.compile(r'Aschermittwoch|Feiertag|Geschlossen', re.IGNORECASE)
     surprise_without_price_regex = re.compile(r"(Überraschungsmenü\s)(\s+[^\s\d]+)")
     """Detects the ‚Überraschungsmenü‘ keyword if it has not a price. The price is expected between the groups."""
-    dish_regex = re.compile(r"(.+?)(\d+,\d+|\?€)\s€[^)]")
+    # a dish is everything up to its price, see `MenuParser.find_until`; a price starts at the first of its digits
+    dish_end_regex = re.compile(r"((?<!\d)\d+,\d+|\?€)\s€[^)]")
+    dish_end_continued_regex = re.compile(r"(\d+,\d+|\?€)\s€[^)]")
+    # only convert first page to txt (-l 1)
+    pdftotext_args: List[str] = ["-l", "1"]
 
-    def parse(self, location):
-        page = requests.get(self.url)
+    @staticmethod
+    def get_year_and_week(pdf_name: str) -> Tuple[Optional[int], Optional[int]]:
+        # Example PDF-name: KW-48_27.11-01.12.10.2017-3.pdf
+        # more examples: https://regex101.com/r/hwdpFx/1
+        wn_year_match = re.search(r"KW[^a-zA-Z1-9]*([1-9]+\d*).*\d+\.\d+\.(\d+).*", pdf_name, re.IGNORECASE)
+        week_number = int(wn_year_match.group(1)) if wn_year_match else None
+        year = int(wn_year_match.group(2)) if wn_year_match else None
+        # convert 2-digit year into 4-digit year
+        year = 2000 + year if year is not None and len(str(year)) == 2 else year
+        return year, week_number
+
+    def iter_menus(self, location, window: Optional[DateWindow] = None):
+        page = self.fetch_url(self.url)
         # get html tree
         tree = html.fromstring(page.content)
         # get url of current pdf menu
         xpath_query = tree.xpath("//a[contains(@title, 'KW-')]/@href")
 
-        if len(xpath_query) < 1:
-            return None
-
-        menus = {}
         for pdf_url in xpath_query:
-            # Example PDF-name: KW-48_27.11-01.12.10.2017-3.pdf
-            pdf_name = pdf_url.split("/")[-1]
-            # more examples: https://regex101.com/r/hwdpFx/1
-            wn_year_match = re.search(r"KW[^a-zA-Z1-9]*([1-9]+\d*).*\d+\.\d+\.(\d+).*", pdf_name, re.IGNORECASE)
-            week_number = int(wn_year_match.group(1)) if wn_year_match else None
-            year = int(wn_year_match.group(2)) if wn_year_match else None
-            # convert 2-digit year into 4-digit year
-            year = 2000 + year if year is not None and len(str(year)) == 2 else year
-
-            with tempfile.NamedTemporaryFile() as temp_pdf:
-                # download pdf
-                response = requests.get(pdf_url)
-                temp_pdf.write(response.content)
-                with tempfile.NamedTemporaryFile() as temp_txt:
-                    # convert pdf to text by calling pdftotext; only convert first page to txt (-l 1)
-                    call(["pdftotext", "-l", "1", "-layout", temp_pdf.name, temp_txt.name])
-                    with open(temp_txt.name, 'r') as myfile:
-                        # read generated text file
-                        data = myfile.read()
-                        parsed_menus = self.get_menus(data, year, week_number)
-                        if parsed_menus is not None:
-                            menus.update(parsed_menus)
+            year, week_number = self.get_year_and_week(pdf_url.split("/")[-1])
+            # skip the pdfs of other weeks before downloading them
+            if self.outside_window(window, year, week_number):
+                continue
 
-        return menus
+            # stream the pdf to disk
+            with self.download(pdf_url) as (pdf_path, digest):
+                parsed_menus = self.cached_digest(
+                    digest,
+                    lambda: self.get_menus(self.pdf_file_to_text(pdf_path, self.pdftotext_args), year, week_number),
+                    year, week_number)
+            yield from self.in_window(parsed_menus, window)
 
     def get_menus(self, text, year, week_number):
         menus = {}
@@ -537,23 +723,18 @@ class IPPBistroMenuParser(MenuParser):
                 week_number, year, len(positions)))
             return None
 
-        pos_mon = positions[0][0]
-        pos_tue = positions[1][0]
-        pos_wed = positions[2][0]
-        pos_thu = positions[3][0]
-        pos_fri = positions[4][0]
+        layout = ColumnLayout.from_positions([key for key, _ in self.weekday_titles],
+                                             [start for start, _ in positions])
 
-        lines_weekdays = {"mon": "", "tue": "", "wed": "", "thu": "", "fri": ""}
         # it must be lines[3:] instead of lines[2:] or else the menus would start with "Preis ab 0,90€" (from the
         # soups) instead of the first menu, if there is a day where the bistro is closed.
-        for line in lines[soup_line_index + 3:]:
-            lines_weekdays["mon"] += " " + line[pos_mon:pos_tue].replace("\n", " ")
-            lines_weekdays["tue"] += " " + line[pos_tue:pos_wed].replace("\n", " ")
-            lines_weekdays["wed"] += " " + line[pos_wed:pos_thu].replace("\n", " ")
-            lines_weekdays["thu"] += " " + line[pos_thu:pos_fri].replace("\n", " ")
-            lines_weekdays["fri"] += " " + line[pos_fri:].replace("\n", " ")
+        cells = self.table_extractor.cells(layout, lines[soup_line_index + 3:])
+        lines_weekdays = {key: "".join([" " + cell.replace("\n", " ") for cell in cells[key]])
+                          for key, _ in self.weekday_titles}
 
         for key in lines_weekdays:
+            if not self.within_budget(lines_weekdays[key], "%s of week %s" % (key, week_number)):
+                continue
             # Appends `?€` to „Überraschungsmenü“ if it do not have a price. The second '€' is a separator for the
             # later split
             lines_weekdays[key] = self.surprise_without_price_regex.sub(r"\g<1>?€ € \g<2>", lines_weekdays[key])
@@ -562,7 +743,9 @@ class IPPBistroMenuParser(MenuParser):
             # remove multi-whitespaces
             lines_weekdays[key] = ' '.join(lines_weekdays[key].split())
             # get all dish including name and price
-            dish_names_price = re.findall(self.dish_regex, lines_weekdays[key] + ' ')
+            dish_names_price = [(name, price.group(1)) for name, price in self.find_until(self.dish_end_regex,
+                                                                                          lines_weekdays[key] + ' ',
+                                                                                          self.dish_end_continued_regex)]
             # create dish types
             # since we have the same dish types every day we can use them if there are 4 dishes available
             if len(dish_names_price) == 4:
@@ -593,8 +776,24 @@ class IPPBistroMenuParser(MenuParser):
 class MedizinerMensaMenuParser(MenuParser):
     startPageurl = "https://www.sv.tum.de/med/startseite/"
     baseUrl = "https://www.sv.tum.de"
-    ingredients_regex = r"(\s([A-C]|[E-H]|[K-P]|[R-Z]|[1-9])(,([A-C]|[E-H]|[K-P]|[R-Z]|[1-9]))*(\s|\Z))"
-    price_regex = r"(\d+(,(\d){2})\s?€)"
+    # the whitespace after the ingredients is only looked at, so the ingredients of the next word match in the same pass
+    ingredients_regex = r"(\s([A-C]|[E-H]|[K-P]|[R-Z]|[1-9])(,([A-C]|[E-H]|[K-P]|[R-Z]|[1-9]))*(?=\s|\Z))"
+    # starts at the first digit of a number only, otherwise every digit of a long number is tried as start
+    price_regex = r"((?<!\d)\d+(,(\d){2})\s?€)"
+    # the soups are in the left column, the main dishes in the middle one
+    day_layout = ColumnLayout(["soup", "mains"], [(0, 36), (40, 100)])
+    # only convert first page to txt (-l 1)
+    pdftotext_args: List[str] = ["-l", "1"]
+
+    @staticmethod
+    def get_year_and_week(pdf_name: str) -> Tuple[Optional[int], Optional[int]]:
+        # Example PDF-name: "KW_44_Herbst_4_Mensa_2018.pdf" or "KW_50_Winter_1_Mensa_-2018.pdf"
+        wn_year_match = re.search(r"KW_([1-9]+\d*)_.*_-?(\d+).*", pdf_name, re.IGNORECASE)
+        week_number = int(wn_year_match.group(1)) if wn_year_match else None
+        year = int(wn_year_match.group(2)) if wn_year_match else None
+        # convert 2-digit year into 4-digit year
+        year = 2000 + year if year is not None and len(str(year)) == 2 else year
+        return year, week_number
 
     def parse_dish(self, dish_str):
         # ingredients
@@ -618,8 +817,8 @@ class MedizinerMensaMenuParser(MenuParser):
 
         return Dish(dish_str, dish_price, dish_ingredients.ingredient_set, "Tagesgericht")
 
-    def parse(self, location):
-        page = requests.get(self.startPageurl)
+    def iter_menus(self, location, window: Optional[DateWindow] = None):
+        page = self.fetch_url(self.startPageurl)
         # get html tree
         tree = html.fromstring(page.content)
         # get url of current pdf menu
@@ -627,29 +826,20 @@ class MedizinerMensaMenuParser(MenuParser):
         xpath_query = tree.xpath("//a[contains(@href, 'Mensaplan/KW_')]/@href")
 
         if len(xpath_query) != 1:
-            return None
+            return
         pdf_url = self.baseUrl + xpath_query[0]
-
-        # Example PDF-name: "KW_44_Herbst_4_Mensa_2018.pdf" or "KW_50_Winter_1_Mensa_-2018.pdf"
-        pdf_name = pdf_url.split("/")[-1]
-        wn_year_match = re.search(r"KW_([1-9]+\d*)_.*_-?(\d+).*", pdf_name, re.IGNORECASE)
-        week_number = int(wn_year_match.group(1)) if wn_year_match else None
-        year = int(wn_year_match.group(2)) if wn_year_match else None
-        # convert 2-digit year into 4-digit year
-        year = 2000 + year if year is not None and len(str(year)) == 2 else year
-
-        with tempfile.NamedTemporaryFile() as temp_pdf:
-            # download pdf
-            response = requests.get(pdf_url)
-            temp_pdf.write(response.content)
-            with tempfile.NamedTemporaryFile() as temp_txt:
-                # convert pdf to text by calling pdftotext; only convert first page to txt (-l 1)
-                call(["pdftotext", "-l", "1", "-layout", temp_pdf.name, temp_txt.name])
-                with open(temp_txt.name, 'r') as myfile:
-                    # read generated text file
-                    data = myfile.read()
-                    menus = self.get_menus(data, year, week_number)
-                    return menus
+        year, week_number = self.get_year_and_week(pdf_url.split("/")[-1])
+        # skip the pdf of another week before downloading it
+        if self.outside_window(window, year, week_number):
+            return
+
+        # stream the pdf to disk
+        with self.download(pdf_url) as (pdf_path, digest):
+            menus = self.cached_digest(
+                digest,
+                lambda: self.get_menus(self.pdf_file_to_text(pdf_path, self.pdftotext_args), year, week_number),
+                year, week_number)
+        yield from self.in_window(menus, window)
 
     def get_menus(self, text, year, week_number):
         menus = {}
@@ -696,11 +886,9 @@ class MedizinerMensaMenuParser(MenuParser):
 
         for key in days:
             day_lines = unicodedata.normalize("NFKC", days[key]).splitlines(True)
-            soup_str = ""
-            mains_str = ""
-            for day_line in day_lines:
-                soup_str += day_line[:36].strip() + "\n"
-                mains_str += day_line[40:100].strip() + "\n"
+            cells = self.table_extractor.cells(self.day_layout, day_lines)
+            soup_str = "".join([cell.strip() + "\n" for cell in cells["soup"]])
+            mains_str = "".join([cell.strip() + "\n" for cell in cells["mains"]])
 
             soup_str = soup_str.replace("-\n", "").strip().replace("\n", " ")
             soup = self.parse_dish(soup_str)
@@ -1,36 +1,160 @@
-from pyopenmensa.feed import LazyBuilder
-from datetime import date
-
-def openmensa(weeks, directory):
-    canteen = weeksToCanteenFeed(weeks)
-
-    writeFeedToFile(canteen, directory)
-
-def weeksToCanteenFeed(weeks):
-    canteen = LazyBuilder() # canteen container
-    # iterate through weeks
-    for calendar_week in weeks:
-        # get Week object
-        week = weeks[calendar_week]
-        # get year of calendar week
-        days = week.days
-
-        # iterate through days
-        for menu in days:
-
-            # iterate through dishes
-            for dish in menu.dishes:
-                addDishToCanteen(dish, menu.menu_date, canteen)
-
-    return canteen
-
-def addDishToCanteen(dish, date, canteen):
-    if type(dish.prices.students.base_price) is float:
-        prices = {'other': dish.prices.students.base_price}
-    else:
-        prices = {}
-    canteen.addMeal(date, 'Speiseplan', dish.name, prices=prices)
-
-def writeFeedToFile(canteen, directory):
-    with open("%s/feed.xml" % (str(directory)), 'w') as outfile:
-        outfile.write(canteen.toXMLFeed())
+import filecmp
+import hashlib
+import json
+import os
+from typing import Dict, List
+
+from lxml import etree
+from datetime import date, datetime, timezone
+
+import util
+from entities import Prices
+from locations import canteens_file
+from output import encode_json, temp_file, write_atomic
+
+namespace = 'http://openmensa.org/open-mensa-v2'
+xsi_namespace = 'http://www.w3.org/2001/XMLSchema-instance'
+schema_location = 'http://openmensa.org/open-mensa-v2 http://openmensa.org/open-mensa-v2.xsd'
+# OpenMensa roles and the matching attribute of `Prices`
+roles = (('student', 'students'), ('employee', 'staff'), ('other', 'guests'))
+# where the published feeds can be found
+default_base_url = 'https://tum-dev.github.io/eat-api'
+# the OpenMensa v2 split: a small meta feed pointing to a "today" feed and a "full" feed
+feed_names = {'today': 'today.xml', 'full': 'feed.xml', 'meta': 'meta.xml'}
+state_name = 'feeds.json'
+
+
+def pricesToRoles(prices: Prices) -> Dict[str, int]:
+    # OpenMensa prices are in cent; prices which depend on the weight can not be expressed and are left out
+    role_prices = {}
+    for role, attribute in roles:
+        price = getattr(prices, attribute)
+        if isinstance(price.base_price, float) and not price.price_per_unit:
+            role_prices[role] = int(round(price.base_price * 100))
+    return role_prices
+
+def pricesToNotes(prices: Prices) -> List[str]:
+    # weight based prices (e.g. self-service) are added as note instead
+    notes = []
+    for role, attribute in roles:
+        price = getattr(prices, attribute)
+        if isinstance(price.base_price, float) and price.price_per_unit and price.unit:
+            notes.append("{}: {:.2f}€ + {:.2f}€ / {}".format(role, price.base_price, price.price_per_unit, price.unit))
+    return notes
+
+def menuToDayElement(menu):
+    day = etree.Element('{%s}day' % namespace, date=str(menu.menu_date), nsmap={None: namespace})
+    if not menu.dishes:
+        etree.SubElement(day, '{%s}closed' % namespace)
+        return day
+    category = etree.SubElement(day, '{%s}category' % namespace, name='Speiseplan')
+    for dish in menu.dishes:
+        meal = etree.SubElement(category, '{%s}meal' % namespace)
+        etree.SubElement(meal, '{%s}name' % namespace).text = dish.name
+        for note in sorted(pricesToNotes(dish.prices)):
+            etree.SubElement(meal, '{%s}note' % namespace).text = note
+        role_prices = pricesToRoles(dish.prices)
+        for role in sorted(role_prices):
+            etree.SubElement(meal, '{%s}price' % namespace, role=role).text = "{}.{:0>2}".format(
+                role_prices[role] // 100, role_prices[role] % 100)
+    return day
+
+def writeMenusFeed(menus, path):
+    # the days are written one by one, so the feed is never held in memory as a whole
+    with etree.xmlfile(path, encoding='UTF-8') as xf:
+        xf.write_declaration()
+        with xf.element('{%s}openmensa' % namespace, nsmap={None: namespace, 'xsi': xsi_namespace},
+                        attrib={'version': '2.1', '{%s}schemaLocation' % xsi_namespace: schema_location}):
+            with xf.element('{%s}canteen' % namespace):
+                for menu in menus:
+                    xf.write(menuToDayElement(menu), pretty_print=True)
+                    xf.flush()
+
+def writeMetaFeed(canteen, location, base_url, path):
+    root = etree.Element('{%s}openmensa' % namespace, nsmap={None: namespace, 'xsi': xsi_namespace},
+                         attrib={'version': '2.1', '{%s}schemaLocation' % xsi_namespace: schema_location})
+    canteen_element = etree.SubElement(root, '{%s}canteen' % namespace)
+    etree.SubElement(canteen_element, '{%s}name' % namespace).text = canteen.get('name', location)
+    canteen_location = canteen.get('location', {})
+    if 'address' in canteen_location:
+        etree.SubElement(canteen_element, '{%s}address' % namespace).text = canteen_location['address']
+    if 'latitude' in canteen_location and 'longitude' in canteen_location:
+        etree.SubElement(canteen_element, '{%s}location' % namespace, latitude=str(canteen_location['latitude']),
+                         longitude=str(canteen_location['longitude']))
+    # the "today" feed is cheap, so it can be polled often during opening hours
+    for priority, (feed_name, schedule) in enumerate((
+            ('today', {'hour': '8-14', 'minute': '0,30', 'retry': '30 1'}),
+            ('full', {'dayOfWeek': '*', 'hour': '10,22', 'retry': '60 5 1440'}))):
+        feed = etree.SubElement(canteen_element, '{%s}feed' % namespace, name=feed_name, priority=str(priority))
+        etree.SubElement(feed, '{%s}schedule' % namespace, attrib=schedule)
+        etree.SubElement(feed, '{%s}url' % namespace).text = '%s/%s/%s' % (base_url, location, feed_names[feed_name])
+    etree.ElementTree(root).write(path, encoding='UTF-8', xml_declaration=True, pretty_print=True)
+
+def loadCanteen(location):
+    with open(canteens_file, 'r') as infile:
+        for canteen in json.load(infile):
+            if canteen['canteen_id'] == location:
+                return canteen
+    return {}
+
+def replaceIfChanged(temp_path, path):
+    # keep the existing file (and its modification time) if the content did not change
+    if os.path.isfile(path) and filecmp.cmp(temp_path, path, shallow=False):
+        os.unlink(temp_path)
+        return False
+    os.replace(temp_path, path)
+    return True
+
+def writeFeeds(menus, directory, location, base_url=default_base_url, today=None, state_directory=None):
+    """
+    Writes the full, the "today" and the meta feed of `menus` (as returned by `MenuParser.parse`) to `directory`.
+    Feeds are only rewritten if their content changed. The "lastModified" timestamp and the SHA-256 of every feed are
+    kept in "<state_directory>/<location>.json" (default: "openmensa" in `util.default_cache_dir()`), so they survive
+    a fresh output directory, and are published as "feeds.json" next to the feeds. A timestamp changes only with the
+    content of its feed.
+    """
+    if today is None:
+        today = date.today()
+    directory = str(directory)
+    if state_directory is None:
+        state_directory = os.path.join(util.default_cache_dir(), "openmensa")
+    state = loadFeedState(os.path.join(str(state_directory), '%s.json' % location),
+                          os.path.join(directory, state_name))
+
+    all_menus = sorted(menus.values(), key=lambda menu: menu.menu_date)
+    writers = {
+        'full': lambda path: writeMenusFeed(all_menus, path),
+        'today': lambda path: writeMenusFeed([menu for menu in all_menus if menu.menu_date == today], path),
+        'meta': lambda path: writeMetaFeed(loadCanteen(location), location, base_url, path),
+    }
+    now = datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+    for feed_name, writer in writers.items():
+        path = os.path.join(directory, feed_names[feed_name])
+        fd, temp_path = temp_file(path)
+        os.close(fd)
+        writer(temp_path)
+        with open(temp_path, 'rb') as infile:
+            digest = hashlib.sha256(infile.read()).hexdigest()
+        changed = replaceIfChanged(temp_path, path)
+        feed = state.get(feed_name)
+        if feed is not None and 'sha256' in feed:
+            # the published feed might be gone, e.g. in a fresh checkout, so the hash decides
+            changed = feed['sha256'] != digest
+        if changed or feed is None:
+            feed = {'url': '%s/%s/%s' % (base_url, location, feed_names[feed_name]), 'lastModified': now}
+        feed['sha256'] = digest
+        state[feed_name] = feed
+
+    write_atomic(os.path.join(str(state_directory), '%s.json' % location), encode_json(state))
+    # the state file is hard linked into new trees by `output.new_tree`, so it must never be modified in place
+    write_atomic(os.path.join(directory, state_name), encode_json(state))
+    return state
+
+
+def loadFeedState(*paths):
+    """The first feed state found at `paths`, an empty one if there is none."""
+    for path in paths:
+        if os.path.isfile(path):
+            with open(path, 'r') as infile:
+                return json.load(infile)
+    return {}
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import json
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+
+# read once, as changing the umask to read it is not thread safe
+_umask = os.umask(0)
+os.umask(_umask)
+
+
+def temp_file(path):
+    """
+    Creates a temporary file next to `path`, so it can be renamed onto it, and returns its descriptor and path. The
+    file gets the mode of `path`, or of a new file created with `open` if there is none (mkstemp would make it 0600).
+    """
+    directory = os.path.dirname(str(path))
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory or ".", prefix=".tmp-")
+    try:
+        mode = stat.S_IMODE(os.stat(str(path)).st_mode)
+    except OSError:
+        mode = 0o666 & ~_umask
+    if hasattr(os, "fchmod"):
+        os.fchmod(fd, mode)
+    return fd, temp_path
+
+
+def write_atomic(path, data: bytes):
+    # write to a temporary file in the same directory first, so that readers never see a half written file
+    fd, temp_path = temp_file(path)
+    try:
+        with os.fdopen(fd, 'wb') as outfile:
+            outfile.write(data)
+        os.replace(temp_path, str(path))
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+@contextlib.contextmanager
+def atomic_open(path, mode='w'):
+    """Like `open`, but the file is written to a temporary file which replaces `path` once it is closed."""
+    fd, temp_path = temp_file(path)
+    try:
+        with os.fdopen(fd, mode, **({} if 'b' in mode else {'encoding': 'utf-8'})) as outfile:
+            yield outfile
+        os.replace(temp_path, str(path))
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def encode_json(obj) -> bytes:
+    # the format of all JSON files of the API
+    return json.dumps(obj, indent=4, ensure_ascii=False).encode("utf-8")
+
+
+def sync(paths: List[str]):
+    # a single sync of the whole file system is much cheaper than a fsync per file
+    if hasattr(os, "sync"):
+        os.sync()
+        return
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class OutputWriter:
+    """
+    Writes a batch of files with a pool of `workers` threads. Every file is written to a temporary file next to it
+    first. `commit` syncs all of them at once and renames them onto their targets, so readers only ever see complete
+    files. Without a `commit` (e.g. if the batch fails), `abort` removes the temporary files and nothing changes.
+
+    Can be used as context manager, which commits on success and aborts on errors.
+    """
+
+    def __init__(self, workers: int = 4, durable: bool = True):
+        self.durable = durable
+        self.pool = ThreadPoolExecutor(max_workers=max(1, workers))
+        self.lock = threading.Lock()
+        self.futures: List[Future] = list()
+        # target path -> temporary file; a later write of the same path replaces the earlier one
+        self.pending: Dict[str, str] = dict()
+
+    def _write(self, path: str, data: bytes):
+        fd, temp_path = temp_file(path)
+        try:
+            with os.fdopen(fd, 'wb') as outfile:
+                outfile.write(data)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        with self.lock:
+            replaced = self.pending.get(path)
+            self.pending[path] = temp_path
+        if replaced is not None:
+            os.unlink(replaced)
+
+    def write(self, path, data: bytes) -> Future:
+        future = self.pool.submit(self._write, str(path), data)
+        with self.lock:
+            self.futures.append(future)
+        return future
+
+    def write_json(self, path, obj) -> Future:
+        # encoding happens in the pool as well
+        future = self.pool.submit(lambda: self._write(str(path), encode_json(obj)))
+        with self.lock:
+            self.futures.append(future)
+        return future
+
+    def wait(self):
+        """Waits for all writes so far and raises the first error."""
+        with self.lock:
+            futures, self.futures = self.futures, list()
+        for future in futures:
+            future.result()
+
+    def commit(self):
+        """Moves all files written so far into place. Returns the number of files."""
+        self.wait()
+        with self.lock:
+            pending, self.pending = self.pending, dict()
+        if self.durable and pending:
+            sync(list(pending.values()))
+        for path in sorted(pending):
+            os.replace(pending[path], path)
+        return len(pending)
+
+    def abort(self):
+        try:
+            self.wait()
+        except Exception:
+            pass
+        with self.lock:
+            pending, self.pending = self.pending, dict()
+        for temp_path in pending.values():
+            with contextlib.suppress(OSError):
+                os.unlink(temp_path)
+
+    def close(self):
+        self.pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self.commit()
+            else:
+                self.abort()
+        finally:
+            self.close()
+
+
+def new_tree(target, keep=()) -> str:
+    """
+    Creates an empty directory next to `target` to build the next version of the tree in. Files of the current tree
+    whose name is in `keep` are hard linked into it (they are only ever replaced, never modified in place).
+    """
+    target = os.path.abspath(str(target))
+    tree = tempfile.mkdtemp(dir=os.path.dirname(target),
+                            prefix="%s.%s-" % (os.path.basename(target), time.strftime("%Y%m%d-%H%M%S")))
+    # readable like a directory created by `os.makedirs`, as it gets served
+    os.chmod(tree, 0o755)
+
+    if keep and os.path.isdir(target):
+        current = os.path.realpath(target)
+        for dir_path, _, file_names in os.walk(current):
+            for file_name in file_names:
+                if file_name not in keep:
+                    continue
+                relative = os.path.relpath(os.path.join(dir_path, file_name), current)
+                os.makedirs(os.path.dirname(os.path.join(tree, relative)), exist_ok=True)
+                try:
+                    os.link(os.path.join(dir_path, file_name), os.path.join(tree, relative))
+                except OSError:
+                    shutil.copy2(os.path.join(dir_path, file_name), os.path.join(tree, relative))
+    return tree
+
+
+def swap_tree(target, tree, keep_old: bool = False) -> Optional[str]:
+    """
+    Switches the symlink `target` to the directory `tree` in one atomic rename, so readers of `target` see either the
+    old or the new tree. The old tree is removed unless `keep_old` is set. Returns the path of the old tree.
+
+    A plain directory at `target` (from before the first swap) is moved aside first, which is the only non atomic step.
+    """
+    target = os.path.abspath(str(target))
+    tree = os.path.abspath(str(tree))
+    old_tree = None
+    if os.path.islink(target):
+        old_tree = os.path.realpath(target)
+    elif os.path.isdir(target):
+        # renaming a directory onto an empty one replaces it
+        old_tree = new_tree(target)
+        os.rename(target, old_tree)
+
+    link = "%s.tmp-link" % target
+    if os.path.lexists(link):
+        os.unlink(link)
+    os.symlink(os.path.relpath(tree, os.path.dirname(target)), link)
+    os.replace(link, target)
+
+    if old_tree is not None and old_tree != tree and not keep_old:
+        shutil.rmtree(old_tree, ignore_errors=True)
+    return old_tree
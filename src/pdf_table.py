@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+class ColumnLayout:
+    """
+    The columns of a table: a name and the character span [start, end) of each column. An end of None means the
+    column reaches to the end of the line.
+    """
+    names: List[str]
+    spans: List[Tuple[int, Optional[int]]]
+
+    def __init__(self, names: Sequence[str], spans: Sequence[Tuple[int, Optional[int]]]):
+        if len(names) != len(spans):
+            raise ValueError("Got {} column names for {} columns.".format(len(names), len(spans)))
+        self.names = list(names)
+        self.spans = list(spans)
+
+    @staticmethod
+    def from_positions(names: Sequence[str], positions: Sequence[int]):
+        """Every column starts at its position and ends where the next one starts, the last one is open ended."""
+        ends: List[Optional[int]] = list(positions[1:])
+        ends.append(None)
+        return ColumnLayout(names, list(zip(positions, ends)))
+
+    @staticmethod
+    def from_header(names: Sequence[str], header: str, titles: Sequence[str]):
+        """Detects the columns by the position of their `titles` (e.g. the weekdays) in the `header` line."""
+        return ColumnLayout.from_positions(names, [header.find(title) for title in titles])
+
+    def __repr__(self):
+        return "ColumnLayout(%s)" % ", ".join("%s=%s" % (name, span) for name, span in zip(self.names, self.spans))
+
+
+class TableExtractor(ABC):
+    """
+    Splits the rows of a table into its columns. The cells of every column are collected in a list buffer per column,
+    so the parsers can join them at once in linear time instead of concatenating strings line by line.
+    """
+
+    @abstractmethod
+    def cells(self, layout: ColumnLayout, rows) -> Dict[str, List[str]]:
+        """Returns the cells of every column of `layout`, from top to bottom."""
+        pass
+
+
+class LayoutTextExtractor(TableExtractor):
+    """
+    Extracts the columns of the text produced by `pdftotext -layout`, where the table is formatted with whitespaces
+    and every column sits at fixed character offsets of each line.
+
+    A `pdftotext -bbox` based extractor can implement `TableExtractor` the same way and map the word coordinates to
+    the layout instead.
+    """
+
+    def cells(self, layout: ColumnLayout, rows: Sequence[str]) -> Dict[str, List[str]]:
+        buffers: List[List[str]] = [list() for _ in layout.spans]
+        for line in rows:
+            for buffer, (start, end) in zip(buffers, layout.spans):
+                buffer.append(line[start:end])
+        return dict(zip(layout.names, buffers))
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import cli
+from menu_parser import FMIBistroMenuParser, IPPBistroMenuParser, MedizinerMensaMenuParser
+
+fmi = FMIBistroMenuParser()
+ipp = IPPBistroMenuParser()
+mediziner = MedizinerMensaMenuParser()
+
+# every case: the matching step of a parser and a generator of adversarial input of a given length
+Case = Tuple[Callable[[str], object], Callable[[int], str]]
+
+
+def ipp_dishes(text: str):
+    return ipp.find_until(ipp.dish_end_regex, text, ipp.dish_end_continued_regex)
+
+
+def repeat(unit: str, size: int, prefix: str = "", suffix: str = "") -> str:
+    return prefix + unit * max(1, (size - len(prefix) - len(suffix)) // len(unit)) + suffix
+
+
+def cases() -> Dict[str, Case]:
+    """
+    The patterns of the text parsers with inputs which make backtracking regexes slow: long texts without the
+    terminator a lazy pattern scans for, long digit runs and ambiguous whitespace.
+    """
+    return OrderedDict([
+        ("fmi allergens, line breaks",
+         (lambda text: re.findall(fmi.allergens_regex, text),
+          lambda size: repeat("\n", size, "Allergene:", "Glutenx"))),
+        ("fmi allergens, list",
+         (lambda text: re.findall(fmi.allergens_regex, text),
+          lambda size: repeat("Gluten, \n", size, "Allergene:", "-"))),
+        ("fmi dishes, no price",
+         (lambda text: fmi.find_until(fmi.dish_end_regex, text), lambda size: repeat("Schnitzel ", size))),
+        ("fmi dishes, euro signs",
+         (lambda text: fmi.find_until(fmi.dish_end_regex, text), lambda size: repeat("€ ", size))),
+        ("ipp dishes, no price",
+         (ipp_dishes, lambda size: repeat("Schnitzel ", size))),
+        ("ipp dishes, numbers",
+         (ipp_dishes, lambda size: repeat("1,1 ", size))),
+        ("ipp dishes, digits",
+         (ipp_dishes, lambda size: repeat("1", size))),
+        ("ipp surprise menu",
+         (lambda text: ipp.surprise_without_price_regex.sub(r"\g<1>?€ € \g<2>", text),
+          lambda size: repeat(" ", size, "Überraschungsmenü "))),
+        ("mediziner ingredients",
+         (mediziner.parse_dish, lambda size: repeat(" A,B", size))),
+        ("mediziner ingredient lists",
+         (mediziner.parse_dish, lambda size: repeat(",B", size, " A", "x"))),
+        ("mediziner prices, digits",
+         (mediziner.parse_dish, lambda size: repeat("1", size))),
+    ])
+
+
+def measure(match: Callable[[str], object], text: str, repetitions: int = 3) -> float:
+    """The fastest of `repetitions` runs of `match` on `text` in seconds."""
+    best = math.inf
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        match(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def growth(sizes: Sequence[int], durations: Sequence[float]) -> float:
+    """The exponent k of duration ~ size^k between the two largest sizes: about 1 for linear, 2 for quadratic."""
+    (small, large), (fast, slow) = sizes[-2:], durations[-2:]
+    # below the resolution of the clock nothing can be told apart
+    fast, slow = max(fast, 1e-6), max(slow, 1e-6)
+    return math.log(slow / fast) / math.log(large / small)
+
+
+def run(sizes: Sequence[int] = (1000, 10000, 100000), repetitions: int = 3) -> Dict[str, Tuple[List[float], float]]:
+    """The durations of every case for all `sizes` and their growth."""
+    results: Dict[str, Tuple[List[float], float]] = OrderedDict()
+    for name, (match, generate) in cases().items():
+        durations = [measure(match, generate(size), repetitions) for size in sizes]
+        results[name] = (durations, growth(sizes, durations))
+    return results
+
+
+def main_regex_benchmark():
+    args = cli.parse_regex_benchmark_args()
+    sizes = sorted(args.sizes)
+    print("%-28s" % "case" + "".join("%14s" % ("%d chars" % size) for size in sizes) + "%8s" % "growth")
+    super_linear = list()
+    for name, (durations, exponent) in run(sizes, args.repetitions).items():
+        print("%-28s" % name + "".join("%13.4fs" % duration for duration in durations) + "%8.2f" % exponent)
+        if exponent > args.max_growth and durations[-1] > args.budget:
+            super_linear.append(name)
+    if super_linear:
+        print("Super-linear: %s" % ", ".join(super_linear))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main_regex_benchmark())
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+
+import json
+import mmap
+import os
+import struct
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import output
+from entities import Menu, Week
+
+# magic, offset of the index, length of the index
+header = struct.Struct("<8sQQ")
+magic = b"EATSNAP1"
+
+
+def encode(obj) -> bytes:
+    # served as is, so as compact as possible
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode("utf-8")
+
+
+def week_key(year: int, calendar_week: int) -> str:
+    return "%d-W%02d" % (year, calendar_week)
+
+
+class SnapshotWriter:
+    """
+    Packs pre-encoded JSON payloads into one snapshot file: a header, all payloads back to back and an index of their
+    offsets by (canteen_id, date) and (canteen_id, year, week) at the end.
+
+    The snapshot is written to a temporary file which replaces `path` in `close`, so readers of `path` always see a
+    complete snapshot. Can be used as context manager, which discards the snapshot on errors.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        fd, self.temp_path = output.temp_file(self.path)
+        self.file = os.fdopen(fd, 'wb')
+        self.file.write(header.pack(magic, 0, 0))
+        self.offset = header.size
+        self.index: Dict[str, Dict[str, Dict[str, List[int]]]] = {"days": dict(), "weeks": dict()}
+
+    def add(self, kind: str, canteen_id: str, key: str, payload: bytes):
+        self.file.write(payload)
+        self.index[kind].setdefault(canteen_id, dict())[key] = [self.offset, len(payload)]
+        self.offset += len(payload)
+
+    def add_day(self, canteen_id: str, menu_date: date, payload: bytes):
+        self.add("days", canteen_id, menu_date.isoformat(), payload)
+
+    def add_week(self, canteen_id: str, year: int, calendar_week: int, payload: bytes):
+        self.add("weeks", canteen_id, week_key(year, calendar_week), payload)
+
+    def add_menus(self, canteen_id: str, menus: Dict[date, Menu]):
+        """Adds the payload of every day and every ISO calendar week of `menus`, in the format of the API."""
+        for menu_date in sorted(menus):
+            self.add_day(canteen_id, menu_date, encode(menus[menu_date].to_json_obj()))
+        weeks = Week.to_iso_weeks(menus)
+        for key in sorted(weeks):
+            week = weeks[key]
+            self.add_week(canteen_id, week.year, week.calendar_week, encode(week.to_json_obj()))
+
+    def close(self):
+        index = encode(self.index)
+        self.file.write(index)
+        self.file.seek(0)
+        self.file.write(header.pack(magic, self.offset, len(index)))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        os.replace(self.temp_path, self.path)
+
+    def abort(self):
+        self.file.close()
+        os.unlink(self.temp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write(path, canteen_menus: Dict[str, Dict[date, Menu]]):
+    """Writes a snapshot of the menus of every canteen and swaps it in atomically."""
+    with SnapshotWriter(path) as writer:
+        for canteen_id in sorted(canteen_menus):
+            writer.add_menus(canteen_id, canteen_menus[canteen_id])
+
+
+class Snapshot:
+    """
+    Memory maps a snapshot file. The payloads are returned as `memoryview`s of the map, so nothing gets copied; or
+    as (offset, length) spans of `fileno()`, e.g. for `os.sendfile`.
+
+    A new snapshot replaces the file instead of changing it, so an open snapshot stays valid. `refresh` switches to
+    the current file of `path`.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.file = None
+        self.map = None
+        self.open()
+
+    def open(self):
+        file = open(self.path, 'rb')
+        try:
+            snapshot_map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            file.close()
+            raise
+        file_magic, index_offset, index_length = header.unpack_from(snapshot_map)
+        if file_magic != magic:
+            snapshot_map.close()
+            file.close()
+            raise ValueError("%s is no snapshot file." % self.path)
+        # the previous map stays alive as long as slices of it are in use
+        previous_file = self.file
+        self.file, self.map = file, snapshot_map
+        if previous_file is not None:
+            previous_file.close()
+        self.inode = os.fstat(file.fileno()).st_ino
+        self.index = json.loads(snapshot_map[index_offset:index_offset + index_length].decode("utf-8"))
+
+    def refresh(self) -> bool:
+        """Opens the snapshot at `path` if it got replaced since it was opened. Returns whether it did."""
+        try:
+            if os.stat(self.path).st_ino == self.inode:
+                return False
+        except OSError:
+            return False
+        self.open()
+        return True
+
+    def fileno(self) -> int:
+        return self.file.fileno()
+
+    def span(self, kind: str, canteen_id: str, key: str) -> Optional[Tuple[int, int]]:
+        entry = self.index[kind].get(canteen_id, {}).get(key)
+        return tuple(entry) if entry is not None else None
+
+    def day_span(self, canteen_id: str, menu_date: date) -> Optional[Tuple[int, int]]:
+        """The (offset, length) of the menu of the day, None if there is none."""
+        return self.span("days", canteen_id, menu_date.isoformat())
+
+    def week_span(self, canteen_id: str, year: int, calendar_week: int) -> Optional[Tuple[int, int]]:
+        return self.span("weeks", canteen_id, week_key(year, calendar_week))
+
+    def slice(self, span: Optional[Tuple[int, int]]) -> Optional[memoryview]:
+        if span is None:
+            return None
+        offset, length = span
+        return memoryview(self.map)[offset:offset + length]
+
+    def day(self, canteen_id: str, menu_date: date) -> Optional[memoryview]:
+        """The JSON of the menu of the day, None if there is none."""
+        return self.slice(self.day_span(canteen_id, menu_date))
+
+    def week(self, canteen_id: str, year: int, calendar_week: int) -> Optional[memoryview]:
+        """The JSON of the ISO calendar week, like `<year>/<week>.json` of the API, None if there is none."""
+        return self.slice(self.week_span(canteen_id, year, calendar_week))
+
+    def canteens(self) -> List[str]:
+        return sorted(set(self.index["days"]) | set(self.index["weeks"]))
+
+    def close(self):
+        """Closes the snapshot. All slices returned so far have to be released before."""
+        if self.map is not None:
+            self.map.close()
+            self.file.close()
+            self.map, self.file = None, None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
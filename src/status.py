@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import output
+from openmensa import canteens_file
+
+file_name = "status.json"
+stages = ("fetch", "convert", "parse")
+
+_local = threading.local()
+
+
+class SourceStats:
+    """What parsing one location took. Filled by the parser while it fetches, converts and parses its sources."""
+    durations: Dict[str, float]
+    bytes_downloaded: int
+    digests: List[str]
+
+    def __init__(self):
+        self.durations = {stage: 0.0 for stage in stages}
+        self.bytes_downloaded = 0
+        self.digests = list()
+
+    def source_hash(self) -> Optional[str]:
+        """The SHA-256 of the parsed source, or of the hashes of all sources if there are several (e.g. PDFs)."""
+        if not self.digests:
+            return None
+        if len(self.digests) == 1:
+            return self.digests[0]
+        return hashlib.sha256(" ".join(self.digests).encode("ascii")).hexdigest()
+
+    def add(self, other: "SourceStats"):
+        """Adds the fetch and convert stats of `other`, e.g. recorded in a worker process."""
+        for stage in ("fetch", "convert"):
+            self.durations[stage] += other.durations[stage]
+        self.bytes_downloaded += other.bytes_downloaded
+        self.digests.extend(other.digests)
+
+    def finish(self, total: float):
+        # parsing is whatever is left of the total time; streamed pages are parsed while they are fetched
+        self.durations["parse"] = max(0.0, total - self.durations["fetch"] - self.durations["convert"])
+
+
+@contextlib.contextmanager
+def recording():
+    """Records the stats of everything the current thread fetches and converts within the block."""
+    stats = SourceStats()
+    previous = getattr(_local, "stats", None)
+    _local.stats = stats
+    start = time.monotonic()
+    try:
+        yield stats
+    finally:
+        stats.finish(time.monotonic() - start)
+        _local.stats = previous
+
+
+def current() -> Optional[SourceStats]:
+    return getattr(_local, "stats", None)
+
+
+@contextlib.contextmanager
+def timed(stage: str):
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        stats = current()
+        if stats is not None:
+            stats.durations[stage] += time.monotonic() - start
+
+
+def add_bytes(count: int):
+    stats = current()
+    if stats is not None:
+        stats.bytes_downloaded += count
+
+
+def add_source(digest: str):
+    stats = current()
+    if stats is not None:
+        stats.digests.append(digest)
+
+
+def timestamp(seconds: Optional[float] = None) -> str:
+    return datetime.fromtimestamp(time.time() if seconds is None else seconds, timezone.utc) \
+        .replace(microsecond=0).isoformat()
+
+
+def canteen_ids() -> List[str]:
+    with open(canteens_file, 'r') as infile:
+        return [canteen["canteen_id"] for canteen in json.load(infile)]
+
+
+def load(directory) -> Dict[str, Dict[str, Any]]:
+    """The entries of the "status.json" in `directory` by canteen id, empty if there is none."""
+    try:
+        with open(os.path.join(str(directory), file_name), 'r') as infile:
+            return {entry["canteen_id"]: entry for entry in json.load(infile)["canteens"]}
+    except (OSError, ValueError, KeyError):
+        return dict()
+
+
+def location_status(location: str, state: str, attempt: str, previous: Optional[Dict[str, Any]] = None,
+                    stats: Optional[SourceStats] = None, total: Optional[float] = None, days: int = 0,
+                    dishes: int = 0) -> Dict[str, Any]:
+    """
+    The status of a location after an attempt at `attempt` (a timestamp). `state` is one of "ok", "stale", "failed"
+    and "missed_deadline"; the last success is carried over from the `previous` status unless the attempt is one.
+    """
+    last_success = attempt if state == "ok" else (previous or {}).get("last_success")
+    durations = dict(stats.durations) if stats is not None else {stage: None for stage in stages}
+    durations["total"] = total
+    return {"canteen_id": location, "state": state, "last_attempt": attempt, "last_success": last_success,
+            "durations": {stage: round(seconds, 3) if seconds is not None else None
+                          for stage, seconds in durations.items()},
+            "bytes_downloaded": stats.bytes_downloaded if stats is not None else 0,
+            "days": days, "dishes": dishes,
+            "source_hash": stats.source_hash() if stats is not None else None}
+
+
+def to_json_obj(statuses: Dict[str, Dict[str, Any]], previous: Dict[str, Dict[str, Any]],
+                locations: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    The "status.json" of a run: one entry for every location of `locations` (default: all of "canteens.json") and every
+    location of the run. Locations which were not part of the run keep their `previous` entry.
+    """
+    if locations is None:
+        locations = canteen_ids()
+    canteens = list()
+    for location in locations + [location for location in statuses if location not in locations]:
+        if location in statuses:
+            canteens.append(statuses[location])
+        elif location in previous:
+            canteens.append(previous[location])
+        else:
+            canteens.append({"canteen_id": location, "state": "unknown", "last_attempt": None, "last_success": None,
+                             "durations": {stage: None for stage in stages + ("total",)}, "bytes_downloaded": 0,
+                             "days": 0, "dishes": 0, "source_hash": None})
+    return {"generated": timestamp(), "canteens": canteens}
+
+
+def write(directory, obj: Dict[str, Any]):
+    output.write_atomic(os.path.join(str(directory), file_name), output.encode_json(obj))
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+import gzip
+import json
+import os
+import time
+from datetime import date, datetime
+from typing import Dict, Optional, Tuple
+
+import util
+from entities import Menu
+from output import write_atomic
+
+
+def dumps_menus(menus: Dict[date, Menu]) -> bytes:
+    """Serializes a menu dict (as returned by `MenuParser.parse`) into compact gzipped JSON."""
+    menus_json = json.dumps([menus[menu_date].to_json_obj() for menu_date in menus], separators=(',', ':'),
+                            ensure_ascii=False)
+    return gzip.compress(menus_json.encode("utf-8"))
+
+
+def loads_menus(data: bytes) -> Dict[date, Menu]:
+    menus: Dict[date, Menu] = dict()
+    for menu_obj in json.loads(gzip.decompress(data).decode("utf-8")):
+        menu = Menu.from_json_obj(menu_obj)
+        menus[menu.menu_date] = menu
+    return menus
+
+
+class LastKnownGoodStore:
+    """Keeps the last successful parse result of every location, so it can be served if a later parse fails."""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory if directory is not None else os.path.join(util.default_cache_dir(),
+                                                                              "last-known-good")
+
+    def path(self, location):
+        return os.path.join(self.directory, "%s.json.gz" % location)
+
+    def save(self, location, menus: Dict[date, Menu]):
+        write_atomic(self.path(location), dumps_menus(menus))
+
+    def load(self, location) -> Optional[Tuple[Dict[date, Menu], datetime]]:
+        """Returns the stored menus of the location and when they got stored, or None if there are none."""
+        path = self.path(location)
+        if not os.path.isfile(path):
+            return None
+        with open(path, 'rb') as infile:
+            try:
+                menus = loads_menus(infile.read())
+            except (OSError, ValueError, KeyError) as e:
+                print("Warning: Ignoring corrupt last known good menus of '%s': %s" % (location, e))
+                return None
+        return menus, datetime.fromtimestamp(os.path.getmtime(path))
+
+    def with_fallback(self, location, menus: Optional[Dict[date, Menu]], min_days: int = 1):
+        """
+        Stores `menus` if they contain at least `min_days` days. Otherwise the stored menus are returned instead.
+
+        Returns:
+            The menus to publish and whether they are stale, i.e. taken from the store.
+        """
+        if menus is not None and len(menus) >= min_days:
+            self.save(location, menus)
+            return menus, False
+
+        stored = self.load(location)
+        if stored is None:
+            return menus, False
+        stored_menus, stored_at = stored
+        print("Warning: Serving last known good menus of '%s' from %s (parsed %d day(s) only)." % (
+            location, stored_at.strftime("%Y-%m-%d %H:%M"), 0 if menus is None else len(menus)))
+        return stored_menus, True
+
+
+class MenuStore:
+    """
+    Date indexed menus of all locations as populated by the last batch run, so the menu of a single day can be looked
+    up without parsing: <directory>/<location>/<YYYY-MM-DD>.json
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory if directory is not None else os.path.join(util.default_cache_dir(), "menus")
+
+    def path(self, location, menu_date: date):
+        return os.path.join(self.directory, location, "%s.json" % menu_date.isoformat())
+
+    def put(self, location, menus: Dict[date, Menu]):
+        for menu_date in menus:
+            menu_json = json.dumps(menus[menu_date].to_json_obj(), separators=(',', ':'), ensure_ascii=False)
+            write_atomic(self.path(location, menu_date), menu_json.encode("utf-8"))
+
+    def get(self, location, menu_date: date, max_age: Optional[float] = None) -> Optional[Menu]:
+        """Returns the stored menu, or None if there is none or it is older than `max_age` seconds."""
+        path = self.path(location, menu_date)
+        try:
+            if max_age is not None and time.time() - os.path.getmtime(path) > max_age:
+                return None
+            with open(path, 'rb') as infile:
+                return Menu.from_json_obj(json.loads(infile.read().decode("utf-8")))
+        except (OSError, ValueError, KeyError):
+            return None
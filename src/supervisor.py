@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+import multiprocessing
+import multiprocessing.forkserver
+import os
+import signal
+import threading
+import time
+from datetime import date
+from typing import Callable, Dict, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import fetch
+import status
+import store
+from entities import Menu
+
+try:
+    import resource
+except ImportError:
+    # no resource limits on Windows, the wall clock limit still applies
+    resource = None
+
+# loaded once by the fork server instead of by every worker
+preload_modules = ["__main__", "menu_parser"]
+
+
+class WorkerError(Exception):
+    """Raised if a worker process died without a result, e.g. because it hit its CPU or memory limit."""
+
+
+class WorkerKilled(WorkerError):
+    """Raised if a worker process did not finish within its wall clock limit and got killed."""
+
+
+def available() -> bool:
+    return "forkserver" in multiprocessing.get_all_start_methods()
+
+
+def limit(cpu_seconds: Optional[float], memory_mb: Optional[int]):
+    """Applies the limits to the current process."""
+    if resource is None:
+        return
+    if cpu_seconds is not None:
+        # SIGXCPU at the soft limit, SIGKILL one second later
+        cpu_seconds = max(1, int(cpu_seconds))
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+    if memory_mb is not None:
+        memory = memory_mb * 2 ** 20
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+
+
+class FetchProxy:
+    """
+    Takes the place of `fetch.default_policy` in a worker process: every request is sent to the supervisor, which
+    fetches it with its own policy. So all workers share the rate limits and circuit breakers of the batch process.
+    Responses are transferred as a whole, streamed responses are served from memory.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        kwargs.pop("stream", None)
+        self.connection.send(("fetch", url, kwargs))
+        reply = self.connection.recv()
+        if reply[0] == "response":
+            _, status_code, headers, content, response_url, encoding = reply
+            return self.response(status_code, headers, content, response_url, encoding)
+        if reply[0] == "http_error":
+            _, message, status_code = reply
+            raise requests.HTTPError(message, response=self.response(status_code, {}, b"", url, None))
+        _, error_class, message = reply
+        raise error_class(message)
+
+    @staticmethod
+    def response(status_code: int, headers: Dict[str, str], content: bytes, url: str, encoding: Optional[str]):
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers = CaseInsensitiveDict(headers)
+        response.url = url
+        response.encoding = encoding
+        # a response which has been read completely already
+        response._content = content
+        response._content_consumed = True
+        return response
+
+
+def serve_fetch(url: str, kwargs) -> tuple:
+    """The reply to a request of a `FetchProxy`, fetched with `fetch.get` in the calling process."""
+    try:
+        response = fetch.get(url, **kwargs)
+        return "response", response.status_code, dict(response.headers), response.content, response.url, \
+            response.encoding
+    except requests.HTTPError as e:
+        return "http_error", str(e), e.response.status_code if e.response is not None else None
+    except requests.RequestException as e:
+        return "error", type(e), str(e)
+
+
+def work(parse: Callable[[str], Optional[Dict[date, Menu]]], location: str, connection,
+         cpu_seconds: Optional[float], memory_mb: Optional[int]):
+    """The body of a worker process."""
+    try:
+        limit(cpu_seconds, memory_mb)
+        fetch.default_policy = FetchProxy(connection)
+        with status.recording() as stats:
+            menus = parse(location)
+        connection.send(("result", store.dumps_menus(menus) if menus is not None else None, stats, None))
+    except BaseException as e:
+        connection.send(("result", None, None, "%s: %s" % (type(e).__name__, e)))
+    finally:
+        connection.close()
+
+
+class Supervisor:
+    """
+    Converts and parses every location in a worker process of its own. Each worker is limited to `cpu_seconds` of CPU
+    time and `memory_mb` MiB of address space (inherited by pdftotext) and gets killed if it does not finish within
+    `wall_seconds`. A hung or exploding parse thereby only costs its own location.
+
+    The workers are forked from a fork server, which is started with the supervisor before the batch starts any
+    threads, so no worker inherits a lock held by another thread. Their downloads are done by the calling thread of
+    `run` on behalf of the worker (see `FetchProxy`). The menus are sent back gzipped as compact JSON (see
+    `store.dumps_menus`).
+
+    `parse` has to be picklable, i.e. a module level function or a `functools.partial` of one.
+    """
+
+    def __init__(self, cpu_seconds: Optional[float] = 120, memory_mb: Optional[int] = 1024,
+                 wall_seconds: Optional[float] = 300):
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.wall_seconds = wall_seconds
+        self.context = multiprocessing.get_context("forkserver")
+        self.context.set_forkserver_preload(preload_modules)
+        multiprocessing.forkserver.ensure_running()
+        self.lock = threading.Lock()
+        # location -> its running worker
+        self.workers: Dict[str, multiprocessing.Process] = dict()
+
+    def run(self, parse: Callable[[str], Optional[Dict[date, Menu]]], location: str) -> Optional[Dict[date, Menu]]:
+        """
+        Returns `parse(location)`, run in a worker process. Its stats are added to the stats of the calling thread (see
+        `status.recording`). Raises `WorkerKilled` if the worker hung and `WorkerError` if it failed.
+        """
+        connection, worker_connection = self.context.Pipe()
+        worker = self.context.Process(target=work, daemon=True, name="parse-%s" % location,
+                                      args=(parse, location, worker_connection, self.cpu_seconds, self.memory_mb))
+        with self.lock:
+            self.workers[location] = worker
+        deadline = None if self.wall_seconds is None else time.monotonic() + self.wall_seconds
+        try:
+            worker.start()
+            # otherwise the pipe would not be closed when the worker dies
+            worker_connection.close()
+            while True:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                if not connection.poll(timeout):
+                    self.kill(worker)
+                    raise WorkerKilled("The worker of '%s' did not finish within %ss and got killed." % (
+                        location, self.wall_seconds))
+                try:
+                    message = connection.recv()
+                    if message[0] == "fetch":
+                        connection.send(serve_fetch(message[1], message[2]))
+                        continue
+                except (EOFError, OSError):
+                    worker.join()
+                    raise WorkerError("The worker of '%s' died with exit code %s." % (location, worker.exitcode))
+                _, data, stats, error = message
+                break
+            worker.join()
+        finally:
+            connection.close()
+            with self.lock:
+                self.workers.pop(location, None)
+
+        if error is not None:
+            raise WorkerError("The worker of '%s' failed: %s" % (location, error))
+        if status.current() is not None:
+            status.current().add(stats)
+        return store.loads_menus(data) if data is not None else None
+
+    @staticmethod
+    def kill(worker: multiprocessing.Process):
+        if worker.pid is not None and worker.is_alive():
+            os.kill(worker.pid, signal.SIGKILL)
+        worker.join()
+
+    def kill_all(self):
+        """Kills all running workers, e.g. those which are still running at the deadline. Returns their locations."""
+        with self.lock:
+            workers = dict(self.workers)
+        for worker in workers.values():
+            self.kill(worker)
+        return sorted(workers)
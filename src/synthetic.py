@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+import random
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import locations
+from entities import Dish, Ingredients, Menu, Prices
+from menu_parser import StudentenwerkMenuParser
+
+# building blocks of realistic dish names
+main_components = ["Schweinebraten", "Hähnchenbrust", "Rindergulasch", "Seelachsfilet", "Gemüselasagne",
+                   "Käsespätzle", "Linsencurry", "Putengeschnetzeltes", "Falafel", "Kartoffelgratin", "Tofu",
+                   "Spaghetti Bolognese", "Penne", "Gnocchi", "Kaiserschmarrn", "Leberkäse", "Chili sin Carne",
+                   "Rahmschwammerl", "Fischstäbchen", "Ofengemüse"]
+side_components = ["Kartoffelpüree", "Basmatireis", "Pommes frites", "Semmelknödel", "Blaukraut", "Salzkartoffeln",
+                   "Tomatensoße", "Kräuterquark", "Bratensoße", "Couscous", "Sauerkraut", "Apfelmus"]
+connectors = ["mit", "an", "dazu", "und"]
+
+# the locations of the real price tables
+studentenwerk_tables: List[Tuple[str, Dict[str, Prices]]] = [
+    ("mensa-lothstr", StudentenwerkMenuParser.prices_mesa_weihenstephan_mensa_lothstrasse),
+    ("mensa-leopoldstr", StudentenwerkMenuParser.prices_mesa_leopoldstr),
+]
+self_service_prices: List[Prices] = [StudentenwerkMenuParser.prices_self_service_classic,
+                                     StudentenwerkMenuParser.prices_self_service_vegan]
+ingredient_codes: List[str] = sorted(Ingredients.ingredient_lookup)
+
+
+class MenuGenerator:
+    """
+    Generates realistic menus for scale tests: dish types and prices come from the price tables of
+    `StudentenwerkMenuParser`, ingredients from `Ingredients.ingredient_lookup`. The same `seed` always yields the
+    same menus.
+    """
+
+    def __init__(self, seed: int = 0, dishes_per_day: Tuple[int, int] = (5, 15), duplicate_rate: float = 0.05):
+        self.random = random.Random(seed)
+        self.dishes_per_day = dishes_per_day
+        self.duplicate_rate = duplicate_rate
+
+    def canteens(self, count: int) -> List[str]:
+        """`count` canteen ids, the real Studentenwerk locations first and made up ones after them."""
+        real = sorted(location for location in locations.available()
+                      if locations.parser_of(location) == locations.studentenwerk)
+        return (real + ["synthetic-%d" % i for i in range(count - len(real))])[:count]
+
+    def dish_name(self) -> str:
+        name = self.random.choice(main_components)
+        for _ in range(self.random.randint(0, 2)):
+            name += " %s %s" % (self.random.choice(connectors), self.random.choice(side_components))
+        return name
+
+    def ingredients(self) -> set:
+        return set(self.random.sample(ingredient_codes, self.random.randint(0, 6)))
+
+    def dish(self, price_table: Dict[str, Prices]) -> Dish:
+        if self.random.random() < 0.1:
+            dish_type = "Self-Service"
+            prices = self.random.choice(self_service_prices)
+        else:
+            dish_type = self.random.choice(sorted(price_table))
+            prices = price_table[dish_type]
+        return Dish(self.dish_name(), prices, self.ingredients(), dish_type)
+
+    def menu(self, menu_date: date, price_table: Dict[str, Prices]) -> Menu:
+        dishes: List[Dish] = list()
+        for _ in range(self.random.randint(*self.dishes_per_day)):
+            # the same dish is listed twice now and then, like on the real pages
+            if dishes and self.random.random() < self.duplicate_rate:
+                dishes.append(self.random.choice(dishes))
+            else:
+                dishes.append(self.dish(price_table))
+        return Menu(menu_date, dishes)
+
+    def menus(self, location: str, weeks: int, start: Optional[date] = None) -> Dict[date, Menu]:
+        """The menus of Monday to Friday of `weeks` weeks, starting with the week of `start` (default: today)."""
+        if start is None:
+            start = date.today()
+        monday = start - timedelta(days=start.weekday())
+        # every canteen sticks to one price table like the real ones
+        price_table = studentenwerk_tables[sum(map(ord, location)) % len(studentenwerk_tables)][1]
+        menus: Dict[date, Menu] = dict()
+        for week in range(weeks):
+            for weekday in range(5):
+                menu_date = monday + timedelta(weeks=week, days=weekday)
+                menus[menu_date] = self.menu(menu_date, price_table)
+        return menus
+
+    def all_menus(self, canteens: int, weeks: int, start: Optional[date] = None) -> Dict[str, Dict[date, Menu]]:
+        return {location: self.menus(location, weeks, start) for location in self.canteens(canteens)}
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import tempfile
+import unittest
+
+from lxml import html
+
+import batch
+from api_versions import MultiVersionSerializer
+from entities import Week
+from menu_parser import IPPBistroMenuParser, StudentenwerkMenuParser
+
+
+class MultiVersionSerializerTest(unittest.TestCase):
+    menus = StudentenwerkMenuParser().get_menus(html.fromstring(
+        open("src/test/assets/studentenwerk/in/speiseplan_mensa_garching_new.html").read()), "mensa-garching")
+    weeks = Week.to_iso_weeks(menus)
+
+    def test_Should_EncodeV2_When_LikeTheJsonOutput(self):
+        files = MultiVersionSerializer(["v2"]).encode_weeks(self.weeks, "mensa-garching")
+
+        self.assertEqual(["v2"], list(files))
+        for week in self.weeks.values():
+            path = os.path.join(str(week.year), "%02d.json" % week.calendar_week)
+            self.assertEqual(week.to_json_obj(), json.loads(files["v2"][path].decode("utf-8")))
+        self.assertEqual({"canteen_id": "mensa-garching",
+                          "weeks": [week.to_json_obj() for week in self.weeks.values()]},
+                         json.loads(files["v2"][os.path.join("combined", "combined.json")].decode("utf-8")))
+
+    def test_Should_EncodeOnePricePerDish_When_V1(self):
+        files = MultiVersionSerializer().encode_weeks(self.weeks, "mensa-garching", stale=True)
+
+        combined = json.loads(files["v1"][os.path.join("combined", "combined.json")].decode("utf-8"))
+        self.assertTrue(combined["stale"])
+        v1_dishes = [dish for week in combined["weeks"] for day in week["days"] for dish in day["dishes"]]
+        dishes = [dish for week in self.weeks.values() for menu in week.days for dish in menu.dishes]
+        self.assertEqual(len(dishes), len(v1_dishes))
+        weighed = 0
+        for dish, v1_dish in zip(dishes, v1_dishes):
+            self.assertEqual({"name", "price", "ingredients", "dish_type"}, set(v1_dish))
+            self.assertEqual(dish.name, v1_dish["name"])
+            if dish.prices.students.price_per_unit:
+                weighed += 1
+                self.assertEqual(repr(dish.prices.students), v1_dish["price"])
+            else:
+                self.assertEqual(dish.prices.students.base_price, v1_dish["price"])
+        self.assertGreater(weighed, 0)
+
+    def test_Should_RaiseError_When_VersionIsUnknown(self):
+        with self.assertRaises(ValueError):
+            MultiVersionSerializer(["v3"])
+
+    def test_Should_WriteAllVersions_When_BatchRuns(self):
+        ipp_menus = IPPBistroMenuParser().get_menus(open('src/test/assets/ipp/in/menu_kw_47_2017.txt', 'r').read(),
+                                                    2017, 47)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            batch.run(["ipp-bistro"], temp_dir, parse=lambda location: ipp_menus, versions=["v1", "v2"],
+                      state_directory=os.path.join(temp_dir, ".state"))
+
+            for version in ("v1", "v2"):
+                with open(os.path.join(temp_dir, version, "ipp-bistro", "2017", "47.json"), "r") as week_file:
+                    self.assertEqual(5, len(json.load(week_file)["days"]))
+                with open(os.path.join(temp_dir, version, "all.json"), "r") as all_file:
+                    canteens = json.load(all_file)["canteens"]
+                self.assertEqual(["ipp-bistro"], [canteen["canteen_id"] for canteen in canteens])
+            with open(os.path.join(temp_dir, "v2", "all.json"), "r") as v2, \
+                    open(os.path.join(temp_dir, "all.json"), "r") as unversioned:
+                self.assertEqual(json.load(unversioned), json.load(v2))
+            # the unversioned files are the v2 files of the same pass
+            for path in (("2017", "47.json"), ("combined", "combined.json")):
+                with open(os.path.join(temp_dir, "v2", "ipp-bistro", *path), "rb") as v2, \
+                        open(os.path.join(temp_dir, "ipp-bistro", *path), "rb") as unversioned:
+                    self.assertEqual(v2.read(), unversioned.read())
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+import batch
+import status
+from menu_parser import IPPBistroMenuParser
+from store import LastKnownGoodStore
+
+
+class BatchTest(unittest.TestCase):
+    ipp_parser = IPPBistroMenuParser()
+
+    menu_kw_47_2017_txt = open('src/test/assets/ipp/in/menu_kw_47_2017.txt', 'r').read()
+
+    def test_Should_PublishFinishedLocations_When_DeadlineIsHit(self):
+        stalled = threading.Event()
+
+        def parse(location):
+            if location == "fmi-bistro":
+                # simulates a stalled connection
+                stalled.wait(10)
+                return None
+            if location == "mediziner-mensa":
+                raise ValueError("broken PDF")
+            return self.ipp_parser.get_menus(self.menu_kw_47_2017_txt, 2017, 47)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            summary = batch.run(["ipp-bistro", "fmi-bistro", "mediziner-mensa"], temp_dir, deadline=0.5,
+                                workers=3, parse=parse, openmensa_directory=temp_dir,
+                                state_directory=os.path.join(temp_dir, ".state"))
+            stalled.set()
+
+            self.assertEqual(["ipp-bistro"], summary.published)
+            self.assertEqual(["mediziner-mensa"], summary.failed)
+            self.assertEqual(["fmi-bistro"], summary.missed_deadline)
+
+            with open(os.path.join(temp_dir, "all.json"), "r") as generated:
+                all_json = json.load(generated)
+            with open("src/test/assets/ipp/out/menu_kw_47_2017.json", "r") as reference:
+                self.assertEqual({"canteens": [json.load(reference)]}, all_json)
+            self.assertTrue(os.path.isfile(os.path.join(temp_dir, "ipp-bistro", "feed.xml")))
+            self.assertFalse(os.path.exists(os.path.join(temp_dir, "fmi-bistro")))
+
+    def test_Should_PublishLastKnownGoodMenus_When_ParsingFails(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = LastKnownGoodStore(os.path.join(temp_dir, "store"))
+            out_dir = os.path.join(temp_dir, "dist")
+
+            state_dir = os.path.join(temp_dir, "state")
+
+            batch.run(["ipp-bistro"], out_dir, parse=lambda location: self.ipp_parser.get_menus(
+                self.menu_kw_47_2017_txt, 2017, 47), store=store, state_directory=state_dir)
+            # IPP column detection failure
+            summary = batch.run(["ipp-bistro"], out_dir, parse=lambda location: None, store=store,
+                                state_directory=state_dir)
+
+            # reported once, as stale
+            self.assertEqual([], summary.published)
+            self.assertEqual(["ipp-bistro"], summary.stale)
+            self.assertEqual([], summary.failed)
+            self.assertEqual("stale", summary.statuses["ipp-bistro"]["state"])
+            with open(os.path.join(out_dir, "all.json"), "r") as generated:
+                canteen = json.load(generated)["canteens"][0]
+            with open("src/test/assets/ipp/out/menu_kw_47_2017.json", "r") as reference:
+                self.assertEqual(json.load(reference)["weeks"], canteen["weeks"])
+            self.assertTrue(canteen["stale"])
+
+    def test_Should_WriteStatus_When_RunIsDone(self):
+        def parse(location):
+            # what the parser records while it fetches and converts a source
+            status.add_bytes(2048)
+            status.add_source("ab" * 32)
+            return self.ipp_parser.get_menus(self.menu_kw_47_2017_txt, 2017, 47)
+
+        with tempfile.TemporaryDirectory() as temp_dir, tempfile.TemporaryDirectory() as state_dir:
+            batch.run(["ipp-bistro"], temp_dir, parse=parse, state_directory=state_dir)
+            with open(os.path.join(temp_dir, status.file_name), "r") as status_file:
+                canteens = {entry["canteen_id"]: entry for entry in json.load(status_file)["canteens"]}
+
+            # every location of canteens.json is listed
+            self.assertEqual(set(status.canteen_ids()), set(canteens))
+            ipp = canteens["ipp-bistro"]
+            self.assertEqual("ok", ipp["state"])
+            self.assertEqual(ipp["last_attempt"], ipp["last_success"])
+            self.assertEqual(2048, ipp["bytes_downloaded"])
+            self.assertEqual("ab" * 32, ipp["source_hash"])
+            menus = self.ipp_parser.get_menus(self.menu_kw_47_2017_txt, 2017, 47)
+            self.assertEqual(len(menus), ipp["days"])
+            self.assertEqual(sum(len(menu.dishes) for menu in menus.values()), ipp["dishes"])
+            self.assertEqual({"fetch", "convert", "parse", "total"}, set(ipp["durations"]))
+            self.assertIsNone(canteens["fmi-bistro"]["last_attempt"])
+
+            # a failed attempt keeps the last success, even in a fresh output directory like the one of CI
+            fresh_dir = os.path.join(temp_dir, "fresh")
+            batch.run(["ipp-bistro"], fresh_dir, parse=lambda location: None, state_directory=state_dir)
+            with open(os.path.join(fresh_dir, status.file_name), "r") as status_file:
+                canteens = {entry["canteen_id"]: entry for entry in json.load(status_file)["canteens"]}
+            self.assertEqual("failed", canteens["ipp-bistro"]["state"])
+            self.assertEqual(ipp["last_success"], canteens["ipp-bistro"]["last_success"])
+            self.assertEqual(0, canteens["ipp-bistro"]["days"])
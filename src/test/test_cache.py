@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from cache import ParseCache
+from menu_parser import IPPBistroMenuParser
+
+
+class ParseCacheTest(unittest.TestCase):
+    menu_kw_47_2017_txt = open('src/test/assets/ipp/in/menu_kw_47_2017.txt', 'r').read()
+    raw = menu_kw_47_2017_txt.encode("utf-8")
+    digest = hashlib.sha256(raw).hexdigest()
+
+    def test_Should_SkipParsing_When_SourceIsUnchanged(self):
+        parser = IPPBistroMenuParser()
+        calls = []
+
+        def parse():
+            calls.append(1)
+            return parser.get_menus(self.menu_kw_47_2017_txt, 2017, 47)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            parser.cache = ParseCache(temp_dir, version="1")
+            menus = parser.cached_digest(self.digest, parse, 2017, 47)
+            cached_menus = parser.cached_digest(self.digest, parse, 2017, 47)
+
+            self.assertEqual(1, len(calls))
+            self.assertEqual(menus, cached_menus)
+
+            # another week or another parser version must not hit the cache
+            parser.cached_digest(self.digest, parse, 2017, 48)
+            parser.cache = ParseCache(temp_dir, version="2")
+            parser.cached_digest(self.digest, parse, 2017, 47)
+            self.assertEqual(3, len(calls))
+
+    def test_Should_HitCache_When_StreamedSourceIsUnchanged(self):
+        parser = IPPBistroMenuParser()
+        parser.chunk_size = 100
+        response = mock.Mock()
+        response.iter_content.side_effect = lambda size: (self.raw[i:i + size] for i in range(0, len(self.raw), size))
+
+        with tempfile.TemporaryDirectory() as temp_dir, mock.patch("fetch.get", return_value=response) as get:
+            parser.cache = ParseCache(temp_dir, version="1")
+            parser.cached_digest(self.digest, lambda: parser.get_menus(self.menu_kw_47_2017_txt, 2017, 47), 2017, 47)
+
+            with parser.download("http://konradhof-catering.com/ipp/menu.pdf") as (path, digest):
+                with open(path, "rb") as streamed:
+                    self.assertEqual(self.raw, streamed.read())
+                menus = parser.cached_digest(digest, lambda: self.fail("parsed again"), 2017, 47)
+
+            self.assertEqual(parser.get_menus(self.menu_kw_47_2017_txt, 2017, 47), menus)
+            self.assertFalse(os.path.exists(path))
+            self.assertEqual({"stream": True}, get.call_args[1])
+            response.close.assert_called_once_with()
+
+    def test_Should_NotCacheFailures(self):
+        parser = IPPBistroMenuParser()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            parser.cache = ParseCache(temp_dir, version="1")
+            self.assertIsNone(parser.cached_digest(self.digest, lambda: None, 2017, 47))
+            self.assertEqual([], os.listdir(temp_dir))
+
+    def test_Should_MissCache_When_EntryIsTruncated(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = ParseCache(temp_dir, version="1")
+            key = cache.digest_key(self.digest)
+            cache.put(key, IPPBistroMenuParser().get_menus(self.menu_kw_47_2017_txt, 2017, 47))
+            with open(cache.path(key), "rb") as infile:
+                data = infile.read()
+            with open(cache.path(key), "wb") as outfile:
+                outfile.write(data[:len(data) // 2])
+            self.assertIsNone(cache.get(key))
+
+    def test_Should_PruneUnusedEntries(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = ParseCache(temp_dir, version="1")
+            key = cache.digest_key(self.digest)
+            cache.put(key, IPPBistroMenuParser().get_menus(self.menu_kw_47_2017_txt, 2017, 47))
+            an_hour_ago = time.time() - 60 * 60
+            os.utime(cache.path(key), (an_hour_ago, an_hour_ago))
+
+            cache.prune(max_age_days=1)
+            self.assertTrue(os.path.isfile(cache.path(key)))
+            cache.prune(max_age_days=1 / 48)
+            self.assertFalse(os.path.isfile(cache.path(key)))
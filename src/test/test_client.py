@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+import functools
+import hashlib
+import os
+import tempfile
+import threading
+import unittest
+from datetime import date
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+from socketserver import ThreadingMixIn
+
+import requests
+
+import batch
+import fetch
+import history
+import locations
+import output
+import synthetic
+from client import ApiClient, ResponseCache
+
+
+class ThreadingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StaticHandler(SimpleHTTPRequestHandler):
+    """Serves the published tree like GitHub Pages: with an ETag and answering If-None-Match with 304."""
+    # (path, status) of every request
+    served = list()
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if os.path.isfile(path):
+            with open(path, 'rb') as infile:
+                etag = '"%s"' % hashlib.sha256(infile.read()).hexdigest()[:16]
+            if self.headers.get("If-None-Match") == etag:
+                self.served.append((self.path, 304))
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return None
+            self.etag = etag
+        self.served.append((self.path, 200 if os.path.isfile(path) else 404))
+        return super().send_head()
+
+    def end_headers(self):
+        if getattr(self, "etag", None) is not None:
+            self.send_header("ETag", self.etag)
+            self.etag = None
+        super().end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dist = os.path.join(self.temp_dir.name, "dist")
+        # two weeks from Monday, 2019-05-06 on
+        self.menus = synthetic.MenuGenerator(seed=7).menus("mensa-garching", 2, start=date(2019, 5, 6))
+        self.publish()
+        batch.write_all_json(self.dist, ["mensa-garching"])
+        output.write_atomic(os.path.join(self.dist, "canteens.json"), output.encode_json(locations.canteens()))
+
+        StaticHandler.served = list()
+        self.server = ThreadingServer(("127.0.0.1", 0), functools.partial(StaticHandler, directory=self.dist))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = "http://127.0.0.1:%d" % self.server.server_address[1]
+        self.cache = ResponseCache(os.path.join(self.temp_dir.name, "cache"))
+        self.client = ApiClient(self.url, self.cache, policy=fetch.FetchPolicy(rate=1000, burst=1000, retries=0))
+
+    def tearDown(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        self.temp_dir.cleanup()
+
+    def publish(self):
+        history.write_menus([self.menus[menu_date] for menu_date in sorted(self.menus)],
+                            os.path.join(self.dist, "mensa-garching"), "mensa-garching", True)
+
+    def test_Should_RebuildMenus_When_WeekIsRead(self):
+        week = self.client.week("mensa-garching", 2019, 19)
+        self.assertEqual((2019, 19), (week.year, week.calendar_week))
+        self.assertEqual([self.menus[menu.menu_date] for menu in week.days], week.days)
+        self.assertIsNone(self.client.week("mensa-garching", 2019, 30))
+        self.assertEqual(self.menus, self.client.combined("mensa-garching"))
+        self.assertEqual({"mensa-garching": self.menus}, self.client.all())
+        self.assertEqual(locations.canteens(), self.client.canteens())
+
+    def test_Should_FetchOnlyNeededWeeks_When_DaysAreQueried(self):
+        self.assertEqual(self.menus[date(2019, 5, 14)], self.client.menu("mensa-garching", date(2019, 5, 14)))
+        self.assertEqual([("/mensa-garching/2019/20.json", 200)], StaticHandler.served)
+
+        menus = self.client.menus("mensa-garching", date(2019, 5, 9), date(2019, 5, 13))
+        self.assertEqual(sorted(menu_date for menu_date in self.menus if date(2019, 5, 9) <= menu_date
+                                <= date(2019, 5, 13)), sorted(menus))
+        self.assertEqual([("/mensa-garching/2019/19.json", 200), ("/mensa-garching/2019/20.json", 304)],
+                         StaticHandler.served[1:])
+
+    def test_Should_RevalidateCache_When_FileIsReadAgain(self):
+        week = self.client.week("mensa-garching", 2019, 19)
+        self.assertEqual(week.days, self.client.week("mensa-garching", 2019, 19).days)
+        self.assertEqual([200, 304], [status for _, status in StaticHandler.served])
+
+        # fresh enough: not even revalidated
+        self.client.max_age = 3600
+        self.client.week("mensa-garching", 2019, 19)
+        self.assertEqual(2, len(StaticHandler.served))
+
+        # a changed file is downloaded again
+        self.client.max_age = 0
+        self.menus[date(2019, 5, 6)].dishes = self.menus[date(2019, 5, 6)].dishes[:1]
+        self.publish()
+        self.assertEqual(1, len(self.client.week("mensa-garching", 2019, 19).days[0].dishes))
+        self.assertEqual(200, StaticHandler.served[-1][1])
+
+    def test_Should_IgnoreCachedFile_When_HashDoesNotMatch(self):
+        self.client.week("mensa-garching", 2019, 19)
+        with open(self.cache.path(self.url + "/mensa-garching/2019/19.json", ".json"), 'ab') as cached:
+            cached.write(b" ")
+        self.assertIsNone(self.cache.get(self.url + "/mensa-garching/2019/19.json"))
+        self.assertEqual(5, len(self.client.week("mensa-garching", 2019, 19).days))
+        # requested without a condition, so the complete file is sent again
+        self.assertEqual([200, 200], [status for _, status in StaticHandler.served])
+
+    def test_Should_UseCache_When_ApiIsUnreachable(self):
+        week = self.client.week("mensa-garching", 2019, 19)
+        self.server.shutdown()
+        self.server.server_close()
+        self.server = None
+        self.assertEqual(week.days, self.client.week("mensa-garching", 2019, 19).days)
+        # nothing cached to fall back to
+        with self.assertRaises(requests.ConnectionError):
+            self.client.week("mensa-garching", 2019, 20)
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import tempfile
+import unittest
+from datetime import date
+
+import numpy as np
+
+import columnar
+import history
+from entities import Dish, Menu, Price, Prices
+
+
+class ColumnarTest(unittest.TestCase):
+    schnitzel = Dish("Schnitzel", Prices(Price(3.5), Price(4.5), Price(5.5)), {"S", "Gl"}, "Tagesgericht 1")
+    salad = Dish("Salatbar", Prices(Price(0, 0.8, "100g"), Price(0, 1.0, "100g"), Price(0, 1.2, "100g")), {"v"},
+                 "Self-Service")
+    soup = Dish("Suppe", Prices(), {"Si"}, "Suppe")
+
+    def test_Should_FlattenMenusIntoColumns(self):
+        table = columnar.DishTable.from_menus([
+            ("mensa-garching", [Menu(date(2019, 5, 6), [self.schnitzel, self.salad])]),
+            ("fmi-bistro", [Menu(date(2019, 5, 6), [self.soup]), Menu(date(2019, 5, 7), [self.schnitzel])])])
+
+        self.assertEqual(4, len(table))
+        self.assertEqual(["mensa-garching", "fmi-bistro"], table.canteens)
+        self.assertEqual([0, 0, 1, 1], table["canteen"].tolist())
+        self.assertEqual(["Schnitzel", "Salatbar", "Suppe", "Schnitzel"],
+                         [table.names[code] for code in table["name"]])
+        self.assertEqual(date(2019, 5, 7), date.fromordinal(int(table["date"][3])))
+        self.assertEqual([3.5, 0, 3.5], table["base_price_students"][[0, 1, 3]].tolist())
+        self.assertTrue(np.isnan(table["base_price_students"][2]))
+        self.assertEqual([0.8, 1.0, 1.2], [table["price_per_unit_" + role][1] for role in columnar.roles])
+        self.assertEqual(["100g"], table.units)
+        self.assertEqual([-1, 0, -1, -1], table["unit_guests"].tolist())
+        self.assertEqual([True, False, False, True], table.ingredient_mask("S").tolist())
+        # ingredients unknown to the Studentenwerk get a bit as well
+        self.assertEqual([False, False, True, False], table.ingredient_mask("Si").tolist())
+        # vectorized aggregation: average students price of Schnitzel
+        schnitzel = table["name"] == table.names.index("Schnitzel")
+        self.assertEqual(3.5, table["base_price_students"][schnitzel].mean())
+
+    def test_Should_RoundTripMemoryMappedColumnsFromHistory(self):
+        with tempfile.TemporaryDirectory() as dist, tempfile.TemporaryDirectory() as export_dir:
+            history.merge_history({date(2019, 5, 6): Menu(date(2019, 5, 6), [self.schnitzel, self.salad])},
+                                  dist + "/mensa-garching", "mensa-garching", True)
+            table = columnar.DishTable.from_menus(columnar.read_history(dist))
+            columnar.write_npy(table, export_dir)
+            loaded = columnar.load_npy(export_dir)
+
+            self.assertIsInstance(loaded["date"], np.memmap)
+            self.assertEqual(table.dictionaries(), loaded.dictionaries())
+            for name in table.columns:
+                np.testing.assert_array_equal(table[name], loaded[name])
+            del loaded
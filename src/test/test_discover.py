@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+import copy
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+import discover
+import fetch
+import locations
+from menu_parser import StudentenwerkMenuParser
+
+# the stand-in of the Studentenwerk: the menu pages of these ids
+pages = {422: "Mensa Garching", 450: "StuBistro Arcisstraße", 460: "StuCafé Olympiapark",
+         470: "StuBistro Neue Straße", 530: ""}
+# linked from the index only, outside of the probed ids
+index_only = {612: "Mensa Irgendwo"}
+
+
+class ThreadingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+
+    def do_GET(self):
+        with self.lock:
+            StandInHandler.in_flight += 1
+            StandInHandler.max_in_flight = max(StandInHandler.max_in_flight, StandInHandler.in_flight)
+        try:
+            # long enough for the requests of all workers to overlap
+            time.sleep(0.01)
+        finally:
+            # before the response is sent, after which the client may send its next request right away
+            with self.lock:
+                StandInHandler.in_flight -= 1
+        self.respond()
+
+    def respond(self):
+        if self.path == "/mensa/speiseplan/":
+            links = "".join('<a href="/mensa/speiseplan/speiseplan_%d_-de.html#heute">%s</a>' % (location_id, name)
+                            for location_id, name in list(pages.items()) + list(index_only.items()))
+            return self.send_page(links)
+        match = discover.page_link_regex.search(self.path)
+        location_id = int(match.group(1)) if match else None
+        if location_id == 431:
+            # unknown ids are redirected to the overview
+            self.send_response(302)
+            self.send_header("Location", "/mensa/speiseplan/")
+            self.end_headers()
+        elif location_id == 432:
+            # a page without any menus
+            self.send_page("<h1>Speiseplan</h1>")
+        elif location_id == 633:
+            # a page which is broken for now, outside of the probed ids
+            self.send_error(500)
+        elif location_id in pages or location_id in index_only:
+            name = pages.get(location_id, index_only.get(location_id))
+            title = "<h1>Speiseplan: %s von 11.11.2019 bis 20.12.2019</h1>" % name if name else ""
+            self.send_page(title + '<div class="c-schedule"><div class="c-schedule__item"></div></div>')
+        else:
+            self.send_error(404)
+
+    def send_page(self, body: str):
+        content = ('<html><head><meta charset="utf-8"></head><body>%s</body></html>' % body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DiscoverTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingServer(("127.0.0.1", 0), StandInHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = "http://127.0.0.1:%d" % self.server.server_address[1]
+        self.policy = fetch.FetchPolicy(rate=1000, burst=1000, retries=0)
+        StandInHandler.max_in_flight = 0
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_Should_FindValidLocations_When_Crawling(self):
+        found, failed = discover.crawl(range(400, 600), [self.url + "/mensa/speiseplan/"],
+                                       self.url + "/mensa/speiseplan/speiseplan_{}_-de.html", workers=4,
+                                       policy=self.policy)
+        self.assertEqual([], failed)
+        self.assertEqual({422: "Mensa Garching", 450: "StuBistro Arcisstraße", 460: "StuCafé Olympiapark",
+                          470: "StuBistro Neue Straße", 530: "", 612: "Mensa Irgendwo"}, found)
+        self.assertLessEqual(StandInHandler.max_in_flight, 4)
+
+    def test_Should_ReportFailedIds_When_PageHasServerError(self):
+        found, failed = discover.crawl([422, 432, 433, 633], policy=self.policy,
+                                       base_url=self.url + "/mensa/speiseplan/speiseplan_{}_-de.html")
+        self.assertEqual({422: "Mensa Garching"}, found)
+        # 432 has no menus and 433 does not exist (404), but 633 might be a location
+        self.assertEqual([633], failed)
+
+    def test_Should_ReportFailedIds_When_HostIsDown(self):
+        # nothing listens on the port of a closed server
+        down = HTTPServer(("127.0.0.1", 0), StandInHandler)
+        down.server_close()
+        url = "http://127.0.0.1:%d/speiseplan_{}_-de.html" % down.server_address[1]
+        found, failed = discover.crawl([422, 423], base_url=url, policy=self.policy)
+        self.assertEqual({}, found)
+        self.assertEqual([422, 423], failed)
+
+    def test_Should_MergeFoundLocations_When_RegistryIsUpdated(self):
+        entries = copy.deepcopy(locations.load())
+        found = {422: "Mensa Garching", 460: "StuCafé Olympiapark", 470: "StuBistro Neue Straße",
+                 480: "StuBistro Arcisstraße", 530: ""}
+        summary = discover.merge(entries, found)
+
+        self.assertEqual(["stucafe-olympiapark"], summary.resolved)
+        self.assertEqual(["stubistro-neue-str", "stubistro-arcisstr-480", "studentenwerk-530"], summary.added)
+        self.assertIn("mensa-arcisstr", summary.missing)
+        self.assertNotIn("mensa-garching", summary.missing)
+        ids = locations.studentenwerk_ids(entries)
+        self.assertEqual(460, ids["stucafe-olympiapark"])
+        self.assertEqual(470, ids["stubistro-neue-str"])
+        self.assertIn("stubistro-neue-str", locations.available(entries))
+        self.assertIn("stubistro-neue-str", [canteen["canteen_id"] for canteen in locations.canteens(entries)])
+        self.assertEqual(locations.studentenwerk, locations.parser_of("stubistro-neue-str", entries))
+
+    def test_Should_CreateIdsLikeTheExistingOnes_When_NameIsGiven(self):
+        self.assertEqual("stucafe-boltzmannstr", discover.slug("StuCafé Boltzmannstraße"))
+        self.assertEqual("stubistro-grosshadern", discover.slug("StuBistro Großhadern"))
+        self.assertEqual("mensa-arcisstr", discover.slug("Mensa Arcisstraße"))
+
+
+class LocationsTest(unittest.TestCase):
+
+    def test_Should_MatchRegistry_When_CanteensJsonIsLoaded(self):
+        with open(locations.canteens_file, "r", encoding="utf-8") as infile:
+            self.assertEqual(locations.canteens(), json.load(infile))
+
+    def test_Should_ListEveryLocation_When_RegistryIsRead(self):
+        self.assertEqual(locations.available(), [canteen["canteen_id"] for canteen in locations.canteens()])
+        self.assertEqual(421, StudentenwerkMenuParser.location_id_mapping["mensa-arcisstrasse"])
+        self.assertNotIn("stucafe-olympiapark", locations.names())
+        self.assertIsNone(locations.parser_of("stucafe-olympiapark"))
+        self.assertEqual("fmi-bistro", locations.parser_of("fmi-bistro"))
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+import requests
+
+from fetch import CircuitBreaker, FetchPolicy, HostUnavailableError, TokenBucket
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError("%s Error" % self.status_code, response=self)
+
+
+class FakeSession:
+    """Replays the given responses or exceptions and records the requested urls."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.requests = []
+        self.responses = []
+
+    def get(self, url, **kwargs):
+        self.requests.append((url, kwargs))
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        self.responses.append(FakeResponse(outcome))
+        return self.responses[-1]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class FetchPolicyTest(unittest.TestCase):
+
+    def policy(self, session, **kwargs):
+        clock = FakeClock()
+        return FetchPolicy(session=session, clock=clock, sleep=clock.sleep, **kwargs), clock
+
+    def test_Should_SetTimeouts(self):
+        session = FakeSession(200)
+        policy, _ = self.policy(session, connect_timeout=2, read_timeout=7)
+
+        policy.get("http://konradhof-catering.com/ipp/")
+
+        self.assertEqual((2, 7), session.requests[0][1]["timeout"])
+
+    def test_Should_Retry_When_ConnectionFailsOrServerErrors(self):
+        session = FakeSession(requests.ConnectTimeout(), 503, 200)
+        policy, clock = self.policy(session, retries=3, backoff_base=1, backoff_max=4)
+
+        response = policy.get("http://www.wilhelm-gastronomie.de/")
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(3, len(session.requests))
+        # the connection of the failed response went back to the pool
+        self.assertEqual([True, False], [response.closed for response in session.responses])
+        # jittered backoff never exceeds the exponential bound
+        backoffs = [s for s in clock.slept if s > 0]
+        self.assertTrue(all(s <= 2 ** i for i, s in enumerate(backoffs)))
+
+    def test_Should_NotRetry_When_ClientError(self):
+        session = FakeSession(404)
+        policy, _ = self.policy(session)
+
+        with self.assertRaises(requests.HTTPError):
+            policy.get("http://www.wilhelm-gastronomie.de/missing.pdf")
+        self.assertEqual(1, len(session.requests))
+        self.assertTrue(session.responses[0].closed)
+
+    def test_Should_SkipHost_When_CircuitIsOpen(self):
+        session = FakeSession(*[requests.ConnectionError()] * 4)
+        policy, _ = self.policy(session, retries=1, failure_threshold=2)
+
+        for _ in range(2):
+            with self.assertRaises(requests.ConnectionError):
+                policy.get("http://konradhof-catering.com/ipp/")
+        with self.assertRaises(HostUnavailableError):
+            policy.get("http://konradhof-catering.com/ipp/KW-48.pdf")
+
+        # the open breaker did not issue a request
+        self.assertEqual(4, len(session.requests))
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_Should_Wait_When_BucketIsEmpty(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=2, clock=clock, sleep=clock.sleep)
+
+        for _ in range(4):
+            bucket.acquire()
+
+        # two tokens from the burst, two refilled with 2 tokens/s
+        self.assertAlmostEqual(1.0, clock.now)
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def test_Should_ResetFailures_When_Success(self):
+        breaker = CircuitBreaker(2)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+
+        self.assertFalse(breaker.is_open)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import tempfile
+import unittest
+from datetime import date
+
+import history
+from entities import Dish, Menu, Price, Prices, Week
+from menu_parser import IPPBistroMenuParser
+
+
+class HistoryTest(unittest.TestCase):
+    ipp_parser = IPPBistroMenuParser()
+
+    menu_kw_47_2017_txt = open('src/test/assets/ipp/in/menu_kw_47_2017.txt', 'r').read()
+    menu_kw_48_2017_txt = open('src/test/assets/ipp/in/menu_kw_48_2017.txt', 'r').read()
+
+    @staticmethod
+    def menus_of(*menus):
+        return {menu.menu_date: menu for menu in menus}
+
+    def test_Should_KeepWeeksOfDifferentYearsApart(self):
+        dish = Dish("Spaghetti al Pomodoro", Prices(Price(3.6)), set(["Gl"]), "Tagesgericht")
+        menus = self.menus_of(Menu(date(2019, 1, 2), [dish]), Menu(date(2020, 1, 1), [dish]),
+                              Menu(date(2021, 1, 1), [dish]))
+
+        weeks = Week.to_iso_weeks(menus)
+
+        self.assertEqual([(2019, 1), (2020, 1), (2020, 53)], sorted(weeks))
+        self.assertEqual(2020, weeks[(2020, 53)].year)
+
+    def test_Should_MergeNewWeeksIntoCombined(self):
+        menus_47 = self.ipp_parser.get_menus(self.menu_kw_47_2017_txt, 2017, 47)
+        menus_48 = self.ipp_parser.get_menus(self.menu_kw_48_2017_txt, 2017, 48)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            history.merge_history(menus_47, temp_dir, "ipp-bistro", True)
+            history.merge_history(menus_48, temp_dir, "ipp-bistro", True)
+
+            with open(os.path.join(temp_dir, "combined", "combined.json"), "r") as generated:
+                combined = json.load(generated)
+            with open("src/test/assets/ipp/out/menu_kw_47_2017.json", "r") as reference:
+                weeks_47 = json.load(reference)["weeks"]
+            with open("src/test/assets/ipp/out/menu_kw_48_2017.json", "r") as reference:
+                weeks_48 = json.load(reference)["weeks"]
+
+            self.assertEqual("ipp-bistro", combined["canteen_id"])
+            self.assertEqual(weeks_47 + weeks_48, combined["weeks"])
+            self.assertTrue(os.path.isfile(os.path.join(temp_dir, "2017", "47.json")))
+            self.assertTrue(os.path.isfile(os.path.join(temp_dir, "2017", "48.json")))
+
+    def test_Should_ReplaceReparsedDaysAndKeepOthers(self):
+        old_dish = Dish("Alt", Prices(Price(1.0)), set(), "Tagesgericht")
+        new_dish = Dish("Neu", Prices(Price(2.0)), set(), "Tagesgericht")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            history.merge_history(self.menus_of(Menu(date(2019, 5, 6), [old_dish]),
+                                                Menu(date(2019, 5, 7), [old_dish])), temp_dir, "fmi-bistro", True)
+            history.merge_history(self.menus_of(Menu(date(2019, 5, 7), [new_dish])), temp_dir, "fmi-bistro", True)
+
+            with open(os.path.join(temp_dir, "2019", "19.json"), "r") as generated:
+                week = json.load(generated)
+
+        self.assertEqual(["2019-05-06", "2019-05-07"], [day["date"] for day in week["days"]])
+        self.assertEqual("Alt", week["days"][0]["dishes"][0]["name"])
+        self.assertEqual("Neu", week["days"][1]["dishes"][0]["name"])
+
+    def test_Should_WriteStreamedMenusWeekByWeek(self):
+        menus_47 = self.ipp_parser.get_menus(self.menu_kw_47_2017_txt, 2017, 47)
+        menus_48 = self.ipp_parser.get_menus(self.menu_kw_48_2017_txt, 2017, 48)
+        # the last day of week 47 arrives after week 48, like a week spread over two PDFs
+        menus = sorted(menus_47.values(), key=lambda menu: menu.menu_date)
+        stream = iter(menus[:-1] + sorted(menus_48.values(), key=lambda menu: menu.menu_date) + menus[-1:])
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            written = history.write_menus(stream, temp_dir, "ipp-bistro", True)
+
+            with open(os.path.join(temp_dir, "combined", "combined.json"), "r") as generated:
+                combined = json.load(generated)
+            with open("src/test/assets/ipp/out/menu_kw_47_2017.json", "r") as reference:
+                weeks_47 = json.load(reference)["weeks"]
+            with open("src/test/assets/ipp/out/menu_kw_48_2017.json", "r") as reference:
+                weeks_48 = json.load(reference)["weeks"]
+
+        self.assertEqual(len(menus_47) + len(menus_48), written)
+        self.assertEqual("ipp-bistro", combined["canteen_id"])
+        self.assertEqual(weeks_47 + weeks_48, combined["weeks"])
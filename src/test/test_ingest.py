@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import tempfile
+import unittest
+from datetime import date
+
+import ingest
+from menu_parser import FMIBistroMenuParser, IPPBistroMenuParser, MedizinerMensaMenuParser
+
+
+class IngestTest(unittest.TestCase):
+
+    def test_Should_DetectLocationFromPath(self):
+        self.assertEqual("fmi-bistro",
+                         ingest.detect_location("src/test/assets/fmi/in/Garching-Speiseplan_KW45_2017.txt"))
+        self.assertEqual("mediziner-mensa",
+                         ingest.detect_location("archive/mediziner-mensa/2018/KW_44_Herbst_4_Mensa_2018.pdf"))
+        self.assertEqual("mensa-garching",
+                         ingest.detect_location("src/test/assets/studentenwerk/in/speiseplan_mensa_garching_new.html"))
+        self.assertEqual("mensa-arcisstrasse",
+                         ingest.detect_location("src/test/assets/studentenwerk/in/speiseplan_mensa_arcisstrasse.html"))
+        self.assertEqual("mensa-garching", ingest.detect_location("archive/2017/speiseplan_422_-de.html"))
+        self.assertIsNone(ingest.detect_location("archive/unknown.pdf"))
+
+    def test_Should_DeriveWeekLikeParse(self):
+        self.assertEqual((2017, 46),
+                         ingest.get_year_and_week(FMIBistroMenuParser(), "Garching-Speiseplan_KW46_2017.pdf"))
+        self.assertEqual((2017, 48), ingest.get_year_and_week(IPPBistroMenuParser(), "KW-48_27.11-01.12.10.2017-3.pdf"))
+        self.assertEqual((2018, 50), ingest.get_year_and_week(MedizinerMensaMenuParser(),
+                                                              "KW_50_Winter_1_Mensa_-2018.pdf"))
+        # renamed archives
+        self.assertEqual((2017, 47), ingest.get_year_and_week(IPPBistroMenuParser(), "menu_kw_47_2017.txt"))
+        # the FMI parser assumes the current year for a name without one, an archive may be of any year
+        self.assertEqual((2016, 46), ingest.get_year_and_week(FMIBistroMenuParser(), "fmi-bistro_KW_46_2016.txt"))
+        self.assertEqual((None, 46), ingest.get_year_and_week(FMIBistroMenuParser(), "Garching-Speiseplan_KW46.pdf"))
+        self.assertEqual(date.today().year, FMIBistroMenuParser.get_year_and_week("Garching-Speiseplan_KW46.pdf")[0])
+
+    def test_Should_IngestArchiveIntoWeekFiles(self):
+        sources = ingest.find_sources("src/test/assets/ipp/in")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            days = ingest.ingest(sources, temp_dir, workers=2, combine_dishes=True)
+
+            with open(os.path.join(temp_dir, "ipp-bistro", "2017", "47.json"), "r") as generated:
+                week_47 = json.load(generated)
+            with open(os.path.join(temp_dir, "ipp-bistro", "combined", "combined.json"), "r") as generated:
+                combined = json.load(generated)
+        with open("src/test/assets/ipp/out/menu_kw_47_2017.json", "r") as reference:
+            reference_47 = json.load(reference)["weeks"][0]
+
+        self.assertEqual(["ipp-bistro"], list(days))
+        self.assertEqual(reference_47, week_47)
+        self.assertEqual([(2017, 47), (2017, 48), (2018, 18), (2018, 19), (2019, 22)],
+                         [(week["year"], week["number"]) for week in combined["weeks"]])
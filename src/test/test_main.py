@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+import sys
+import unittest
+from datetime import date
+from unittest import mock
+
+from lxml import html
+
+import cli
+import main
+from menu_parser import StudentenwerkMenuParser
+
+
+class NdjsonTest(unittest.TestCase):
+    menus = StudentenwerkMenuParser().get_menus(html.fromstring(
+        open("src/test/assets/studentenwerk/in/speiseplan_mensa_garching_new.html").read()), "mensa-garching")
+
+    def test_Should_WriteOneObjectPerDish(self):
+        outfile = io.StringIO()
+        written = main.write_ndjson(self.menus.values(), "mensa-garching", outfile)
+
+        self.assertEqual(len(self.menus), written)
+        lines = outfile.getvalue().splitlines()
+        self.assertEqual(sum(len(menu.dishes) for menu in self.menus.values()), len(lines))
+
+        first_menu = next(iter(self.menus.values()))
+        first_dish = first_menu.dishes[0]
+        self.assertEqual({"canteen_id": "mensa-garching", "date": str(first_menu.menu_date), "name": first_dish.name,
+                          "dish_type": first_dish.dish_type, "prices": first_dish.prices.to_json_obj(),
+                          "ingredients": sorted(first_dish.ingredients)}, json.loads(lines[0]))
+
+    def test_Should_FlushEveryMenu(self):
+        flushed = []
+
+        class Outfile(io.StringIO):
+            def flush(self):
+                flushed.append(self.getvalue().count("\n"))
+
+        main.write_ndjson(self.menus.values(), "mensa-garching", Outfile())
+        expected, lines = [], 0
+        for menu in self.menus.values():
+            lines += len(menu.dishes)
+            expected.append(lines)
+        self.assertEqual(expected, flushed)
+
+
+class CliTest(unittest.TestCase):
+
+    def test_Should_ExitWithUsageError_When_FromIsAfterTo(self):
+        argv = ["batch.py", "dist", "--from", "03.04.2019", "--to", "02.04.2019"]
+        with mock.patch.object(sys, "argv", argv), mock.patch("sys.stderr", io.StringIO()) as stderr:
+            with self.assertRaises(SystemExit):
+                cli.parse_batch_args()
+        self.assertIn("--from 03.04.2019 is after --to 02.04.2019", stderr.getvalue())
+
+        with mock.patch.object(sys, "argv", argv[:-1] + ["03.04.2019"]):
+            window = cli.window_of(cli.parse_batch_args())
+        self.assertEqual((date(2019, 4, 3), date(2019, 4, 3)), (window.start, window.end))
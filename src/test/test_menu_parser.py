@@ -1,15 +1,21 @@
 # -*- coding: utf-8 -*-
+import hashlib
 import os
 import tempfile
 import unittest
+from unittest import mock
 
 from lxml import html
 from datetime import date
 
 import main
+import status
+import util
 from menu_parser import MenuParser, StudentenwerkMenuParser, FMIBistroMenuParser, IPPBistroMenuParser, \
     MedizinerMensaMenuParser
+from cache import ParseCache
 from entities import Dish, Menu, Week
+from util import DateWindow
 import json
 
 
@@ -20,6 +26,25 @@ class MenuParserTest(unittest.TestCase):
         self.assertEqual(date(2018, 1, 1), MenuParser.get_date(2018, 1, 1))
         self.assertEqual(date(2019, 1, 7), MenuParser.get_date(2019, 2, 1))
 
+    def test_Should_SkipWeeksOutsideOfTheWindow(self):
+        window = DateWindow(date(2017, 11, 5), date(2017, 11, 6))
+        # KW 44 ends on Sunday, 2017-11-05, KW 45 starts on Monday, 2017-11-06
+        self.assertFalse(MenuParser.outside_window(window, 2017, 44))
+        self.assertFalse(MenuParser.outside_window(window, 2017, 45))
+        self.assertTrue(MenuParser.outside_window(window, 2017, 43))
+        self.assertTrue(MenuParser.outside_window(window, 2017, 46))
+        # KW 1 of 2021 starts on 2021-01-04, 2020 has 53 weeks
+        self.assertFalse(MenuParser.outside_window(DateWindow(date(2021, 1, 1)), 2020, 53))
+        self.assertTrue(MenuParser.outside_window(DateWindow(end=date(2021, 1, 3)), 2021, 1))
+        # unknown weeks are never skipped
+        self.assertFalse(MenuParser.outside_window(window, None, 44))
+        self.assertFalse(MenuParser.outside_window(window, 2017, None))
+        self.assertFalse(MenuParser.outside_window(None, 2017, 43))
+
+    def test_Should_RaiseError_When_WindowEndsBeforeItStarts(self):
+        with self.assertRaises(ValueError):
+            DateWindow(date(2017, 11, 6), date(2017, 11, 5))
+
 
 class StudentenwerkMenuParserTest(unittest.TestCase):
     studentenwerk_menu_parser = StudentenwerkMenuParser()
@@ -114,6 +139,89 @@ class StudentenwerkMenuParserTest(unittest.TestCase):
         self.assertEqual(22, len(
             self.studentenwerk_menu_parser.get_menus(self.menu_html_mensa_garching_old_wrong_date_format, "mensa-garching")))
 
+    def test_Should_MarkEveryRepeatedName(self):
+        # dishes of the same name on a day of the Studentenwerk page
+        self.assertEqual(["Suppe", "Pasta", "Suppe (2)", "Suppe (2)"],
+                         util.make_duplicates_unique(["Suppe", "Pasta", "Suppe", "Suppe"]))
+
+    def test_Should_ParseDaysWhileThePageStreamsIn(self):
+        with open("src/test/assets/studentenwerk/in/speiseplan_mensa_garching_new.html", "rb") as page:
+            content = page.read()
+        chunks = [content[i:i + 1024] for i in range(0, len(content), 1024)]
+        fed = []
+
+        def stream():
+            for chunk in chunks:
+                fed.append(chunk)
+                yield chunk
+
+        streamed = self.studentenwerk_menu_parser.iter_streamed_daily_menus(stream(), "mensa-garching")
+        first_menu = next(streamed)
+        # the first day is parsed before the whole page got loaded
+        self.assertLess(len(fed), len(chunks))
+        menus = [first_menu] + list(streamed)
+
+        expected = self.studentenwerk_menu_parser.get_menus(self.menu_html_mensa_garching_new, "mensa-garching")
+        self.assertEqual(list(expected.values()), menus)
+
+    def test_Should_ParseOnlyTheDaysWithinTheWindow(self):
+        expected = self.studentenwerk_menu_parser.get_menus(self.menu_html_mensa_garching_new, "mensa-garching")
+        days = sorted(expected)
+        window = DateWindow(days[1], days[3])
+
+        menus = list(self.studentenwerk_menu_parser.iter_daily_menus(self.menu_html_mensa_garching_new,
+                                                                     "mensa-garching", window))
+        self.assertEqual([expected[day] for day in days[1:4]], menus)
+
+        with open("src/test/assets/studentenwerk/in/speiseplan_mensa_garching_new.html", "rb") as page:
+            streamed = list(self.studentenwerk_menu_parser.iter_streamed_daily_menus([page.read()], "mensa-garching",
+                                                                                     window))
+        self.assertEqual(menus, streamed)
+
+    def test_Should_RecordFetchedBytesAndSourceHash(self):
+        with open("src/test/assets/studentenwerk/in/speiseplan_mensa_garching_new.html", "rb") as page:
+            content = page.read()
+        response = mock.Mock(**{"iter_content.return_value": [content[:4096], content[4096:]]})
+
+        with mock.patch("fetch.get", return_value=response), status.recording() as stats:
+            menus = list(StudentenwerkMenuParser().iter_menus("mensa-garching"))
+
+        self.assertEqual(len(self.studentenwerk_menu_parser.get_menus(self.menu_html_mensa_garching_new,
+                                                                      "mensa-garching")), len(menus))
+        self.assertEqual(len(content), stats.bytes_downloaded)
+        self.assertEqual(hashlib.sha256(content).hexdigest(), stats.source_hash())
+
+    def test_Should_SkipParsing_When_PageIsNotModified(self):
+        with open("src/test/assets/studentenwerk/in/speiseplan_mensa_garching_new.html", "rb") as page:
+            content = page.read()
+        chunks = [content[i:i + 1024] for i in range(0, len(content), 1024)]
+        fed = []
+
+        def iter_content(size):
+            for chunk in chunks:
+                fed.append(chunk)
+                yield chunk
+
+        page = mock.Mock(status_code=200, headers={"ETag": '"v1"'}, iter_content=iter_content)
+        not_modified = mock.Mock(status_code=304, headers={"ETag": '"v1"'})
+        parser = StudentenwerkMenuParser()
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                mock.patch("fetch.get", side_effect=[page, not_modified]) as get:
+            parser.cache = ParseCache(temp_dir, version="1")
+            streamed = parser.iter_menus("mensa-garching")
+            first_menu = next(streamed)
+            # the first day is parsed before the whole page got loaded
+            self.assertLess(len(fed), len(chunks))
+            menus = [first_menu] + list(streamed)
+            self.assertEqual({}, get.call_args[1]["headers"])
+
+            # the page is requested with its ETag and the cached menus are used as it did not change
+            with mock.patch.object(parser, "iter_streamed_daily_menus", side_effect=AssertionError("parsed again")), \
+                    status.recording() as stats:
+                self.assertEqual(menus, list(parser.iter_menus("mensa-garching")))
+            self.assertEqual({"If-None-Match": '"v1"'}, get.call_args[1]["headers"])
+            self.assertEqual(hashlib.sha256(content).hexdigest(), stats.source_hash())
+
     def test_Should_ReturnWeeks_When_ConvertingMenuToWeekObjects(self):
         menus = self.studentenwerk_menu_parser.get_menus(self.menu_html_mensa_garching_old, "mensa-garching")
         weeks_actual = Week.to_weeks(menus)
@@ -218,6 +326,26 @@ class FMIBistroParserTest(unittest.TestCase):
                 # open the reference file
                 with open("src/test/assets/fmi/out/menu_kw_45_2017.json", "r") as reference:
                     self.assertEqual(json.load(generated), json.load(reference))
+
+    def test_Should_NotDownloadPdfs_When_TheirWeekIsOutsideOfTheWindow(self):
+        page = mock.Mock(content=b'<html><body>'
+                                 b'<a href="/Garching-KW44_2017.pdf">KW 44</a>'
+                                 b'<a href="/Garching-KW45_2017.pdf">KW 45</a>'
+                                 b'</body></html>')
+        downloaded = []
+
+        def download(url):
+            downloaded.append(url)
+            return mock.MagicMock(**{"__enter__.return_value": ("/dev/null", url)})
+
+        parser = FMIBistroMenuParser()
+        with mock.patch("fetch.get", return_value=page), \
+                mock.patch.object(parser, "download", side_effect=download), \
+                mock.patch.object(parser, "pdf_file_to_text", return_value=self.menu_kw_45_2017_txt):
+            menus = list(parser.iter_menus("fmi-bistro", DateWindow(date(2017, 11, 7), date(2017, 11, 8))))
+
+        self.assertEqual(["/Garching-KW45_2017.pdf"], downloaded)
+        self.assertEqual([date(2017, 11, 7), date(2017, 11, 8)], [menu.menu_date for menu in menus])
     
     """
     # just for generating reference json files
@@ -1,22 +1,25 @@
+import json
+import os
+import tempfile
 from unittest import TestCase
-from pyopenmensa.feed import LazyBuilder
+from lxml import etree, html
 from datetime import date
-from menu_parser import FMIBistroMenuParser
+from menu_parser import FMIBistroMenuParser, StudentenwerkMenuParser
 from entities import Dish, Price, Prices, Menu, Week
 import openmensa
 
 class OpenMensaTest(TestCase):
-    def test_Should_Add_Dish_to_Canteen(self):
-        canteen = LazyBuilder()
+    def test_Should_Add_Dish_to_Day(self):
         dateobj = date(2017, 3, 27)
         dish = Dish("Gulasch vom Schwein", Prices(Price(1.9)), set(["S", "Gl", "GlG", "GlW", "Kn", "Mi"]), "Tagesgericht")
 
-        openmensa.addDishToCanteen(dish, dateobj, canteen)
-        meal = canteen._days[dateobj]['Speiseplan'][0]
-        self.assertEqual(meal[0], "Gulasch vom Schwein")
-        self.assertEqual(meal[2], {'other': 190})
+        day = openmensa.menuToDayElement(Menu(dateobj, [dish]))
+        self.assertEqual("2017-03-27", day.get('date'))
+        meal = day.find('{%s}category/{%s}meal' % (openmensa.namespace, openmensa.namespace))
+        self.assertEqual("Gulasch vom Schwein", meal.findtext('{%s}name' % openmensa.namespace))
+        self.assertEqual({'student': "1.90", 'employee': "1.90", 'other': "1.90"}, self.rolePrices(meal))
 
-    def test_Should_Add_Week_to_Canteen(self):
+    def test_Should_Write_Week_to_Feed(self):
         date_mon2 = date(2017, 11, 6)
         date_tue2 = date(2017, 11, 7)
         date_wed2 = date(2017, 11, 8)
@@ -48,17 +51,106 @@ class OpenMensaTest(TestCase):
         week[date_wed2] = menu_wed2
         week[date_thu2] = menu_thu2
         week[date_fri2] = menu_fri2
-        weeks = Week.to_weeks(week)
-
-        canteen = openmensa.weeksToCanteenFeed(weeks)
-        self.assertEqual(canteen.hasMealsFor(date_mon2), True)
-        self.assertEqual(canteen.hasMealsFor(date_tue2), True)
-        self.assertEqual(canteen.hasMealsFor(date_wed2), True)
-        self.assertEqual(canteen.hasMealsFor(date_thu2), True)
-        self.assertEqual(canteen.hasMealsFor(date_fri2), True)
-        
-        canteen_wed2 = canteen._days[date_wed2]['Speiseplan']
-        self.assertEqual(canteen_wed2[0], ("Pochiertes Lachsfilet mit Dillsoße dazu Minze-Reis", [], {'other': 650}))
-        self.assertEqual(canteen_wed2[1], ("Spaghetti al Pomodoro", [], {'other': 360}))
-        self.assertEqual(canteen_wed2[2], ("Krustenbraten vom Schwein mit Kartoffelknödel und Krautsalat", [], {'other': 530}))
-        
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "feed.xml")
+            openmensa.writeMenusFeed(sorted(week.values(), key=lambda menu: menu.menu_date), path)
+            feed = etree.parse(path)
+        days = feed.findall('.//{%s}day' % openmensa.namespace)
+        self.assertEqual(["2017-11-06", "2017-11-07", "2017-11-08", "2017-11-09", "2017-11-10"],
+                         [day.get('date') for day in days])
+
+        meals_wed2 = days[2].findall('{%s}category/{%s}meal' % (openmensa.namespace, openmensa.namespace))
+        self.assertEqual(["Pochiertes Lachsfilet mit Dillsoße dazu Minze-Reis", "Spaghetti al Pomodoro",
+                          "Krustenbraten vom Schwein mit Kartoffelknödel und Krautsalat"],
+                         [meal.findtext('{%s}name' % openmensa.namespace) for meal in meals_wed2])
+        self.assertEqual({'student': "6.50", 'employee': "6.50", 'other': "6.50"}, self.rolePrices(meals_wed2[0]))
+        self.assertEqual({'student': "3.60", 'employee': "3.60", 'other': "3.60"}, self.rolePrices(meals_wed2[1]))
+        self.assertEqual({'student': "5.30", 'employee': "5.30", 'other': "5.30"}, self.rolePrices(meals_wed2[2]))
+
+    def test_Should_Add_All_Roles_to_Day(self):
+        dateobj = date(2019, 11, 4)
+        dish = Dish("Tagesgericht", Prices(Price(1.0), Price(1.9), Price(2.4)), set(), "Tagesgericht 1")
+        dish_per_unit = Dish("Salatbuffet", Prices(Price(0, 0.85, "100g")), set(), "Salatbuffet")
+
+        day = openmensa.menuToDayElement(Menu(dateobj, [dish, dish_per_unit]))
+        meals = day.findall('{%s}category/{%s}meal' % (openmensa.namespace, openmensa.namespace))
+        self.assertEqual({'student': "1.00", 'employee': "1.90", 'other': "2.40"}, self.rolePrices(meals[0]))
+        self.assertEqual({}, self.rolePrices(meals[1]))
+        self.assertIn("student: 0.00€ + 0.85€ / 100g",
+                      [note.text for note in meals[1].findall('{%s}note' % openmensa.namespace)])
+
+    def test_Should_Write_All_Days_When_Streaming_Feed(self):
+        menus = StudentenwerkMenuParser().get_menus(html.fromstring(
+            open("src/test/assets/studentenwerk/in/speiseplan_mensa_garching_new.html").read()), "mensa-garching")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "feed.xml")
+            openmensa.writeMenusFeed(sorted(menus.values(), key=lambda menu: menu.menu_date), path)
+            feed = etree.parse(path)
+
+        self.assertEqual('2.1', feed.getroot().get('version'))
+        days = feed.findall('.//{%s}day' % openmensa.namespace)
+        self.assertEqual(sorted(str(menu_date) for menu_date in menus), [day.get('date') for day in days])
+        meals = feed.findall('.//{%s}meal' % openmensa.namespace)
+        self.assertEqual(sum(len(menu.dishes) for menu in menus.values()), len(meals))
+
+    def test_Should_Split_Feeds_And_Keep_LastModified_When_Unchanged(self):
+        date_mon = date(2017, 11, 6)
+        date_tue = date(2017, 11, 7)
+        dish_mon = Dish("Dampfkartoffeln mit Zucchinigemüse", Prices(Price(3.6)), set(["Sl"]), "Tagesgericht")
+        dish_tue = Dish("Spaghetti al Pomodoro", Prices(Price(3.6)), set(["Sl", "Gl"]), "Tagesgericht")
+        menus = {date_mon: Menu(date_mon, [dish_mon]), date_tue: Menu(date_tue, [dish_tue])}
+
+        with tempfile.TemporaryDirectory() as temp_dir, tempfile.TemporaryDirectory() as state_dir:
+            state = openmensa.writeFeeds(menus, temp_dir, "fmi-bistro", "https://example.org", today=date_tue,
+                                         state_directory=state_dir)
+            # pretend the feeds were written a while ago
+            for feed in state.values():
+                feed['lastModified'] = "2017-11-01T00:00:00+00:00"
+            with open(os.path.join(state_dir, "fmi-bistro.json"), 'w') as outfile:
+                json.dump(state, outfile)
+
+            today = etree.parse(os.path.join(temp_dir, "today.xml"))
+            days = today.findall('.//{%s}day' % openmensa.namespace)
+            self.assertEqual(["2017-11-07"], [day.get('date') for day in days])
+            meta = etree.parse(os.path.join(temp_dir, "meta.xml"))
+            urls = [url.text for url in meta.findall('.//{%s}url' % openmensa.namespace)]
+            self.assertEqual(["https://example.org/fmi-bistro/today.xml", "https://example.org/fmi-bistro/feed.xml"],
+                             urls)
+            self.assertEqual("FMI Bistro Garching", meta.find('.//{%s}name' % openmensa.namespace).text)
+
+            # only the full feed changes if a day gets added
+            date_wed = date(2017, 11, 8)
+            menus[date_wed] = Menu(date_wed, [dish_mon])
+            state = openmensa.writeFeeds(menus, temp_dir, "fmi-bistro", "https://example.org", today=date_tue,
+                                         state_directory=state_dir)
+
+            self.assertEqual("2017-11-01T00:00:00+00:00", state['today']['lastModified'])
+            self.assertEqual("2017-11-01T00:00:00+00:00", state['meta']['lastModified'])
+            self.assertNotEqual("2017-11-01T00:00:00+00:00", state['full']['lastModified'])
+            with open(os.path.join(temp_dir, "feeds.json"), 'r') as infile:
+                self.assertEqual(state, json.load(infile))
+
+    def test_Should_Keep_LastModified_When_OutputDirectoryIsNew(self):
+        date_mon = date(2017, 11, 6)
+        menus = {date_mon: Menu(date_mon, [Dish("Spaghetti al Pomodoro", Prices(Price(3.6)), set(), "Tagesgericht")])}
+
+        with tempfile.TemporaryDirectory() as state_dir:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                state = openmensa.writeFeeds(menus, temp_dir, "fmi-bistro", "https://example.org", today=date_mon,
+                                             state_directory=state_dir)
+            for feed in state.values():
+                feed['lastModified'] = "2017-11-01T00:00:00+00:00"
+            with open(os.path.join(state_dir, "fmi-bistro.json"), 'w') as outfile:
+                json.dump(state, outfile)
+
+            # e.g. a fresh checkout in CI: the published feeds and their "feeds.json" are gone, the cache is not
+            with tempfile.TemporaryDirectory() as temp_dir:
+                state = openmensa.writeFeeds(menus, temp_dir, "fmi-bistro", "https://example.org", today=date_mon,
+                                             state_directory=state_dir)
+            self.assertEqual({"2017-11-01T00:00:00+00:00"}, {feed['lastModified'] for feed in state.values()})
+
+    @staticmethod
+    def rolePrices(meal):
+        return {price.get('role'): price.text for price in meal.findall('{%s}price' % openmensa.namespace)}
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import stat
+import tempfile
+import unittest
+from unittest import mock
+
+import output
+from output import OutputWriter
+
+
+class OutputTest(unittest.TestCase):
+
+    def test_Should_MoveFilesIntoPlace_OnlyOnCommit(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "2019", "19.json")
+            with open(os.path.join(temp_dir, "all.json"), "w") as outfile:
+                outfile.write("old")
+
+            writer = OutputWriter(workers=2, durable=False)
+            writer.write_json(path, {"number": 19})
+            writer.write(os.path.join(temp_dir, "all.json"), b"new")
+            writer.wait()
+            self.assertFalse(os.path.exists(path))
+            with open(os.path.join(temp_dir, "all.json"), "r") as infile:
+                self.assertEqual("old", infile.read())
+
+            self.assertEqual(2, writer.commit())
+            writer.close()
+            with open(path, "r") as infile:
+                self.assertEqual({"number": 19}, json.load(infile))
+            with open(os.path.join(temp_dir, "all.json"), "r") as infile:
+                self.assertEqual("new", infile.read())
+            self.assertEqual(["19.json"], os.listdir(os.path.join(temp_dir, "2019")))
+
+    def test_Should_PublishReadableFiles_When_UmaskAllowsIt(self):
+        with tempfile.TemporaryDirectory() as temp_dir, mock.patch("output._umask", 0o022):
+            with OutputWriter(durable=False) as writer:
+                writer.write_json(os.path.join(temp_dir, "2019", "19.json"), {"number": 19})
+            output.write_atomic(os.path.join(temp_dir, "status.json"), b"{}")
+            for path in (os.path.join(temp_dir, "2019", "19.json"), os.path.join(temp_dir, "status.json")):
+                self.assertEqual(0o644, stat.S_IMODE(os.stat(path).st_mode), path)
+
+            # a replaced file keeps its mode
+            os.chmod(os.path.join(temp_dir, "status.json"), 0o640)
+            output.write_atomic(os.path.join(temp_dir, "status.json"), b"{}")
+            self.assertEqual(0o640, stat.S_IMODE(os.stat(os.path.join(temp_dir, "status.json")).st_mode))
+
+    def test_Should_LeaveNothingBehind_When_Aborted(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with self.assertRaises(RuntimeError):
+                with OutputWriter(durable=False) as writer:
+                    writer.write(os.path.join(temp_dir, "feed.xml"), b"<openmensa/>")
+                    raise RuntimeError("parsing failed")
+
+            self.assertEqual([], os.listdir(temp_dir))
+
+    def test_Should_SwapTreesAndKeepLinkedFiles(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            dist = os.path.join(temp_dir, "dist")
+            os.makedirs(os.path.join(dist, "fmi-bistro"))
+            for name in ("feeds.json", "old.json"):
+                with open(os.path.join(dist, "fmi-bistro", name), "w") as outfile:
+                    outfile.write(name)
+
+            # the first swap replaces a plain directory
+            tree = output.new_tree(dist, keep=["feeds.json"])
+            self.assertEqual(["feeds.json"], os.listdir(os.path.join(tree, "fmi-bistro")))
+            output.write_atomic(os.path.join(tree, "all.json"), b"{}")
+            output.swap_tree(dist, tree)
+
+            self.assertTrue(os.path.islink(dist))
+            self.assertEqual(["all.json", "fmi-bistro"], sorted(os.listdir(dist)))
+            self.assertEqual(["dist", os.path.basename(tree)], sorted(os.listdir(temp_dir)))
+
+            # later swaps only switch the symlink
+            next_tree = output.new_tree(dist)
+            output.swap_tree(dist, next_tree)
+            self.assertEqual([], os.listdir(dist))
+            self.assertFalse(os.path.exists(tree))
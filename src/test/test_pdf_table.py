@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from pdf_table import ColumnLayout, LayoutTextExtractor
+
+
+class LayoutTextExtractorTest(unittest.TestCase):
+    extractor = LayoutTextExtractor()
+
+    def test_Should_SplitLinesAtHeaderPositions(self):
+        lines = ["Montag      Dienstag    Mittwoch",
+                 "Suppe       Eintopf     Salat",
+                 "Nudeln"]
+        layout = ColumnLayout.from_header(["mon", "tue", "wed"], lines[0], ["Montag", "Dienstag", "Mittwoch"])
+
+        cells = self.extractor.cells(layout, lines)
+
+        self.assertEqual([(0, 12), (12, 24), (24, None)], layout.spans)
+        self.assertEqual(["Montag      ", "Suppe       ", "Nudeln"], cells["mon"])
+        self.assertEqual(["Mittwoch", "Salat", ""], cells["wed"])
+
+    def test_Should_SkipGapsBetweenFixedColumns(self):
+        layout = ColumnLayout(["soup", "mains"], [(0, 5), (8, None)])
+
+        cells = self.extractor.cells(layout, ["Suppe | Schnitzel"])
+
+        self.assertEqual({"soup": ["Suppe"], "mains": ["Schnitzel"]}, cells)
+
+    def test_Should_Fail_When_NamesDoNotMatchColumns(self):
+        with self.assertRaises(ValueError):
+            ColumnLayout(["mon"], [(0, 1), (1, None)])
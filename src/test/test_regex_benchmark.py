@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+import random
+import re
+import unittest
+
+import regex_benchmark
+from menu_parser import MenuParser, FMIBistroMenuParser, IPPBistroMenuParser
+
+
+class RegexBenchmarkTest(unittest.TestCase):
+
+    def test_Should_FindLikeLazyRegex_When_TextHasNoLineBreaks(self):
+        rng = random.Random(0)
+        texts = ["Schnitzel mit Pommes € 4,50 Suppe € 2,00 Rest", "€ 1,50€ 2,00", "a€ 1,5", "", "€ ",
+                 "12,50 € x", "Menü 1 3,20 € Menü 2 ?€ € Überraschung 4,10 € )",
+                 # names starting with a digit, also right after the previous price
+                 "2 Spiegeleier 3,20 € x", "Schnitzel 4,50 € 12,50 € x", "13,20 € x 3,10 € y"]
+        texts += ["".join(rng.choice("ab €?,12 )") for _ in range(rng.randint(0, 60))) for _ in range(500)]
+        for text in texts:
+            fmi_found = [name + price.group(0)
+                         for name, price in MenuParser.find_until(FMIBistroMenuParser.dish_end_regex, text)]
+            self.assertEqual(re.findall(r".+?\€\s\d+,\d+", text), fmi_found, text)
+            ipp_found = [(name, price.group(1)) for name, price in MenuParser.find_until(
+                IPPBistroMenuParser.dish_end_regex, text, IPPBistroMenuParser.dish_end_continued_regex)]
+            # the pattern the IPP parser used before
+            self.assertEqual(re.findall(r"(.+?)(\d+,\d+|\?€)\s€[^)]", text), ipp_found, text)
+
+    def test_Should_GrowLinearly_When_InputIsAdversarial(self):
+        sizes = [20000, 80000]
+        for name, (match, generate) in regex_benchmark.cases().items():
+            durations = [regex_benchmark.measure(match, generate(size)) for size in sizes]
+            # too fast to tell the growth apart from the noise of the clock; a quadratic pattern takes seconds
+            if durations[-1] < 0.01:
+                continue
+            # about 1 for linear and 2 for quadratic patterns, independent of the speed of the machine
+            self.assertLess(regex_benchmark.growth(sizes, durations), 1.5, name)
+
+    def test_Should_SkipDay_When_TextIsTooLong(self):
+        parser = IPPBistroMenuParser()
+        self.assertTrue(parser.within_budget("x" * parser.max_day_length, "mon"))
+        self.assertFalse(parser.within_budget("x" * (parser.max_day_length + 1), "mon"))
+
+    def test_Should_ComputeGrowthExponent_When_DurationsAreGiven(self):
+        self.assertAlmostEqual(1, regex_benchmark.growth([1000, 10000], [0.001, 0.01]))
+        self.assertAlmostEqual(2, regex_benchmark.growth([1000, 10000], [0.001, 0.1]))
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import tempfile
+import unittest
+from datetime import date
+
+import batch
+import snapshot
+from entities import Week
+from menu_parser import IPPBistroMenuParser
+from snapshot import Snapshot, SnapshotWriter
+
+
+class SnapshotTest(unittest.TestCase):
+    ipp_parser = IPPBistroMenuParser()
+
+    menus_kw_47 = ipp_parser.get_menus(open('src/test/assets/ipp/in/menu_kw_47_2017.txt', 'r').read(), 2017, 47)
+    menus_kw_48 = ipp_parser.get_menus(open('src/test/assets/ipp/in/menu_kw_48_2017.txt', 'r').read(), 2017, 48)
+
+    def test_Should_ReturnPayloads_When_IndexedByDayAndWeek(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "menus.snapshot")
+            snapshot.write(path, {"ipp-bistro": self.menus_kw_47, "fmi-bistro": self.menus_kw_48})
+
+            with Snapshot(path) as served:
+                self.assertEqual(["fmi-bistro", "ipp-bistro"], served.canteens())
+                for menu_date, menu in self.menus_kw_47.items():
+                    payload = served.day("ipp-bistro", menu_date)
+                    self.assertIsInstance(payload, memoryview)
+                    self.assertEqual(menu.to_json_obj(), json.loads(payload.tobytes().decode("utf-8")))
+                    payload.release()
+                week = Week.to_iso_weeks(self.menus_kw_48)[(2017, 48)]
+                payload = served.week("fmi-bistro", 2017, 48)
+                self.assertEqual(week.to_json_obj(), json.loads(payload.tobytes().decode("utf-8")))
+                payload.release()
+
+                # the spans point into the file, e.g. for sendfile
+                offset, length = served.week_span("fmi-bistro", 2017, 48)
+                with open(path, 'rb') as infile:
+                    infile.seek(offset)
+                    self.assertEqual(week.to_json_obj(), json.loads(infile.read(length).decode("utf-8")))
+
+                self.assertIsNone(served.day("ipp-bistro", date(2017, 11, 27)))
+                self.assertIsNone(served.week("mensa-garching", 2017, 48))
+
+    def test_Should_KeepServingTheOldSnapshot_Until_Refreshed(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "menus.snapshot")
+            snapshot.write(path, {"ipp-bistro": self.menus_kw_47})
+            with Snapshot(path) as served:
+                old_payload = served.week("ipp-bistro", 2017, 47)
+                self.assertFalse(served.refresh())
+
+                snapshot.write(path, {"ipp-bistro": self.menus_kw_48})
+                # the open snapshot is unchanged
+                self.assertIsNotNone(served.week("ipp-bistro", 2017, 47))
+                self.assertTrue(served.refresh())
+                self.assertIsNone(served.week("ipp-bistro", 2017, 47))
+                self.assertIsNotNone(served.week("ipp-bistro", 2017, 48))
+                # slices of the old snapshot stay valid
+                self.assertEqual(2017, json.loads(old_payload.tobytes().decode("utf-8"))["year"])
+                old_payload.release()
+
+    def test_Should_KeepPreviousSnapshot_When_WritingFails(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "menus.snapshot")
+            snapshot.write(path, {"ipp-bistro": self.menus_kw_47})
+            with self.assertRaises(ValueError):
+                with SnapshotWriter(path) as writer:
+                    writer.add_menus("ipp-bistro", self.menus_kw_48)
+                    raise ValueError("run failed")
+            with Snapshot(path) as served:
+                self.assertIsNone(served.week("ipp-bistro", 2017, 48))
+            self.assertEqual(["menus.snapshot"], os.listdir(temp_dir))
+
+    def test_Should_WriteSnapshot_When_BatchRuns(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "menus.snapshot")
+            batch.run(["ipp-bistro"], os.path.join(temp_dir, "dist"), parse=lambda location: self.menus_kw_47,
+                      snapshot_path=path, state_directory=os.path.join(temp_dir, "state"))
+            with Snapshot(path) as served:
+                self.assertEqual(["ipp-bistro"], served.canteens())
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+import time
+import unittest
+from datetime import date
+
+from lxml import html
+
+from menu_parser import MedizinerMensaMenuParser, StudentenwerkMenuParser
+from store import LastKnownGoodStore, MenuStore, dumps_menus, loads_menus
+
+
+class StoreTest(unittest.TestCase):
+    studentenwerk_menu_parser = StudentenwerkMenuParser()
+    mediziner_mensa_parser = MedizinerMensaMenuParser()
+
+    menu_html_mensa_garching_new = html.fromstring(
+        open("src/test/assets/studentenwerk/in/speiseplan_mensa_garching_new.html").read())
+    menu_kw_44_2018_txt = open('src/test/assets/mediziner-mensa/in/menu_kw_44_2018.txt', 'r').read()
+
+    def test_Should_RestoreEqualMenus_When_Serialized(self):
+        for menus in (self.studentenwerk_menu_parser.get_menus(self.menu_html_mensa_garching_new, "mensa-garching"),
+                      self.mediziner_mensa_parser.get_menus(self.menu_kw_44_2018_txt, 2018, 44)):
+            restored = loads_menus(dumps_menus(menus))
+            self.assertEqual(list(menus), list(restored))
+            for menu_date in menus:
+                self.assertEqual(menus[menu_date], restored[menu_date])
+
+    def test_Should_ServeStoredMenus_When_ParsingFails(self):
+        menus = self.mediziner_mensa_parser.get_menus(self.menu_kw_44_2018_txt, 2018, 44)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = LastKnownGoodStore(temp_dir)
+            self.assertEqual((menus, False), store.with_fallback("mediziner-mensa", menus, min_days=7))
+            self.assertTrue(os.path.isfile(store.path("mediziner-mensa")))
+
+            stored_menus, stale = store.with_fallback("mediziner-mensa", None)
+            self.assertTrue(stale)
+            self.assertEqual(menus, stored_menus)
+
+            # too few days count as failure as well
+            first_day = {min(menus): menus[min(menus)]}
+            stored_menus, stale = store.with_fallback("mediziner-mensa", first_day, min_days=2)
+            self.assertTrue(stale)
+            self.assertEqual(7, len(stored_menus))
+
+    def test_Should_ReturnParsedMenus_When_NothingIsStored(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.assertEqual((None, False), LastKnownGoodStore(temp_dir).with_fallback("fmi-bistro", None))
+
+
+class MenuStoreTest(unittest.TestCase):
+    mediziner_mensa_parser = MedizinerMensaMenuParser()
+
+    menu_kw_44_2018_txt = open('src/test/assets/mediziner-mensa/in/menu_kw_44_2018.txt', 'r').read()
+
+    def test_Should_ReturnStoredMenu_When_FreshEnough(self):
+        menus = self.mediziner_mensa_parser.get_menus(self.menu_kw_44_2018_txt, 2018, 44)
+        menu_date = date(2018, 10, 31)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            menu_store = MenuStore(temp_dir)
+            menu_store.put("mediziner-mensa", menus)
+
+            self.assertEqual(menus[menu_date], menu_store.get("mediziner-mensa", menu_date, max_age=60))
+            self.assertIsNone(menu_store.get("mediziner-mensa", date(2018, 11, 5)))
+            self.assertIsNone(menu_store.get("fmi-bistro", menu_date))
+
+            a_day_ago = time.time() - 24 * 60 * 60
+            os.utime(menu_store.path("mediziner-mensa", menu_date), (a_day_ago, a_day_ago))
+            self.assertIsNone(menu_store.get("mediziner-mensa", menu_date, max_age=60))
+            self.assertEqual(menus[menu_date], menu_store.get("mediziner-mensa", menu_date))
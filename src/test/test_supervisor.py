@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+import time
+import unittest
+from datetime import date
+
+import requests
+
+import batch
+import fetch
+import status
+import supervisor
+from entities import Dish, Menu, Prices
+from menu_parser import IPPBistroMenuParser
+from supervisor import FetchProxy, Supervisor, WorkerError, WorkerKilled
+
+# the parse functions are pickled to be sent to the fork server, so they have to be module level functions
+ipp_parser = IPPBistroMenuParser()
+menu_kw_47_2017_txt = open('src/test/assets/ipp/in/menu_kw_47_2017.txt', 'r').read()
+
+
+def parse_ipp(location):
+    status.add_bytes(1024)
+    return ipp_parser.get_menus(menu_kw_47_2017_txt, 2017, 47)
+
+
+def hang(location):
+    time.sleep(60)
+
+
+def spin(location):
+    while True:
+        pass
+
+
+def allocate(location):
+    return bytearray(4 * 2 ** 30)
+
+
+def fail(location):
+    raise ValueError("broken PDF")
+
+
+def hang_on_fmi(location):
+    if location == "fmi-bistro":
+        time.sleep(60)
+    return parse_ipp(location)
+
+
+def parse_fetched(location):
+    # a page and a missing page, both fetched by the supervisor
+    page = b"".join(fetch.get("http://menus.test/%s" % location, stream=True).iter_content(4)).decode("utf-8")
+    try:
+        fetch.get("http://menus.test/missing")
+        missing = "found"
+    except requests.HTTPError as e:
+        missing = str(e.response.status_code)
+    return {date(2017, 11, 20): Menu(date(2017, 11, 20), [Dish("%s %s" % (page, missing), Prices(), set(), "x")])}
+
+
+class RecordingPolicy:
+    """A fetch policy of the batch process which serves made up pages and records all requests."""
+
+    def __init__(self):
+        self.urls = list()
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        if url.endswith("/missing"):
+            raise requests.HTTPError("404 Client Error", response=FetchProxy.response(404, {}, b"", url, None))
+        return FetchProxy.response(200, {"Content-Type": "text/html"}, ("Menu of %s" % url).encode("utf-8"), url,
+                                   "utf-8")
+
+
+@unittest.skipUnless(supervisor.available(), "worker processes can not be forked")
+class SupervisorTest(unittest.TestCase):
+
+    def test_Should_ReturnMenus_When_WorkerSucceeds(self):
+        with status.recording() as stats:
+            menus = Supervisor(wall_seconds=30).run(parse_ipp, "ipp-bistro")
+        self.assertEqual(ipp_parser.get_menus(menu_kw_47_2017_txt, 2017, 47), menus)
+        # the stats of the worker end up in the stats of the caller
+        self.assertEqual(1024, stats.bytes_downloaded)
+
+    def test_Should_FetchInSupervisor_When_WorkerDownloads(self):
+        policy = RecordingPolicy()
+        default_policy, fetch.default_policy = fetch.default_policy, policy
+        try:
+            menus = Supervisor(wall_seconds=30).run(parse_fetched, "ipp-bistro")
+        finally:
+            fetch.default_policy = default_policy
+        # all requests went through the policy of this process, so they share its rate limits and circuit breakers
+        self.assertEqual(["http://menus.test/ipp-bistro", "http://menus.test/missing"], policy.urls)
+        self.assertEqual("Menu of http://menus.test/ipp-bistro 404", menus[date(2017, 11, 20)].dishes[0].name)
+
+    def test_Should_KillWorker_When_ItHangs(self):
+        start = time.monotonic()
+        with self.assertRaises(WorkerKilled):
+            Supervisor(wall_seconds=0.5).run(hang, "ipp-bistro")
+        self.assertLess(time.monotonic() - start, 10)
+
+    def test_Should_RaiseError_When_WorkerExceedsItsLimits(self):
+        with self.assertRaises(WorkerError):
+            Supervisor(cpu_seconds=1, wall_seconds=30).run(spin, "ipp-bistro")
+        with self.assertRaisesRegex(WorkerError, "MemoryError"):
+            Supervisor(memory_mb=1024, wall_seconds=30).run(allocate, "ipp-bistro")
+
+    def test_Should_RaiseError_When_ParseFails(self):
+        with self.assertRaisesRegex(WorkerError, "broken PDF"):
+            Supervisor(wall_seconds=30).run(fail, "ipp-bistro")
+
+    def test_Should_ReportKilledWorkers_When_BatchRuns(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            summary = batch.run(["ipp-bistro", "fmi-bistro"], temp_dir, workers=2, parse=hang_on_fmi,
+                                isolation=Supervisor(wall_seconds=1), state_directory=os.path.join(temp_dir, ".state"))
+        self.assertEqual(["ipp-bistro"], summary.published)
+        self.assertEqual(["fmi-bistro"], summary.failed)
+        self.assertEqual(["fmi-bistro"], summary.killed)
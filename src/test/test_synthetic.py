@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+import unittest
+from datetime import date
+
+import benchmark
+import synthetic
+from entities import Ingredients, Week
+
+
+class SyntheticTest(unittest.TestCase):
+
+    def test_Should_GenerateSameMenus_When_SeedIsSame(self):
+        menus = synthetic.MenuGenerator(seed=42).menus("mensa-garching", 2, start=date(2019, 5, 8))
+        same_menus = synthetic.MenuGenerator(seed=42).menus("mensa-garching", 2, start=date(2019, 5, 8))
+
+        self.assertEqual(menus, same_menus)
+        self.assertEqual(10, len(menus))
+        self.assertEqual(date(2019, 5, 6), min(menus))
+        self.assertEqual([(2019, 19), (2019, 20)], sorted(Week.to_iso_weeks(menus)))
+
+    def test_Should_UseRealPricesAndIngredients(self):
+        all_menus = synthetic.MenuGenerator(seed=1).all_menus(30, 1)
+        price_tables = [table for _, table in synthetic.studentenwerk_tables]
+        prices = [prices for table in price_tables for prices in table.values()] + synthetic.self_service_prices
+
+        self.assertEqual(30, len(all_menus))
+        self.assertIn("synthetic-0", all_menus)
+        for menus in all_menus.values():
+            for menu in menus.values():
+                for dish in menu.dishes:
+                    self.assertTrue(any(dish.prices is table_prices for table_prices in prices))
+                    self.assertTrue(dish.ingredients <= set(Ingredients.ingredient_lookup))
+
+    def test_Should_MeasureAllStages(self):
+        dishes, results = benchmark.run(2, 1, seed=3)
+
+        self.assertGreater(dishes, 0)
+        self.assertEqual(["generate", "make_duplicates_unique", "remove_duplicates", "to_weeks", "jsonify", "reformat"],
+                         list(results))
+        self.assertTrue(all(duration >= 0 and peak >= 0 for duration, peak in results.values()))
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import tempfile
+import unittest
+from datetime import date
+
+import numpy as np
+
+import batch
+import unit_prices
+from entities import Dish, Menu, Price, Prices
+from menu_parser import StudentenwerkMenuParser
+
+
+class UnitPricesTest(unittest.TestCase):
+    salad = Dish("Gemüsepfanne", StudentenwerkMenuParser.prices_mesa_leopoldstr["Vegetarisch"], {"f"}, "Vegetarisch")
+    self_service = Dish("Gemüsecurry", Prices(Price(1.0, 0.75, "100g"), Price(1.0, 0.90, "100g"), Price("N/A")),
+                        {"v"}, "Self-Service")
+    daily = Dish("Schnitzel", Prices(Price(3.5)), {"S"}, "Tagesgericht 1")
+
+    def test_Should_ComputePricesForAllRolesAndWeights(self):
+        matrix = unit_prices.price_matrix([self.salad, self.self_service], [100, 250, 1000])
+
+        self.assertEqual((2, 3, 3), matrix.shape)
+        # half a cent is rounded up
+        np.testing.assert_array_equal([[75, 188, 750], [85, 213, 850], [95, 238, 950]], matrix[0])
+        np.testing.assert_array_equal([175, 288, 850], matrix[1, 0])
+        self.assertTrue(np.isnan(matrix[1, 2]).all())
+
+    def test_Should_ComputePrices_When_PricePerUnitIsWholeEuros(self):
+        # "Klassik Menü" costs guests 1 € per 100g
+        menu = Dish("Rinderbraten", StudentenwerkMenuParser.prices_mesa_leopoldstr["Klassik Menü"], set(),
+                    "Klassik Menü")
+        self.assertTrue(unit_prices.is_weighed(menu))
+        np.testing.assert_array_equal([[85, 213, 850], [90, 225, 900], [100, 250, 1000]],
+                                      unit_prices.price_matrix([menu], [100, 250, 1000])[0])
+
+    def test_Should_PublishAndQueryUnitPrices(self):
+        menus = {date(2019, 5, 6): Menu(date(2019, 5, 6), [self.daily, self.salad, self.self_service]),
+                 date(2019, 5, 7): Menu(date(2019, 5, 7), [self.daily])}
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            batch.publish_location(menus, temp_dir, "mensa-leopoldstr")
+            path = os.path.join(temp_dir, "mensa-leopoldstr", unit_prices.file_name)
+            with open(path, "r") as infile:
+                published = json.load(infile)
+            prices = unit_prices.UnitPrices.load(path)
+
+        self.assertEqual(["2019-05-06"], [day["date"] for day in published["days"]])
+        self.assertEqual(["Gemüsepfanne", "Gemüsecurry"], prices.dishes(date(2019, 5, 6)))
+        self.assertEqual([], prices.dishes(date(2019, 5, 7)))
+        self.assertEqual(1.88, prices.price(date(2019, 5, 6), "Gemüsepfanne", "students", 250))
+        self.assertEqual(4.15, prices.price(date(2019, 5, 6), "Gemüsecurry", "staff", 350))
+        self.assertIsNone(prices.price(date(2019, 5, 6), "Gemüsecurry", "guests", 350))
+        # a day without dishes sold by weight
+        self.assertIsNone(prices.price(date(2019, 5, 7), "Schnitzel", "students", 250))
+        # a dish which is not sold by weight that day and a role which does not exist
+        self.assertIsNone(prices.price(date(2019, 5, 6), "Schnitzel", "students", 250))
+        self.assertIsNone(prices.price(date(2019, 5, 6), "Gemüsepfanne", "visitors", 250))
+        with self.assertRaises(ValueError):
+            prices.price(date(2019, 5, 6), "Gemüsepfanne", "students", 5000)
+
+    def test_Should_NotPublishUnitPrices_When_NothingIsSoldByWeight(self):
+        self.assertIsNone(unit_prices.to_json_obj({date(2019, 5, 6): Menu(date(2019, 5, 6), [self.daily])}))
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+import json
+import re
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from entities import Dish, Menu
+
+roles = ("students", "staff", "guests")
+# the weights (in gram) the prices are computed for
+default_weights = tuple(range(50, 1001, 50))
+file_name = "unit_prices.json"
+
+
+def unit_grams(unit: Optional[str]) -> Optional[float]:
+    """The weight of a price unit like "100g" in gram, None if it is no weight."""
+    match = re.fullmatch(r"\s*(\d+(?:[.,]\d+)?)\s*g\s*", unit or "")
+    return float(match.group(1).replace(",", ".")) if match else None
+
+
+def is_weighed(dish: Dish) -> bool:
+    return any(getattr(dish.prices, role).price_per_unit is not None
+               and unit_grams(getattr(dish.prices, role).unit) is not None for role in roles)
+
+
+def price_matrix(dishes: Sequence[Dish], weights: Sequence[float] = default_weights) -> np.ndarray:
+    """
+    The prices in cent of all `dishes` for every role and weight: an array of shape (dishes, roles, weights). Roles
+    without a price by weight are NaN.
+    """
+    base_prices = np.full((len(dishes), len(roles)), np.nan)
+    per_gram = np.full((len(dishes), len(roles)), np.nan)
+    for i, dish in enumerate(dishes):
+        for j, role in enumerate(roles):
+            price = getattr(dish.prices, role)
+            grams = unit_grams(price.unit)
+            if grams is None or price.price_per_unit is None:
+                continue
+            base_prices[i, j] = price.base_price if isinstance(price.base_price, float) else 0.0
+            # whole Euros per unit are ints, e.g. `Price(0, 1, "100g")`
+            per_gram[i, j] = float(price.price_per_unit) / grams
+    # base price + price per gram * weight, for all dishes, roles and weights at once
+    prices = base_prices[:, :, np.newaxis] + per_gram[:, :, np.newaxis] * np.asarray(weights, dtype=float)
+    # half a cent is rounded up like at the till, not to even like `np.round`; the inner round drops the binary noise
+    # of e.g. 187.49999999999997
+    return np.floor(np.round(prices * 100, 6) + 0.5)
+
+
+def to_json_obj(menus: Dict[date, Menu], weights: Sequence[int] = default_weights) -> Optional[Dict[str, Any]]:
+    """
+    The price matrices of all dishes sold by weight of every day, None if there are none. Prices are in cent, null if
+    a role has no price by weight.
+    """
+    days = list()
+    for menu_date in sorted(menus):
+        dishes = [dish for dish in menus[menu_date].dishes if is_weighed(dish)]
+        if not dishes:
+            continue
+        matrix = price_matrix(dishes, weights)
+        days.append({"date": str(menu_date), "dishes": [dish.name for dish in dishes],
+                     "prices": [[[None if np.isnan(cents) else int(cents) for cents in role_prices]
+                                 for role_prices in dish_prices] for dish_prices in matrix]})
+    if not days:
+        return None
+    return {"roles": list(roles), "weights": list(weights), "days": days}
+
+
+class UnitPrices:
+    """Query API of the published price matrices, see `to_json_obj`."""
+    weights: np.ndarray
+    days: Dict[date, Dict[str, Any]]
+
+    def __init__(self, obj: Dict[str, Any]):
+        self.roles = list(obj["roles"])
+        self.role_index = {role: i for i, role in enumerate(self.roles)}
+        self.weights = np.asarray(obj["weights"], dtype=float)
+        self.days = dict()
+        for day in obj["days"]:
+            self.days[datetime.strptime(day["date"], "%Y-%m-%d").date()] = {
+                "dishes": day["dishes"],
+                # the first dish of a name, like `list.index`
+                "index": {name: i for i, name in reversed(list(enumerate(day["dishes"])))},
+                "prices": np.array([[[np.nan if cents is None else cents for cents in role_prices]
+                                     for role_prices in dish_prices] for dish_prices in day["prices"]], dtype=float)}
+
+    @staticmethod
+    def load(path):
+        with open(str(path), 'r') as infile:
+            return UnitPrices(json.load(infile))
+
+    def dishes(self, menu_date: date) -> List[str]:
+        return list(self.days[menu_date]["dishes"]) if menu_date in self.days else []
+
+    def matrix(self, menu_date: date) -> np.ndarray:
+        """The prices in cent of the day, of shape (dishes, roles, weights)."""
+        return self.days[menu_date]["prices"]
+
+    def price(self, menu_date: date, dish_name: str, role: str, grams: float) -> Optional[float]:
+        """
+        The price in Euro of `grams` of the dish for `role`, None if the role has no price by weight, or the dish or
+        role is unknown on that day. As the prices are linear in the weight, weights between the grid points are
+        interpolated.
+        """
+        if not self.weights[0] <= grams <= self.weights[-1]:
+            raise ValueError("{}g is outside of the weights {}g to {}g.".format(grams, self.weights[0],
+                                                                                 self.weights[-1]))
+        day = self.days.get(menu_date)
+        if day is None or dish_name not in day["index"] or role not in self.role_index:
+            return None
+        prices = day["prices"][day["index"][dish_name], self.role_index[role]]
+        if np.isnan(prices).any():
+            return None
+        return round(float(np.interp(grams, self.weights, prices)) / 100, 2)
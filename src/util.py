@@ -1,22 +1,56 @@
 # -*- coding: utf-8 -*-
 
-from datetime import datetime
+import os
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import output
 
 date_pattern = "%d.%m.%Y"
 cli_date_format = "dd.mm.yyyy"
 
 
+def default_cache_dir():
+    # local state (e.g. last known good menus) is kept in $EAT_API_CACHE or ~/.cache/eat-api
+    return os.environ.get("EAT_API_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "eat-api"))
+
+
 def parse_date(date_str):
     return datetime.strptime(date_str, date_pattern).date()
 
 
+class DateWindow:
+    """The days from `start` to `end` (both inclusive); a bound of None means the window is open to that side."""
+    start: Optional[date]
+    end: Optional[date]
+
+    def __init__(self, start: Optional[date] = None, end: Optional[date] = None):
+        if start is not None and end is not None and start > end:
+            raise ValueError("The window starts on %s after it ends on %s." % (start, end))
+        self.start = start
+        self.end = end
+
+    def __contains__(self, day: date):
+        return (self.start is None or self.start <= day) and (self.end is None or day <= self.end)
+
+    def overlaps_week(self, year: int, calendar_week: int):
+        """Whether any day of the ISO calendar week is within the window."""
+        monday = datetime.strptime("%d-W%d-1" % (year, calendar_week), "%G-W%V-%u").date()
+        sunday = monday + timedelta(days=6)
+        return (self.start is None or self.start <= sunday) and (self.end is None or monday <= self.end)
+
+    def __repr__(self):
+        return "DateWindow(%s, %s)" % (self.start, self.end)
+
+
 def make_duplicates_unique(names_with_duplicates):
     counts = [1] * len(names_with_duplicates)
-    checked_names = []
+    # a set, so looking up the names seen so far does not get slower with every name
+    checked_names = set()
     for i, name in enumerate(names_with_duplicates):
         if name in checked_names:
             counts[i] += 1
-        checked_names.append(name)
+        checked_names.add(name)
 
     names_without_duplicates = names_with_duplicates
     for i, count in enumerate(counts):
@@ -24,3 +58,8 @@ def make_duplicates_unique(names_with_duplicates):
             names_without_duplicates[i] += " (%s)" % count
 
     return names_without_duplicates
+
+
+def write_json(path, obj):
+    # replaced atomically, so readers never see a half written file; the parent directory is created if necessary
+    output.write_atomic(path, output.encode_json(obj))